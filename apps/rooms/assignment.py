@@ -0,0 +1,139 @@
+'''
+Room assignment strategies, picking the room of a booking among the free rooms of the selected
+room type, from an availability snapshot of its free rooms per booking request (or per group
+booking). The strategy is selected with settings.ROOM_ASSIGNMENT_STRATEGY:
+
+- first_fit: the first free room (by primary key), found with a single query without any snapshot
+- best_fit: the free room whose free nights around the stay are the fewest, so the stays are packed
+  next to each other rather than leaving short gaps that can't be sold
+- least_used: the free room with the fewest booked nights around the stay, spreading the stays
+'''
+from bisect import bisect_left, insort
+import datetime
+from django.conf import settings
+from django.core.exceptions import ImproperlyConfigured
+from .availability import find_available_room, rooms_available_for_any
+from .models import RoomNight
+
+
+# nights before and after the stays loaded in a snapshot, the gaps around a stay are measured up to it
+GAP_HORIZON = 14
+
+
+class AvailabilitySnapshot:
+    '''
+    The rooms of a room type, in primary key order, and their booked nights within [start, end),
+    updated with book() as the stays of a group booking are assigned
+    '''
+    def __init__(self, rooms, booked_nights, start, end):
+        self.rooms = rooms
+        self.start = start
+        self.end = end
+        # sorted booked dates by room id
+        self._nights = {room.pk: [] for room in rooms}
+        for room_id, date in booked_nights:
+            self._nights[room_id].append(date)
+        for dates in self._nights.values():
+            dates.sort()
+
+    @classmethod
+    def load(cls, room_type, stays, horizon=GAP_HORIZON):
+        '''
+        Snapshot around the (check_in_date, check_out_date) stays of the rooms of the room type free
+        for at least one of them, so the rooms booked all along and their nights aren't loaded.
+        Takes two queries, one if no room is free.
+        '''
+        start = min(check_in_date for check_in_date, _ in stays) - datetime.timedelta(days=horizon)
+        end = max(check_out_date for _, check_out_date in stays) + datetime.timedelta(days=horizon)
+        rooms = list(rooms_available_for_any(room_type, stays).select_related('room_type').order_by('pk'))
+        booked_nights = []
+        if rooms:
+            booked_nights = RoomNight.objects.filter(
+                room_id__in=[room.pk for room in rooms], date__gte=start, date__lt=end
+            ).values_list('room_id', 'date')
+        return cls(rooms, booked_nights, start, end)
+
+    def is_free(self, room, check_in_date, check_out_date):
+        dates = self._nights[room.pk]
+        index = bisect_left(dates, check_in_date)
+        return index == len(dates) or dates[index] >= check_out_date
+
+    def free_rooms(self, check_in_date, check_out_date):
+        return (room for room in self.rooms if self.is_free(room, check_in_date, check_out_date))
+
+    def gaps(self, room, check_in_date, check_out_date):
+        '''
+        Free nights of the room right before and right after the stay, up to the bounds of the snapshot
+        '''
+        dates = self._nights[room.pk]
+        index = bisect_left(dates, check_in_date)
+        before = (check_in_date - (dates[index - 1] + datetime.timedelta(days=1)) if index else check_in_date - self.start).days
+        after = (dates[index] - check_out_date if index < len(dates) else self.end - check_out_date).days
+        return before, after
+
+    def booked_nights(self, room):
+        return len(self._nights[room.pk])
+
+    def book(self, room, check_in_date, check_out_date):
+        dates = self._nights[room.pk]
+        for day in range((check_out_date - check_in_date).days):
+            insort(dates, check_in_date + datetime.timedelta(days=day))
+
+
+def first_fit(snapshot, check_in_date, check_out_date):
+    return next(snapshot.free_rooms(check_in_date, check_out_date), None)
+
+
+def best_fit(snapshot, check_in_date, check_out_date):
+    def fit(room):
+        # gaps are capped at the horizon, beyond which all the rooms are as good
+        return sum(min(gap, GAP_HORIZON) for gap in snapshot.gaps(room, check_in_date, check_out_date))
+    return min(snapshot.free_rooms(check_in_date, check_out_date), key=fit, default=None)
+
+
+def least_used(snapshot, check_in_date, check_out_date):
+    return min(snapshot.free_rooms(check_in_date, check_out_date), key=snapshot.booked_nights, default=None)
+
+
+ASSIGNMENT_STRATEGIES = {
+    'first_fit': first_fit,
+    'best_fit': best_fit,
+    'least_used': least_used,
+}
+
+
+def get_assignment_strategy(name=None):
+    '''
+    The strategy of the given name, settings.ROOM_ASSIGNMENT_STRATEGY by default
+    '''
+    name = name or settings.ROOM_ASSIGNMENT_STRATEGY
+    try:
+        return ASSIGNMENT_STRATEGIES[name]
+    except KeyError:
+        raise ImproperlyConfigured(
+            f'Unknown room assignment strategy "{name}", use one of: {", ".join(ASSIGNMENT_STRATEGIES)}'
+        )
+
+
+def assign_room(snapshot, check_in_date, check_out_date, strategy=None):
+    '''
+    Picks a free room of the snapshot for the stay with the strategy, and books it in the snapshot.
+    Returns `None` if no room is free.
+    '''
+    room = (strategy or get_assignment_strategy())(snapshot, check_in_date, check_out_date)
+    if room is not None:
+        snapshot.book(room, check_in_date, check_out_date)
+    return room
+
+
+def find_room(room_type, check_in_date, check_out_date, strategy=None):
+    '''
+    Picks a free room of the room type for a single stay with the strategy, from the database:
+    first_fit with the one NOT EXISTS ... LIMIT 1 query of find_available_room, the other
+    strategies from a snapshot of the free rooms. Returns `None` if no room is free.
+    '''
+    strategy = strategy or get_assignment_strategy()
+    if strategy is first_fit:
+        return find_available_room(room_type, check_in_date, check_out_date)
+    snapshot = AvailabilitySnapshot.load(room_type, [(check_in_date, check_out_date)])
+    return assign_room(snapshot, check_in_date, check_out_date, strategy=strategy)
@@ -0,0 +1,134 @@
+'''
+Async views of the read-heavy endpoints (availability search and catalog reads), served under ASGI.
+DRF views are sync only, so these are plain Django async views reusing the DRF serializers,
+the stateless JWT authentication and the role permissions, with the reads done by the async ORM
+so that no worker thread is held while a request waits on the database.
+'''
+from asgiref.sync import sync_to_async
+from django.contrib.auth.models import AnonymousUser
+from django.http import JsonResponse
+from django.views import View
+from rest_framework import exceptions
+from rest_framework.permissions import IsAuthenticated
+from rest_framework.settings import api_settings
+from rest_framework.utils.urls import remove_query_param, replace_query_param
+from apps.users.authentication import StatelessJWTAuthentication
+from apps.users.permissions import IsAdminRole, IsAgentRole, get_request_role_ids
+from .availability import room_type_availability
+from .models import RoomType, Room
+from .serializers import AvailabilitySearchSerializer, RoomTypeAvailabilitySerializer, RoomTypeSerializer, RoomSerializer
+
+
+class AsyncReadView(View):
+    '''
+    Base of the async GET endpoints: authenticates the bearer token without a database hit,
+    checks `permission_classes`, and renders `get_data()` or the DRF error as JSON
+    '''
+    http_method_names = ['get']
+    permission_classes = [IsAuthenticated]
+    # served by the read replicas (see hotel_reservation.db.routers)
+    replica_read_actions = ('get',)
+    authentication = StatelessJWTAuthentication()
+
+    async def get(self, request, *args, **kwargs):
+        try:
+            await self.check_permissions(request)
+            data = await self.get_data(request, *args, **kwargs)
+        except exceptions.APIException as exc:
+            return self.handle_exception(exc)
+        return JsonResponse(data, safe=False)
+
+    async def check_permissions(self, request):
+        user_token = self.authentication.authenticate(request)
+        request.user = user_token[0] if user_token else AnonymousUser()
+        # the role ids are read from the cache (or the database), out of the event loop, and
+        # memoized on the request for the permission checks below
+        await sync_to_async(get_request_role_ids)(request)
+        for permission in [permission_class() for permission_class in self.permission_classes]:
+            if not permission.has_permission(request, self):
+                if not request.user.is_authenticated:
+                    raise exceptions.NotAuthenticated()
+                raise exceptions.PermissionDenied()
+
+    async def get_data(self, request, *args, **kwargs):
+        raise NotImplementedError
+
+    def handle_exception(self, exc):
+        data = exc.detail if isinstance(exc.detail, (list, dict)) else {'detail': exc.detail}
+        response = JsonResponse(data, status=exc.status_code, safe=False)
+        if isinstance(exc, (exceptions.NotAuthenticated, exceptions.AuthenticationFailed)):
+            response['WWW-Authenticate'] = self.authentication.authenticate_header(self.request)
+        return response
+
+
+class AsyncCatalogView(AsyncReadView):
+    '''
+    Lists (paginated like PageNumberPagination) or retrieves (with a `pk` URL kwarg) the objects
+    of `queryset` serialized with `serializer_class`
+    '''
+    queryset = None
+    serializer_class = None
+    page_query_param = 'page'
+
+    async def get_data(self, request, pk=None):
+        queryset = self.queryset.all()
+        if pk is not None:
+            try:
+                obj = await queryset.aget(pk=pk)
+            except queryset.model.DoesNotExist:
+                raise exceptions.NotFound()
+            return self.serializer_class(obj).data
+        return await self.paginate(request, queryset)
+
+    async def paginate(self, request, queryset):
+        page_size = api_settings.PAGE_SIZE
+        try:
+            page = int(request.GET.get(self.page_query_param, 1))
+            if page < 1:
+                raise ValueError
+        except ValueError:
+            raise exceptions.NotFound('Invalid page.')
+        count = await queryset.acount()
+        offset = (page - 1) * page_size
+        if page > 1 and offset >= count:
+            raise exceptions.NotFound('Invalid page.')
+
+        url = request.build_absolute_uri()
+        previous_link = None
+        if page == 2:
+            previous_link = remove_query_param(url, self.page_query_param)
+        elif page > 2:
+            previous_link = replace_query_param(url, self.page_query_param, page - 1)
+        return {
+            'count': count,
+            'next': replace_query_param(url, self.page_query_param, page + 1) if offset + page_size < count else None,
+            'previous': previous_link,
+            'results': self.serializer_class([obj async for obj in queryset[offset:offset + page_size]], many=True).data,
+        }
+
+
+class AsyncRoomTypeView(AsyncCatalogView):
+    queryset = RoomType.objects.all()
+    serializer_class = RoomTypeSerializer
+
+
+class AsyncRoomView(AsyncCatalogView):
+    # room_type_info is serialized for every room
+    queryset = Room.objects.select_related('room_type')
+    serializer_class = RoomSerializer
+    permission_classes = [IsAdminRole|IsAgentRole]
+
+
+class AsyncAvailabilityView(AsyncReadView):
+    '''
+    Async counterpart of AvailabilityViewSet
+    '''
+    async def get_data(self, request):
+        search = AvailabilitySearchSerializer(data=request.GET)
+        search.is_valid(raise_exception=True)
+        queryset = room_type_availability(
+            search.validated_data['check_in'],
+            search.validated_data['check_out'],
+            search.validated_data.get('capacity')
+        )
+        return RoomTypeAvailabilitySerializer([room_type async for room_type in queryset], many=True).data
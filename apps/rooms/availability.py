@@ -0,0 +1,89 @@
+from django.db import connections
+from django.db.models import Count, Exists, F, OuterRef, Q, Value
+from .models import RoomType, Room, Reservation, RoomNight
+
+
+def filter_overlapping(queryset, check_in_date, check_out_date):
+    '''
+    Filters the reservations overlapping the half-open range [check_in_date, check_out_date),
+    so a stay may start on the same day another one ends.
+    On PostgreSQL the overlap is checked with the daterange && operator, served by the GiST index
+    of the reservation_no_overlap exclusion constraint, elsewhere with the B-tree date indexes.
+    '''
+    if connections[queryset.db].vendor == 'postgresql':
+        from .ranges import filter_stay_overlaps
+        return filter_stay_overlaps(queryset, check_in_date, check_out_date)
+    return queryset.filter(
+        check_in_date__lt=check_out_date,
+        check_out_date__gt=check_in_date
+    )
+
+
+def overlapping_reservations(check_in_date, check_out_date):
+    '''
+    Reservations overlapping the half-open range [check_in_date, check_out_date)
+    '''
+    return filter_overlapping(Reservation.objects.all(), check_in_date, check_out_date)
+
+
+def occupied_nights(check_in_date, check_out_date):
+    '''
+    Room nights booked within the half-open range [check_in_date, check_out_date),
+    looked up through the unique (room, date) index of RoomNight
+    '''
+    return RoomNight.objects.filter(date__gte=check_in_date, date__lt=check_out_date)
+
+
+def is_room_available(room, check_in_date, check_out_date, exclude_reservation=None):
+    '''
+    Returns `True` if no night of the room is booked within the date range,
+    ignoring the nights of `exclude_reservation` (the one being updated)
+    '''
+    nights = occupied_nights(check_in_date, check_out_date).filter(room=room)
+    if exclude_reservation is not None:
+        nights = nights.exclude(reservation=exclude_reservation)
+    return not nights.exists()
+
+
+def available_rooms(room_type, check_in_date, check_out_date):
+    '''
+    Rooms of the given room type without any booked night within the date range,
+    resolved in a single anti-join query (NOT EXISTS)
+    '''
+    conflicts = occupied_nights(check_in_date, check_out_date).filter(room=OuterRef('pk'))
+    return Room.objects.filter(room_type=room_type).filter(~Exists(conflicts))
+
+
+def rooms_available_for_any(room_type, stays):
+    '''
+    Rooms of the given room type free for at least one of the (check_in_date, check_out_date) stays,
+    resolved in a single query with one anti-join per stay
+    '''
+    free = Q()
+    for check_in_date, check_out_date in set(stays):
+        free |= ~Exists(occupied_nights(check_in_date, check_out_date).filter(room=OuterRef('pk')))
+    return Room.objects.filter(room_type=room_type).filter(free)
+
+
+def find_available_room(room_type, check_in_date, check_out_date):
+    '''
+    Returns the first available room of the given room type within the date range, or `None`
+    '''
+    return available_rooms(room_type, check_in_date, check_out_date).select_related('room_type').order_by('pk').first()
+
+
+def room_type_availability(check_in_date, check_out_date, capacity=None):
+    '''
+    Every room type annotated with the number of its available rooms within the date range
+    and the total price of the stay, computed with one grouped query
+    '''
+    nights = (check_out_date - check_in_date).days
+    conflicts = occupied_nights(check_in_date, check_out_date).filter(room=OuterRef('rooms'))
+    queryset = RoomType.objects.all()
+    if capacity:
+        queryset = queryset.filter(capacity__gte=capacity)
+    return queryset.annotate(
+        available_rooms=Count('rooms', filter=~Exists(conflicts)),
+        nights=Value(nights),
+        total_price=F('price_per_night') * Value(nights),
+    )
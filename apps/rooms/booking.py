@@ -0,0 +1,133 @@
+from collections import defaultdict
+from contextlib import contextmanager
+import random
+import threading
+import time
+from django.db import IntegrityError, OperationalError, connection, transaction
+from django.db.models import F
+from .assignment import AvailabilitySnapshot, assign_room, find_room
+from .models import RoomType, Reservation, RoomNight
+
+
+# how many times a booking is retried when the picked room gets booked meanwhile, or the database is locked
+BOOKING_ATTEMPTS = 3
+# seconds waited before the first retry, doubled for every next one (with some jitter)
+BOOKING_RETRY_DELAY = 0.05
+
+# fallback lock for databases without row locks (SQLite), only effective within one process.
+# SQLite has a single writer, so the bookings of all the room types are serialized.
+_sqlite_booking_lock = threading.Lock()
+
+
+class NoRoomAvailable(Exception):
+    def __init__(self, room_type):
+        super().__init__(f'Not enough rooms of type "{room_type}" available for the selected date range.')
+        self.room_type = room_type
+
+
+class BookingConflict(Exception):
+    '''
+    The booking kept conflicting with concurrent ones (or the database stayed locked) after all the attempts
+    '''
+    def __init__(self):
+        super().__init__('The booking conflicted with concurrent bookings, please try again.')
+
+
+def _backoff(attempt):
+    time.sleep(BOOKING_RETRY_DELAY * 2 ** attempt * random.uniform(0.5, 1.5))
+
+
+@contextmanager
+def room_type_lock(*room_types):
+    '''
+    Opens a transaction in which bookings of the given room types are serialized, by locking
+    the RoomType rows with SELECT ... FOR UPDATE (in primary key order to avoid deadlocks).
+    On SQLite, bookings are serialized by a per-process lock and the transaction takes the
+    database write lock with its first statement: a transaction reading first would fail at
+    once when upgrading to a write lock held by another one, instead of waiting for it.
+    '''
+    room_type_ids = sorted({room_type.pk for room_type in room_types})
+    if connection.features.has_select_for_update:
+        with transaction.atomic():
+            list(RoomType.objects.select_for_update().filter(pk__in=room_type_ids).order_by('pk').values_list('pk'))
+            yield
+    else:
+        with _sqlite_booking_lock, transaction.atomic():
+            # a no-op write, waiting up to the busy timeout of the connection for the write lock
+            RoomType.objects.filter(pk__in=room_type_ids).update(id=F('id'))
+            yield
+
+
+def book_room(room_type, check_in_date, check_out_date, user=None):
+    '''
+    Assigns an available room of the given room type, picked by the room assignment strategy,
+    and creates the reservation, returns `None` if no room is available within the date range.
+    As a last resort against a concurrent booking (e.g. from another process on SQLite),
+    the unique (room, date) constraint of RoomNight raises and the booking is retried, as well
+    as when the database is locked. Raises BookingConflict once all the attempts failed.
+    '''
+    for attempt in range(BOOKING_ATTEMPTS):
+        try:
+            with room_type_lock(room_type):
+                room = find_room(room_type, check_in_date, check_out_date)
+                if room is None:
+                    return None
+                return Reservation.objects.create(
+                    user=user,
+                    check_in_date=check_in_date,
+                    check_out_date=check_out_date,
+                    assigned_room=room
+                )
+        except (IntegrityError, OperationalError):
+            # the room got booked meanwhile, the database was locked by another writer (SQLite)
+            # or a deadlock was detected
+            if attempt < BOOKING_ATTEMPTS - 1:
+                _backoff(attempt)
+    raise BookingConflict()
+
+
+def _assign_rooms(room_type, items, user):
+    '''
+    Assigns rooms of one room type to all the given items with the room assignment strategy,
+    from a single snapshot of its rooms free for any of the items and the nights booked around them
+    '''
+    snapshot = AvailabilitySnapshot.load(room_type, [(item['check_in_date'], item['check_out_date']) for item in items])
+    reservations = []
+    for item in items:
+        for _ in range(item['count']):
+            room = assign_room(snapshot, item['check_in_date'], item['check_out_date'])
+            if room is None:
+                raise NoRoomAvailable(room_type)
+            reservations.append(Reservation(
+                user=user, check_in_date=item['check_in_date'], check_out_date=item['check_out_date'], assigned_room=room))
+    return reservations
+
+
+def book_rooms(items, user=None):
+    '''
+    Books rooms for a group, all or nothing: every item is a dict of room_type, count,
+    check_in_date and check_out_date. Availability is computed once per room type and
+    the reservations with their room nights are inserted with bulk_create.
+    Raises NoRoomAvailable if any of the items can't be fulfilled, BookingConflict if the
+    bookings kept conflicting with concurrent ones.
+    '''
+    items_by_room_type = defaultdict(list)
+    for item in items:
+        items_by_room_type[item['room_type']].append(item)
+
+    for attempt in range(BOOKING_ATTEMPTS):
+        try:
+            with room_type_lock(*items_by_room_type):
+                reservations = []
+                for room_type, room_type_items in items_by_room_type.items():
+                    reservations += _assign_rooms(room_type, room_type_items, user)
+                Reservation.objects.bulk_create(reservations)
+                RoomNight.objects.bulk_create(
+                    [night for reservation in reservations for night in reservation.build_nights()])
+                for reservation in reservations:
+                    reservation._synced_stay = reservation._stay
+                return reservations
+        except (IntegrityError, OperationalError):
+            if attempt < BOOKING_ATTEMPTS - 1:
+                _backoff(attempt)
+    raise BookingConflict()
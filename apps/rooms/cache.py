@@ -0,0 +1,119 @@
+from hashlib import sha1
+import time
+from django.conf import settings
+from django.core.cache import cache
+from django.utils.http import quote_etag
+from rest_framework.response import Response
+from hotel_reservation.conditional import ConditionalGetMixin
+
+
+# bumped whenever a RoomType or a Room changes, which invalidates every catalog entry at once
+# (room payloads embed their room type)
+CATALOG_VERSION_KEY = 'catalog:version'
+# time (in seconds) of the last version bump, the Last-Modified of the catalog responses
+CATALOG_MODIFIED_KEY = 'catalog:modified'
+CATALOG_HITS_KEY = 'catalog:hits'
+CATALOG_MISSES_KEY = 'catalog:misses'
+
+
+def _incr(key):
+    try:
+        return cache.incr(key)
+    except ValueError:
+        # missing (or evicted) key
+        cache.add(key, 0, None)
+        return cache.incr(key)
+
+
+def _get_version():
+    version = cache.get(CATALOG_VERSION_KEY)
+    if version is None:
+        cache.add(CATALOG_VERSION_KEY, 1, None)
+        version = cache.get(CATALOG_VERSION_KEY, 1)
+    return version
+
+
+def _get_modified():
+    modified = cache.get(CATALOG_MODIFIED_KEY)
+    if modified is None:
+        # unknown (evicted), the catalog may have changed just now
+        cache.add(CATALOG_MODIFIED_KEY, int(time.time()), None)
+        modified = cache.get(CATALOG_MODIFIED_KEY, int(time.time()))
+    return modified
+
+
+def get_or_set_catalog(name, key, build):
+    '''
+    Returns the cached catalog payload for the name and key, or builds and caches it on a miss
+    '''
+    cache_key = f'catalog:{_get_version()}:{name}:{key}'
+    payload = cache.get(cache_key)
+    if payload is None:
+        _incr(CATALOG_MISSES_KEY)
+        payload = build()
+        cache.set(cache_key, payload, settings.CATALOG_CACHE_TIMEOUT)
+    else:
+        _incr(CATALOG_HITS_KEY)
+    return payload
+
+
+def invalidate_catalog(**kwargs):
+    '''
+    Invalidates all the catalog entries, connected to post_save/post_delete of RoomType and Room
+    '''
+    _incr(CATALOG_VERSION_KEY)
+    cache.set(CATALOG_MODIFIED_KEY, int(time.time()), None)
+
+
+def get_catalog_cache_stats():
+    hits = cache.get(CATALOG_HITS_KEY, 0)
+    misses = cache.get(CATALOG_MISSES_KEY, 0)
+    return {
+        'hits': hits,
+        'misses': misses,
+        'hit_rate': round(hits / (hits + misses), 4) if hits + misses else None,
+    }
+
+
+def reset_catalog_cache_stats():
+    cache.delete_many([CATALOG_HITS_KEY, CATALOG_MISSES_KEY])
+
+
+class CachedCatalogMixin:
+    '''
+    Serves the list and retrieve payloads of a catalog viewset from the cache. Entries are keyed by
+    `catalog_cache_name` and the absolute URL (pagination links include the host and query params).
+    '''
+    catalog_cache_name = None
+    # filled from the primary, as a lagging replica would cache a stale payload right after an invalidation
+    replica_read_actions = ()
+
+    def list(self, request, *args, **kwargs):
+        return Response(get_or_set_catalog(
+            self.catalog_cache_name, request.build_absolute_uri(),
+            lambda: super(CachedCatalogMixin, self).list(request, *args, **kwargs).data
+        ))
+
+    def retrieve(self, request, *args, **kwargs):
+        return Response(get_or_set_catalog(
+            self.catalog_cache_name, request.build_absolute_uri(),
+            lambda: super(CachedCatalogMixin, self).retrieve(request, *args, **kwargs).data
+        ))
+
+
+class CatalogConditionalGetMixin(ConditionalGetMixin):
+    '''
+    Conditional GET of the cached catalog viewsets without any query, so that a warm cache doesn't
+    hit the database: the ETag is derived from the catalog version, bumped on every change, and the
+    URL, and Last-Modified is the time of the last change. The catalog viewsets have no object
+    permissions, so a retrieve may answer a 304 without loading the object.
+    '''
+    def get_list_validators(self, request):
+        return self.get_catalog_validators(request)
+
+    def get_retrieve_validators(self, request):
+        return self.get_catalog_validators(request)
+
+    def get_catalog_validators(self, request):
+        key = ':'.join([str(_get_version()), request.build_absolute_uri(), request.accepted_renderer.format])
+        return quote_etag(sha1(key.encode()).hexdigest()), _get_modified()
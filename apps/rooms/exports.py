@@ -0,0 +1,79 @@
+import csv
+import json
+from django.core.serializers.json import DjangoJSONEncoder
+from rest_framework import serializers
+from .models import Reservation
+
+
+EXPORT_CHUNK_SIZE = 2000
+
+# (column, lookup) of the exported reservations
+EXPORT_COLUMNS = (
+    ('id', 'id'),
+    ('user', 'user_id'),
+    ('username', 'user__username'),
+    ('room', 'assigned_room__number'),
+    ('room_type', 'assigned_room__room_type__name'),
+    ('check_in_date', 'check_in_date'),
+    ('check_out_date', 'check_out_date'),
+    ('nights', 'stay_nights'),
+    ('cost', 'stay_cost'),
+)
+
+
+class _Echo:
+    '''
+    File-like object returning what is written, so csv.writer produces the lines one by one
+    '''
+    def write(self, value):
+        return value
+
+
+def export_rows(queryset, chunk_size=EXPORT_CHUNK_SIZE):
+    '''
+    Tuples of the exported columns, fetched `chunk_size` rows at a time without building model
+    instances nor filling the queryset cache, so the memory doesn't grow with the number of rows
+    '''
+    return (
+        queryset.with_cost()
+        .order_by('-check_in_date', 'id')
+        .values_list(*(lookup for _, lookup in EXPORT_COLUMNS))
+        .iterator(chunk_size=chunk_size)
+    )
+
+
+def csv_lines(rows):
+    writer = csv.writer(_Echo())
+    yield writer.writerow([column for column, _ in EXPORT_COLUMNS])
+    for row in rows:
+        yield writer.writerow(row)
+
+
+def ndjson_lines(rows):
+    columns = [column for column, _ in EXPORT_COLUMNS]
+    for row in rows:
+        yield json.dumps(dict(zip(columns, row)), cls=DjangoJSONEncoder) + '\n'
+
+
+# output: (content type, lines generator)
+EXPORT_FORMATS = {
+    'csv': ('text/csv', csv_lines),
+    'ndjson': ('application/x-ndjson', ndjson_lines),
+}
+
+
+class ReservationExportSerializer(serializers.Serializer):
+    '''
+    Validates the output format of the export, the filters are the ones of the reservations list
+    '''
+    output = serializers.ChoiceField(choices=tuple(EXPORT_FORMATS), required=False, default='csv')
+
+
+def export_reservations(queryset=None, output='csv', chunk_size=EXPORT_CHUNK_SIZE):
+    '''
+    Lines of the reservations exported as CSV (with a header line) or NDJSON
+    '''
+    if queryset is None:
+        queryset = Reservation.objects.all()
+    _, lines = EXPORT_FORMATS[output]
+    return lines(export_rows(queryset, chunk_size))
@@ -0,0 +1,25 @@
+from django.db.models import F, Func, IntegerField
+
+
+class StayNights(Func):
+    '''
+    Number of nights between a check-in and a check-out date: check_out - check_in,
+    which is an integer number of days for dates on PostgreSQL
+    '''
+    template = '(%(expressions)s)'
+    arg_joiner = ' - '
+    arity = 2
+    output_field = IntegerField()
+
+    def __init__(self, check_in_date='check_in_date', check_out_date='check_out_date', **extra):
+        super().__init__(F(check_out_date), F(check_in_date), **extra)
+
+    def as_sqlite(self, compiler, connection, **extra_context):
+        return super().as_sql(
+            compiler, connection,
+            template='CAST(julianday(%(expressions)s) AS INTEGER)', arg_joiner=') - julianday(',
+            **extra_context
+        )
+
+    def as_mysql(self, compiler, connection, **extra_context):
+        return super().as_sql(compiler, connection, function='DATEDIFF', template='%(function)s(%(expressions)s)', arg_joiner=', ', **extra_context)
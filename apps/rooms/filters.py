@@ -0,0 +1,84 @@
+import datetime
+from rest_framework import serializers
+from .availability import filter_overlapping
+
+
+# ?ordering= values and the ordering of the queryset, ties broken by id
+ORDERINGS = {
+    'check_in_date': ('check_in_date', 'id'),
+    '-check_in_date': ('-check_in_date', 'id'),
+    'nights': ('stay_nights', 'id'),
+    '-nights': ('-stay_nights', 'id'),
+    'cost': ('stay_cost', 'id'),
+    '-cost': ('-stay_cost', 'id'),
+}
+
+
+class ReservationFilterSerializer(serializers.Serializer):
+    '''
+    Validates the query params filtering the reservations list. Related objects are filtered by id
+    without being fetched, so that the whole filtering stays within the list query.
+    '''
+    start_date = serializers.DateField(required=False)
+    end_date = serializers.DateField(required=False)
+    room_type = serializers.IntegerField(min_value=1, required=False)
+    assigned_room = serializers.IntegerField(min_value=1, required=False)
+    user = serializers.IntegerField(min_value=1, required=False)
+    active_only = serializers.BooleanField(required=False, default=False)
+    min_cost = serializers.IntegerField(min_value=0, required=False)
+    max_cost = serializers.IntegerField(min_value=0, required=False)
+    ordering = serializers.ChoiceField(choices=tuple(ORDERINGS), required=False)
+
+    def validate(self, attrs):
+        start_date = attrs.get('start_date')
+        end_date = attrs.get('end_date')
+        if start_date and end_date and start_date >= end_date:
+            raise serializers.ValidationError("Start date should be earlier than end date")
+        min_cost = attrs.get('min_cost')
+        max_cost = attrs.get('max_cost')
+        if min_cost is not None and max_cost is not None and min_cost > max_cost:
+            raise serializers.ValidationError("Min cost cannot be greater than max cost")
+        return attrs
+
+
+def filter_reservations(queryset, query_params):
+    '''
+    Applies the validated filters of the query params to the reservations queryset:
+    - start_date/end_date: reservations overlapping the [start_date, end_date) window,
+      either bound can be omitted
+    - room_type, assigned_room, user: ids of the related objects
+    - active_only: reservations not checked out yet
+    - min_cost/max_cost: bounds of the cost of the stay (both included)
+    - ordering: one of ORDERINGS, ignored by the cursor pagination which has its own ordering
+    Raises a ValidationError for invalid filters.
+    '''
+    filters = ReservationFilterSerializer(data=query_params)
+    filters.is_valid(raise_exception=True)
+    data = filters.validated_data
+
+    start_date = data.get('start_date')
+    end_date = data.get('end_date')
+    if start_date and end_date:
+        queryset = filter_overlapping(queryset, start_date, end_date)
+    elif start_date:
+        queryset = queryset.filter(check_out_date__gt=start_date)
+    elif end_date:
+        queryset = queryset.filter(check_in_date__lt=end_date)
+
+    if 'room_type' in data:
+        queryset = queryset.filter(assigned_room__room_type_id=data['room_type'])
+    if 'assigned_room' in data:
+        queryset = queryset.filter(assigned_room_id=data['assigned_room'])
+    if 'user' in data:
+        queryset = queryset.filter(user_id=data['user'])
+    if data['active_only']:
+        queryset = queryset.filter(check_out_date__gt=datetime.date.today())
+    if 'min_cost' in data or 'max_cost' in data or 'ordering' in data:
+        queryset = queryset.with_cost()
+    if 'min_cost' in data:
+        queryset = queryset.filter(stay_cost__gte=data['min_cost'])
+    if 'max_cost' in data:
+        queryset = queryset.filter(stay_cost__lte=data['max_cost'])
+    if 'ordering' in data:
+        queryset = queryset.order_by(*ORDERINGS[data['ordering']])
+    return queryset
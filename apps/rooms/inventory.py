@@ -0,0 +1,184 @@
+import csv
+import json
+from django.db import transaction
+from rest_framework import serializers
+from .cache import invalidate_catalog
+from .models import RoomType, Room
+
+
+IMPORT_BATCH_SIZE = 1000
+# errors reported at most, the import stops at the first ones
+MAX_IMPORT_ERRORS = 50
+
+# attributes of a room type, optional on the rows of an existing room type
+ROOM_TYPE_FIELDS = ('description', 'capacity', 'price_per_night')
+
+
+def csv_rows(lines):
+    '''
+    (line number, row) of the CSV lines, with a header line, empty cells left out
+    '''
+    reader = csv.DictReader(lines)
+    for row in reader:
+        yield reader.line_num, {column: value for column, value in row.items() if column and value not in ('', None)}
+
+
+def ndjson_rows(lines):
+    '''
+    (line number, row) of the NDJSON lines, one JSON object per line
+    '''
+    for line_number, line in enumerate(lines, 1):
+        if not line.strip():
+            continue
+        try:
+            row = json.loads(line)
+        except ValueError:
+            row = None
+        if not isinstance(row, dict):
+            raise serializers.ValidationError([f'line {line_number}: not a JSON object'])
+        yield line_number, row
+
+
+IMPORT_FORMATS = {
+    'csv': csv_rows,
+    'ndjson': ndjson_rows,
+}
+
+
+class InventoryRowSerializer(serializers.Serializer):
+    '''
+    One room of the inventory, with its room type (by name), or only a room type when the
+    number is left out. The attributes of an existing room type are updated when given.
+    '''
+    room_type = serializers.CharField(max_length=100)
+    number = serializers.CharField(max_length=10, required=False)
+    description = serializers.CharField(required=False)
+    capacity = serializers.IntegerField(min_value=1, max_value=10, required=False)
+    price_per_night = serializers.IntegerField(min_value=0, required=False)
+
+
+class InventoryImportSerializer(serializers.Serializer):
+    file = serializers.FileField()
+    input = serializers.ChoiceField(choices=tuple(IMPORT_FORMATS), required=False, default='csv')
+    delete = serializers.BooleanField(required=False, default=False)
+    dry_run = serializers.BooleanField(required=False, default=False)
+
+
+def _error_messages(line_number, detail):
+    return [f'line {line_number}: {field}: {" ".join(str(error) for error in errors)}' for field, errors in detail.items()]
+
+
+def read_inventory(rows):
+    '''
+    Validates the rows and merges them into ({room type name: {attribute: value}}, {room number:
+    room type name}), raising a ValidationError with the errors of the rows
+    '''
+    room_types, rooms, errors = {}, {}, []
+    for line_number, row in rows:
+        serializer = InventoryRowSerializer(data=row)
+        if not serializer.is_valid():
+            errors += _error_messages(line_number, serializer.errors)
+        else:
+            data = serializer.validated_data
+            attributes = room_types.setdefault(data['room_type'], {})
+            for field in ROOM_TYPE_FIELDS:
+                if field in data and attributes.setdefault(field, data[field]) != data[field]:
+                    errors.append(f'line {line_number}: {field}: conflicts with a previous row of room type "{data["room_type"]}"')
+            if 'number' in data and rooms.setdefault(data['number'], data['room_type']) != data['room_type']:
+                errors.append(f'line {line_number}: number: room "{data["number"]}" is already in room type "{rooms[data["number"]]}"')
+        if len(errors) >= MAX_IMPORT_ERRORS:
+            break
+    if errors:
+        raise serializers.ValidationError(errors[:MAX_IMPORT_ERRORS])
+    return room_types, rooms
+
+
+def import_inventory(lines, input='csv', delete=False, dry_run=False, batch_size=IMPORT_BATCH_SIZE):
+    '''
+    Upserts the room types (by name) and rooms (by number) of the CSV or NDJSON lines, and deletes
+    the ones left out of the file when `delete` is set. In one transaction, the file is diffed
+    against the existing rows, loaded with one query per model, and only the new and changed
+    rows are written, with bulk_create(update_conflicts=True). Rooms with reservations aren't
+    deleted. Returns the number of created, updated, unchanged and deleted rows per model.
+    '''
+    room_types, rooms = read_inventory(IMPORT_FORMATS[input](lines))
+    with transaction.atomic():
+        counts = _diff_and_apply(room_types, rooms, delete, dry_run, batch_size)
+    if not dry_run:
+        # bulk writes send no post_save signal
+        invalidate_catalog()
+    return {**counts, 'dry_run': dry_run}
+
+
+def _diff_and_apply(room_types, rooms, delete, dry_run, batch_size):
+    existing_room_types = {
+        name: (pk, dict(zip(ROOM_TYPE_FIELDS, attributes)))
+        for name, pk, *attributes in RoomType.objects.values_list('name', 'pk', *ROOM_TYPE_FIELDS)
+    }
+    existing_rooms = {number: (pk, room_type_id) for number, pk, room_type_id in Room.objects.values_list('number', 'pk', 'room_type_id')}
+
+    errors = []
+    upserted_room_types = []
+    counts = {'room_types': dict.fromkeys(('created', 'updated', 'unchanged', 'deleted'), 0)}
+    counts['rooms'] = dict(counts['room_types'])
+    for name, attributes in room_types.items():
+        if name not in existing_room_types:
+            missing = [field for field in ROOM_TYPE_FIELDS if field not in attributes]
+            if missing:
+                errors.append(f'room type "{name}": {", ".join(missing)}: required for a new room type')
+            upserted_room_types.append(RoomType(name=name, **attributes))
+            counts['room_types']['created'] += 1
+            continue
+        _, existing_attributes = existing_room_types[name]
+        if any(existing_attributes[field] != value for field, value in attributes.items()):
+            upserted_room_types.append(RoomType(name=name, **{**existing_attributes, **attributes}))
+            counts['room_types']['updated'] += 1
+        else:
+            counts['room_types']['unchanged'] += 1
+
+    room_type_ids = {name: pk for name, (pk, _) in existing_room_types.items()}
+    upserted_rooms = []
+    for number, room_type_name in rooms.items():
+        if number not in existing_rooms:
+            upserted_rooms.append((number, room_type_name))
+            counts['rooms']['created'] += 1
+        elif existing_rooms[number][1] != room_type_ids.get(room_type_name):
+            upserted_rooms.append((number, room_type_name))
+            counts['rooms']['updated'] += 1
+        else:
+            counts['rooms']['unchanged'] += 1
+
+    deleted_room_ids, deleted_room_type_ids = [], []
+    if delete:
+        deleted_room_ids = [pk for number, (pk, _) in existing_rooms.items() if number not in rooms]
+        deleted_room_type_ids = [pk for name, (pk, _) in existing_room_types.items() if name not in room_types]
+        booked_rooms = (
+            Room.objects.filter(pk__in=deleted_room_ids, reservations__isnull=False)
+            .distinct().order_by('number').values_list('number', flat=True)
+        )
+        errors += [f'room "{number}": has reservations, it can\'t be deleted' for number in booked_rooms[:MAX_IMPORT_ERRORS]]
+        counts['rooms']['deleted'] = len(deleted_room_ids)
+        counts['room_types']['deleted'] = len(deleted_room_type_ids)
+    if errors:
+        raise serializers.ValidationError(errors[:MAX_IMPORT_ERRORS])
+
+    if not dry_run:
+        _apply(upserted_room_types, upserted_rooms, deleted_room_ids, deleted_room_type_ids, batch_size)
+    return counts
+
+
+def _apply(upserted_room_types, upserted_rooms, deleted_room_ids, deleted_room_type_ids, batch_size):
+    RoomType.objects.bulk_create(
+        upserted_room_types, batch_size=batch_size,
+        update_conflicts=True, unique_fields=['name'], update_fields=[*ROOM_TYPE_FIELDS, 'updated_at'],
+    )
+    # the ids of the upserted room types aren't returned by every database
+    room_type_ids = dict(RoomType.objects.values_list('name', 'pk'))
+    Room.objects.bulk_create(
+        [Room(number=number, room_type_id=room_type_ids[room_type_name]) for number, room_type_name in upserted_rooms],
+        batch_size=batch_size, update_conflicts=True, unique_fields=['number'], update_fields=['room_type', 'updated_at'],
+    )
+    if deleted_room_ids:
+        Room.objects.filter(pk__in=deleted_room_ids).delete()
+    if deleted_room_type_ids:
+        RoomType.objects.filter(pk__in=deleted_room_type_ids).delete()
@@ -0,0 +1,168 @@
+import datetime
+import json
+import os
+import random
+import tempfile
+import threading
+from django.contrib.auth import get_user_model
+from django.contrib.auth.models import Group
+from django.core.cache import cache
+from django.core.management.base import BaseCommand
+from django.core.servers.basehttp import ThreadedWSGIServer, WSGIRequestHandler, get_internal_wsgi_application
+from django.db import connections
+from django.test.utils import override_settings, setup_databases, teardown_databases
+from hotel_reservation.loadtest import run_load
+from apps.rooms.models import RoomType, Room, Reservation
+from apps.rooms.seeding import seed_hotel
+from apps.users.constants import AGENT_USER
+from apps.users.permissions import clear_role_ids_cache
+from apps.users.serializers import RoleTokenObtainPairSerializer
+
+
+User = get_user_model()
+
+ENDPOINTS = (
+    'catalog',
+    'availability',
+    'reservation_create',
+    'reservations_list',
+    'reservation_dates_update',
+    'reservation_room_update',
+)
+
+
+class QuietWSGIRequestHandler(WSGIRequestHandler):
+    def log_message(self, *args):
+        pass
+
+
+class Command(BaseCommand):
+    help = (
+        'Seeds a dataset in a test database, drives the main endpoints with concurrent clients '
+        'against an in-process threaded server and reports the latency percentiles, requests/second '
+        'and queries/request of every endpoint as JSON'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--room-types', type=int, default=10)
+        parser.add_argument('--rooms', type=int, default=200)
+        parser.add_argument('--users', type=int, default=100, help='number of guests')
+        parser.add_argument('--reservations', type=int, default=2000)
+        parser.add_argument('--requests', type=int, default=500, help='number of requests per endpoint')
+        parser.add_argument('--concurrency', type=int, default=20, help='number of concurrent clients')
+        parser.add_argument('--seed', type=int, default=0, help='seed of the dataset and of the requests')
+        parser.add_argument('--endpoints', nargs='+', choices=ENDPOINTS, default=ENDPOINTS)
+        parser.add_argument('--output', help='file to write the JSON report to, the standard output by default')
+
+    def handle(self, *args, **options):
+        '''
+        The test database is created from the configured one (a temporary file on SQLite, so that
+        the server threads share it) and destroyed at the end. The request instrumentation
+        middleware is enabled to count the queries of every request.
+        '''
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            connection = connections['default']
+            if connection.vendor == 'sqlite':
+                connection.settings_dict['TEST']['NAME'] = os.path.join(tmp_dir, 'bench.sqlite3')
+            old_config = setup_databases(verbosity=0, interactive=False, aliases={'default'})
+            try:
+                with override_settings(
+                    DEBUG=False,
+                    ALLOWED_HOSTS=['127.0.0.1'],
+                    REQUEST_INSTRUMENTATION={'ENABLED': True, 'QUERY_BUDGET': 1000, 'LATENCY_BUDGET_MS': 60 * 1000},
+                ):
+                    report = self._bench(options)
+            finally:
+                teardown_databases(old_config, verbosity=0)
+
+        output = json.dumps(report, indent=2)
+        if options['output']:
+            with open(options['output'], 'w') as f:
+                f.write(output)
+        else:
+            self.stdout.write(output)
+
+    def _bench(self, options):
+        cache.clear()
+        clear_role_ids_cache()
+        dataset = seed_hotel(
+            room_types=options['room_types'], rooms=options['rooms'], users=options['users'],
+            reservations=options['reservations'], seed=options['seed'],
+        )
+        agent_role, _ = Group.objects.get_or_create(name=AGENT_USER)
+        self.agent = User.objects.create(username='bench-agent', email='bench.agent@example.com', role=agent_role)
+        self.guest = User.objects.filter(username__startswith='seed-guest-').first()
+        tokens = {
+            user: f'Bearer {RoleTokenObtainPairSerializer.get_token(user).access_token}' for user in (self.agent, self.guest)
+        }
+
+        server = ThreadedWSGIServer(('127.0.0.1', 0), QuietWSGIRequestHandler, allow_reuse_address=False)
+        server.set_app(get_internal_wsgi_application())
+        thread = threading.Thread(target=server.serve_forever, daemon=True)
+        thread.start()
+        try:
+            url = f'http://127.0.0.1:{server.server_address[1]}'
+            results = {}
+            for endpoint in options['endpoints']:
+                user, requests = getattr(self, f'_{endpoint}_requests')(random.Random(options['seed']), options['requests'])
+                results[endpoint] = run_load(url, requests, options['concurrency'], {'Authorization': tokens[user]}).summary()
+                results[endpoint]['user'] = user.username
+        finally:
+            server.shutdown()
+            server.server_close()
+
+        return {
+            'config': {name: options[name] for name in ('requests', 'concurrency', 'seed')},
+            'database': connections['default'].vendor,
+            'dataset': dataset,
+            'results': results,
+        }
+
+    # (user, [(method, path, data)]) of every endpoint
+    def _catalog_requests(self, rng, count):
+        return self.guest, [('GET', '/api/v1/roomtypes/', None)] * count
+
+    def _availability_requests(self, rng, count):
+        requests = []
+        for _ in range(count):
+            check_in_date = datetime.date.today() + datetime.timedelta(days=rng.randint(1, 300))
+            check_out_date = check_in_date + datetime.timedelta(days=rng.randint(1, 7))
+            requests.append(('GET', f'/api/v1/availability/?check_in={check_in_date}&check_out={check_out_date}', None))
+        return self.guest, requests
+
+    def _reservation_create_requests(self, rng, count):
+        room_type_ids = list(RoomType.objects.values_list('pk', flat=True))
+        requests = []
+        for _ in range(count):
+            check_in_date = datetime.date.today() + datetime.timedelta(days=rng.randint(1, 300))
+            requests.append(('POST', '/api/v1/reservation/', {
+                'user': self.guest.pk,
+                'check_in_date': str(check_in_date),
+                'check_out_date': str(check_in_date + datetime.timedelta(days=rng.randint(1, 7))),
+                'selected_room_type': rng.choice(room_type_ids),
+            }))
+        return self.guest, requests
+
+    def _reservations_list_requests(self, rng, count):
+        pages = max(1, Reservation.objects.count() // 10)
+        return self.agent, [('GET', f'/api/v1/reservations/?page={rng.randint(1, pages)}', None) for _ in range(count)]
+
+    def _reservation_dates_update_requests(self, rng, count):
+        reservations = list(Reservation.objects.values_list('pk', 'check_in_date', 'check_out_date'))
+        requests = []
+        for _ in range(count):
+            pk, check_in_date, check_out_date = rng.choice(reservations)
+            shift = datetime.timedelta(days=rng.randint(-2, 2))
+            requests.append(('PUT', f'/api/v1/updatereservationdates/{pk}/', {
+                'check_in_date': str(check_in_date + shift), 'check_out_date': str(check_out_date + shift)
+            }))
+        return self.agent, requests
+
+    def _reservation_room_update_requests(self, rng, count):
+        reservation_ids = list(Reservation.objects.values_list('pk', flat=True))
+        room_ids = list(Room.objects.values_list('pk', flat=True))
+        return self.agent, [
+            ('PUT', f'/api/v1/updatereservationroom/{rng.choice(reservation_ids)}/', {'assigned_room': rng.choice(room_ids)})
+            for _ in range(count)
+        ]
+
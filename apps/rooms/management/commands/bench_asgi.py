@@ -0,0 +1,112 @@
+import datetime
+import json
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.contrib.auth.models import Group
+from django.core.management.base import BaseCommand, CommandError
+from hotel_reservation.loadtest import run_load
+from apps.users.constants import GUEST_USER
+from apps.users.serializers import RoleTokenObtainPairSerializer
+
+
+User = get_user_model()
+
+SERVER_START_TIMEOUT = 30
+
+
+def _free_port():
+    with socket.socket() as s:
+        s.bind(('127.0.0.1', 0))
+        return s.getsockname()[1]
+
+
+class Command(BaseCommand):
+    help = (
+        'Compares the throughput of the availability search and the room types list under WSGI '
+        '(sync DRF views) and ASGI (sync DRF views and async views) with concurrent clients. '
+        'The servers are started with gunicorn (gthread workers for WSGI, uvicorn workers for ASGI) '
+        'on the configured database unless their URLs are given.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--concurrency', type=int, default=200, help='number of concurrent clients')
+        parser.add_argument('--requests', type=int, default=4000, help='number of requests per endpoint and server')
+        parser.add_argument('--workers', type=int, default=2, help='worker processes of the started servers')
+        parser.add_argument('--threads', type=int, default=4, help='threads per WSGI worker of the started servers')
+        parser.add_argument('--wsgi-url', help='URL of a running WSGI server, e.g. http://127.0.0.1:8000')
+        parser.add_argument('--asgi-url', help='URL of a running ASGI server, e.g. http://127.0.0.1:8001')
+        parser.add_argument('--json', action='store_true', help='print the results as JSON')
+
+    def handle(self, *args, **options):
+        headers = {'Authorization': f'Bearer {self._access_token()}'}
+        check_in_date = datetime.date.today() + datetime.timedelta(days=30)
+        dates = f'check_in={check_in_date}&check_out={check_in_date + datetime.timedelta(days=3)}'
+        endpoints = {
+            'availability': ('/api/v1/availability/?' + dates, '/api/v1/async/availability/?' + dates),
+            'roomtypes': ('/api/v1/roomtypes/', '/api/v1/async/roomtypes/'),
+        }
+
+        processes = []
+        try:
+            wsgi_url = options['wsgi_url'] or self._start_server(processes, [
+                'hotel_reservation.wsgi:application', '--worker-class', 'gthread', '--threads', str(options['threads']),
+            ], options['workers'])
+            asgi_url = options['asgi_url'] or self._start_server(processes, [
+                'hotel_reservation.asgi:application', '--worker-class', 'uvicorn.workers.UvicornWorker',
+            ], options['workers'])
+
+            results = []
+            for endpoint, (sync_path, async_path) in endpoints.items():
+                for server, url, path in (
+                    ('wsgi', wsgi_url, sync_path),
+                    ('asgi', asgi_url, sync_path),
+                    ('asgi', asgi_url, async_path),
+                ):
+                    requests = [('GET', path, None)] * options['requests']
+                    summary = run_load(url, requests, options['concurrency'], headers).summary()
+                    results.append({'endpoint': endpoint, 'server': server, 'path': path.split('?')[0], **summary})
+        finally:
+            for process in processes:
+                process.terminate()
+                process.wait()
+
+        if options['json']:
+            self.stdout.write(json.dumps({'concurrency': options['concurrency'], 'results': results}, indent=2))
+            return
+        for result in results:
+            self.stdout.write(
+                f"{result['endpoint']:<13} {result['server']} {result['path']:<28} "
+                f"{result['requests_per_second']} requests/second, p50 {result['p50_ms']}ms, "
+                f"p99 {result['p99_ms']}ms, {result['errors']} errors, statuses {result['statuses']}"
+            )
+
+    def _access_token(self):
+        role, _ = Group.objects.get_or_create(name=GUEST_USER)
+        user, _ = User.objects.get_or_create(username='bench-user', defaults={'email': 'bench.user@example.com', 'role': role})
+        return str(RoleTokenObtainPairSerializer.get_token(user).access_token)
+
+    def _start_server(self, processes, args, workers):
+        port = _free_port()
+        # a file rather than a pipe, which would block the server once full
+        stderr = tempfile.TemporaryFile()
+        process = subprocess.Popen(
+            [sys.executable, '-m', 'gunicorn', *args, '--bind', f'127.0.0.1:{port}', '--workers', str(workers), '--log-level', 'warning'],
+            cwd=settings.BASE_DIR.parent, stdout=subprocess.DEVNULL, stderr=stderr,
+        )
+        processes.append(process)
+        deadline = time.monotonic() + SERVER_START_TIMEOUT
+        while time.monotonic() < deadline:
+            if process.poll() is not None:
+                stderr.seek(0)
+                raise CommandError(f'The server could not be started: {stderr.read().decode()}')
+            try:
+                socket.create_connection(('127.0.0.1', port), timeout=1).close()
+                return f'http://127.0.0.1:{port}'
+            except OSError:
+                time.sleep(0.2)
+        raise CommandError(f'The server did not start within {SERVER_START_TIMEOUT} seconds')
@@ -0,0 +1,109 @@
+import datetime
+import json
+import time
+import numpy as np
+from django.core.management.base import BaseCommand, CommandError
+from apps.rooms.assignment import ASSIGNMENT_STRATEGIES, AvailabilitySnapshot, assign_room
+from apps.rooms.models import Room
+from apps.rooms.seeding import MEAN_STAY_NIGHTS, STAY_NIGHTS, STAY_NIGHTS_WEIGHTS, demand_curve
+
+
+# stays of this many nights or more are counted as long stays
+LONG_STAY_NIGHTS = 7
+
+
+class Command(BaseCommand):
+    help = (
+        'Simulates the booking requests of one room type over --days days, in memory, with every room '
+        'assignment strategy, and reports the occupancy achieved, the rejected (long) stays, the one-night '
+        'gaps left and the decision time per booking. The requests are the same for all the strategies: '
+        'stay lengths and check-in days drawn like the synthetic dataset, arriving in random order.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rooms', type=int, default=50)
+        parser.add_argument('--days', type=int, default=90)
+        parser.add_argument(
+            '--demand', type=float, default=1.2,
+            help='room nights requested, relative to the room nights available')
+        parser.add_argument('--strategies', nargs='+', choices=tuple(ASSIGNMENT_STRATEGIES), default=tuple(ASSIGNMENT_STRATEGIES))
+        parser.add_argument('--seed', type=int, default=0)
+        parser.add_argument('--json', action='store_true', help='print the results as JSON')
+
+    def handle(self, *args, **options):
+        for name in ('rooms', 'days', 'demand'):
+            if options[name] <= 0:
+                raise CommandError(f'Invalid --{name}: {options[name]}')
+
+        start_date = datetime.date.today()
+        requests = self._requests(np.random.default_rng(options['seed']), options, start_date)
+        results = {
+            name: self._simulate(ASSIGNMENT_STRATEGIES[name], requests, options, start_date)
+            for name in options['strategies']
+        }
+
+        if options['json']:
+            self.stdout.write(json.dumps({
+                'rooms': options['rooms'], 'days': options['days'], 'requests': len(requests), 'results': results
+            }, indent=2))
+            return
+        for name, result in results.items():
+            self.stdout.write(
+                f"{name:<11} occupancy {result['occupancy']:.1%}, {result['rejected']} rejected "
+                f"({result['rejected_long_stays']} long stays), {result['one_night_gaps']} one-night gaps, "
+                f"decision p50 {result['decision_p50_us']}us, p99 {result['decision_p99_us']}us"
+            )
+
+    @staticmethod
+    def _requests(rng, options, start_date):
+        '''
+        (check-in date, check-out date) of the booking requests, in arrival order
+        '''
+        days = options['days']
+        count = int(options['demand'] * options['rooms'] * days / MEAN_STAY_NIGHTS)
+        nights = rng.choice(STAY_NIGHTS, size=count, p=STAY_NIGHTS_WEIGHTS)
+        demand = demand_curve(start_date, days)
+        check_ins = rng.choice(days, size=count, p=demand / demand.sum())
+        # the stays end within the simulated days
+        check_ins = np.minimum(check_ins, np.maximum(days - nights, 0))
+        return [
+            (start_date + datetime.timedelta(days=check_in), start_date + datetime.timedelta(days=min(check_in + length, days)))
+            for check_in, length in zip(check_ins.tolist(), nights.tolist())
+        ]
+
+    @staticmethod
+    def _simulate(strategy, requests, options, start_date):
+        rooms = [Room(pk=pk, number=str(pk)) for pk in range(1, options['rooms'] + 1)]
+        snapshot = AvailabilitySnapshot(rooms, [], start_date, start_date + datetime.timedelta(days=options['days']))
+        decision_times = []
+        booked_nights = rejected = rejected_long_stays = 0
+        for check_in_date, check_out_date in requests:
+            started_at = time.perf_counter()
+            room = assign_room(snapshot, check_in_date, check_out_date, strategy=strategy)
+            decision_times.append(time.perf_counter() - started_at)
+            nights = (check_out_date - check_in_date).days
+            if room is not None:
+                booked_nights += nights
+            else:
+                rejected += 1
+                rejected_long_stays += nights >= LONG_STAY_NIGHTS
+
+        # single free nights between two booked ones, which no stay can fill anymore
+        one_night_gaps = 0
+        for room in rooms:
+            for day in range(1, options['days'] - 1):
+                night = (start_date + datetime.timedelta(days=day), start_date + datetime.timedelta(days=day + 1))
+                if snapshot.is_free(room, *night) and snapshot.gaps(room, *night) == (0, 0):
+                    one_night_gaps += 1
+
+        decision_times = np.array(decision_times) * 1e6
+        return {
+            'occupancy': round(booked_nights / (options['rooms'] * options['days']), 4),
+            'booked': len(requests) - rejected,
+            'rejected': rejected,
+            'rejected_long_stays': rejected_long_stays,
+            'one_night_gaps': one_night_gaps,
+            'decision_mean_us': round(float(decision_times.mean()), 1),
+            'decision_p50_us': round(float(np.percentile(decision_times, 50)), 1),
+            'decision_p99_us': round(float(np.percentile(decision_times, 99)), 1),
+        }
@@ -0,0 +1,120 @@
+from concurrent.futures import ThreadPoolExecutor
+import datetime
+import json
+import os
+import random
+import tempfile
+import time
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, connections
+from django.test.utils import setup_databases, teardown_databases
+from apps.rooms.booking import BookingConflict, book_room
+from apps.rooms.models import RoomType, Room, Reservation
+
+
+class Command(BaseCommand):
+    help = (
+        'Fires parallel bookings at a small room pool in a test database, like the booking stress tests, '
+        'and reports the bookings/second, the requests refused (no room free) or given up after the '
+        'retries (conflicts), and checks that no room got double booked'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--room-types', type=int, default=1)
+        parser.add_argument('--rooms', type=int, default=3, help='number of rooms per room type')
+        parser.add_argument('--threads', type=int, default=8, help='number of concurrent booking threads')
+        parser.add_argument('--bookings', type=int, default=50, help='number of booking requests per thread')
+        parser.add_argument('--days', type=int, default=30, help='days over which the stays are spread')
+        parser.add_argument('--seed', type=int, default=0)
+        parser.add_argument('--json', action='store_true', help='print the results as JSON')
+
+    def handle(self, *args, **options):
+        '''
+        The test database is created from the configured one (a temporary file on SQLite, so that
+        the threads share it) and destroyed at the end
+        '''
+        for name in ('room_types', 'rooms', 'threads', 'bookings', 'days'):
+            if options[name] <= 0:
+                raise CommandError(f'Invalid --{name.replace("_", "-")}: {options[name]}')
+
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            if connection.vendor == 'sqlite':
+                connection.settings_dict['TEST']['NAME'] = os.path.join(tmp_dir, 'bench.sqlite3')
+            old_config = setup_databases(verbosity=0, interactive=False, aliases={'default'})
+            try:
+                result = self._bench(options)
+            finally:
+                teardown_databases(old_config, verbosity=0)
+
+        if options['json']:
+            self.stdout.write(json.dumps(result, indent=2))
+            return
+        self.stdout.write(
+            f"{result['booked']} booked, {result['refused']} refused, {result['conflicts']} conflicts, "
+            f"{result['errors']} errors in {result['elapsed_s']}s: {result['bookings_per_second']} bookings/second, "
+            f"{result['requests_per_second']} requests/second, {result['overlaps']} overlaps"
+        )
+
+    def _bench(self, options):
+        room_types = [
+            RoomType.objects.create(name=f'Bench Room {i}', description='A room type', capacity=2, price_per_night=80)
+            for i in range(options['room_types'])
+        ]
+        Room.objects.bulk_create([
+            Room(number=f'{room_type.pk}-{i}', room_type=room_type) for room_type in room_types for i in range(options['rooms'])
+        ])
+        first_date = datetime.date.today() + datetime.timedelta(days=30)
+        rng = random.Random(options['seed'])
+        # (room type, check-in date, check-out date) of the requests of every thread, stays of 1 to 3 nights
+        requests = [
+            [
+                (rng.choice(room_types), check_in_date, check_in_date + datetime.timedelta(days=rng.randint(1, 3)))
+                for check_in_date in [first_date + datetime.timedelta(days=rng.randrange(options['days'])) for _ in range(options['bookings'])]
+            ]
+            for _ in range(options['threads'])
+        ]
+
+        def worker(thread_requests):
+            counts = {'booked': 0, 'refused': 0, 'conflicts': 0, 'errors': 0}
+            try:
+                for room_type, check_in_date, check_out_date in thread_requests:
+                    try:
+                        booked = book_room(room_type, check_in_date, check_out_date)
+                    except BookingConflict:
+                        counts['conflicts'] += 1
+                    except Exception:
+                        counts['errors'] += 1
+                    else:
+                        counts['booked' if booked else 'refused'] += 1
+            finally:
+                connections['default'].close()
+            return counts
+
+        started_at = time.perf_counter()
+        with ThreadPoolExecutor(options['threads']) as executor:
+            counts = list(executor.map(worker, requests))
+        elapsed = time.perf_counter() - started_at
+
+        result = {name: sum(thread_counts[name] for thread_counts in counts) for name in counts[0]}
+        result.update({
+            'vendor': connection.vendor,
+            'threads': options['threads'],
+            'elapsed_s': round(elapsed, 3),
+            'bookings_per_second': round(result['booked'] / elapsed, 1),
+            'requests_per_second': round(options['threads'] * options['bookings'] / elapsed, 1),
+            'overlaps': self._overlaps(),
+        })
+        return result
+
+    @staticmethod
+    def _overlaps():
+        '''
+        Reservations starting before the previous one of the same room ends
+        '''
+        overlaps = 0
+        previous = None
+        for reservation in Reservation.objects.order_by('assigned_room', 'check_in_date').only('assigned_room', 'check_in_date', 'check_out_date'):
+            if previous is not None and previous.assigned_room_id == reservation.assigned_room_id:
+                overlaps += previous.check_out_date > reservation.check_in_date
+            previous = reservation
+        return overlaps
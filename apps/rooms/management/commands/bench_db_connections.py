@@ -0,0 +1,98 @@
+from concurrent.futures import ThreadPoolExecutor
+import copy
+import json
+import time
+from django.core.management.base import BaseCommand, CommandError
+from django.db import DEFAULT_DB_ALIAS, connections
+from django.db.utils import ConnectionHandler
+from hotel_reservation.db.pool import close_pools, get_pools_stats
+from hotel_reservation.loadtest import LoadResult
+
+
+# name: (settings of the mode, vendors supporting it)
+MODES = {
+    'new': ({'CONN_MAX_AGE': 0}, None),
+    'persistent': ({'CONN_MAX_AGE': 600}, None),
+    'pool': ({'CONN_MAX_AGE': 0, 'ENGINE': 'hotel_reservation.db.postgresql_pool'}, ('postgresql',)),
+}
+
+
+class Command(BaseCommand):
+    help = (
+        'Compares the per-request database latency of a new connection per request (CONN_MAX_AGE = 0), '
+        'persistent connections and the connection pool. Every request opens or checks out a connection '
+        'like a request does (closing the old ones at its start and its end) and runs --query.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--database', default=DEFAULT_DB_ALIAS)
+        parser.add_argument('--requests', type=int, default=1000, help='number of requests per mode')
+        parser.add_argument('--threads', type=int, default=4, help='number of concurrent worker threads')
+        parser.add_argument('--query', default='SELECT 1', help='query run by every request')
+        parser.add_argument('--modes', nargs='+', choices=tuple(MODES), default=tuple(MODES))
+        parser.add_argument('--json', action='store_true', help='print the results as JSON')
+
+    def handle(self, *args, **options):
+        if options['database'] not in connections:
+            raise CommandError(f'Unknown database: {options["database"]}')
+        settings_dict = connections[options['database']].settings_dict
+        vendor = connections[options['database']].vendor
+
+        results = {}
+        for mode in options['modes']:
+            mode_settings, vendors = MODES[mode]
+            if vendors and vendor not in vendors:
+                self.stderr.write(f'Skipping {mode}, not supported by {vendor}')
+                continue
+            # connections of their own, apart from the ones of the command
+            handler = ConnectionHandler({
+                DEFAULT_DB_ALIAS: {**copy.deepcopy(settings_dict), 'POOL': {'MAX_SIZE': options['threads']}, **mode_settings}
+            })
+            try:
+                results[mode] = self._run(handler[DEFAULT_DB_ALIAS].alias, handler, options)
+                if mode == 'pool':
+                    results[mode]['pool'] = get_pools_stats()
+            finally:
+                close_pools()
+
+        if options['json']:
+            self.stdout.write(json.dumps({'vendor': vendor, 'threads': options['threads'], 'results': results}, indent=2))
+            return
+        for mode, result in results.items():
+            self.stdout.write(
+                f"{mode:<11} {result['requests_per_second']} requests/second, p50 {result['p50_ms']}ms, "
+                f"p95 {result['p95_ms']}ms, p99 {result['p99_ms']}ms, {result['errors']} errors"
+            )
+
+    def _run(self, alias, handler, options):
+        result = LoadResult()
+
+        def request(_):
+            # request_started and request_finished close the connections that are obsolete
+            started_at = time.perf_counter()
+            try:
+                handler[alias].close_if_unusable_or_obsolete()
+                with handler[alias].cursor() as cursor:
+                    cursor.execute(options['query'])
+                    cursor.fetchall()
+                handler[alias].close_if_unusable_or_obsolete()
+            except Exception:
+                result.errors += 1
+                return
+            result.latencies.append(time.perf_counter() - started_at)
+
+        def worker(count):
+            try:
+                for i in range(count):
+                    request(i)
+            finally:
+                handler[alias].close()
+
+        started_at = time.perf_counter()
+        threads = options['threads']
+        with ThreadPoolExecutor(threads) as executor:
+            list(executor.map(worker, [options['requests'] // threads + (i < options['requests'] % threads) for i in range(threads)]))
+        result.elapsed = time.perf_counter() - started_at
+        summary = result.summary()
+        del summary['queries_per_request'], summary['statuses']
+        return summary
@@ -50,9 +50,10 @@ class Command(BaseCommand):
                 ]
             }
         ]
+        # idempotent, the room types and rooms are matched by their unique name and number
         for d in data:
             rooms_data = d.pop('rooms')
-            rt = RoomType.objects.create(**d)
+            rt, created = RoomType.objects.update_or_create(name=d.pop('name'), defaults=d)
             for r in rooms_data:
-                Room.objects.create(room_type=rt, **r)
-            self.stdout.write(self.style.SUCCESS((f'Room Type "{rt}" has been created successfully, and {len(rooms_data)} rooms have been added to it.')))
\ No newline at end of file
+                Room.objects.update_or_create(number=r.pop('number'), defaults={'room_type': rt, **r})
+            self.stdout.write(self.style.SUCCESS((f'Room Type "{rt}" has been {"created" if created else "updated"} successfully, and {len(rooms_data)} rooms have been added to it.')))
\ No newline at end of file
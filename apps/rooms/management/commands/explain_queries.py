@@ -0,0 +1,127 @@
+import datetime
+import re
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from apps.rooms.availability import available_rooms, occupied_nights, overlapping_reservations, room_type_availability
+from apps.rooms.models import Reservation
+from apps.rooms.views import GetReservationViewSet
+from hotel_reservation.pagination import KeysetPagination
+
+
+# index usage and full table scans in SQLite and PostgreSQL plans
+INDEX_PATTERNS = (
+    re.compile(r'USING (?:COVERING |INTEGER PRIMARY KEY)?(?:INDEX )?(\w+)?'),
+    re.compile(r'Index (?:Only )?Scan (?:Backward )?using (\w+)'),
+    re.compile(r'Bitmap Index Scan on (\w+)'),
+)
+# full scans: a SQLite SCAN (as opposed to SEARCH), with or without an index, and a PostgreSQL
+# sequential scan, or an index scan walking the whole index (no Index Cond)
+FULL_SCAN_PATTERNS = (
+    re.compile(r'\bSCAN (\w+)'),
+    re.compile(r'Seq Scan on (\w+)'),
+)
+INDEX_SCAN_PATTERN = re.compile(r'^(\s*)(?:->\s*)?Index (?:Only )?Scan (?:Backward )?using \w+ on (\w+)')
+
+
+def full_scans(plan):
+    '''
+    Tables fully scanned by the plan
+    '''
+    tables = {match for pattern in FULL_SCAN_PATTERNS for match in pattern.findall(plan)}
+    lines = plan.splitlines()
+    for i, line in enumerate(lines):
+        match = INDEX_SCAN_PATTERN.match(line)
+        if not match:
+            continue
+        # the details of the node are the next lines, indented deeper than it
+        indent = len(match.group(1))
+        details = []
+        for detail in lines[i + 1:]:
+            if len(detail) - len(detail.lstrip()) <= indent or detail.lstrip().startswith('->'):
+                break
+            details.append(detail)
+        if not any('Index Cond:' in detail for detail in details):
+            tables.add(match.group(2))
+    return tables
+
+
+def hot_queries():
+    '''
+    The hot queries of the API as (name, queryset, tables which should not be fully scanned)
+    '''
+    check_in_date = datetime.date.today()
+    check_out_date = check_in_date + datetime.timedelta(days=3)
+    # a page of the reservations list after the cursor position, in the order of the list
+    ordering = GetReservationViewSet.keyset_ordering
+    list_page = Reservation.objects.order_by(*ordering).filter(KeysetPagination._after(ordering, [check_out_date, 1]))
+    return [
+        (
+            'availability of a room type',
+            available_rooms(1, check_in_date, check_out_date),
+            ('rooms_roomnight',),
+        ),
+        (
+            'availability search per room type',
+            room_type_availability(check_in_date, check_out_date),
+            ('rooms_roomnight',),
+        ),
+        (
+            'room nights of a room',
+            occupied_nights(check_in_date, check_out_date).filter(room=1),
+            ('rooms_roomnight',),
+        ),
+        (
+            'overlapping reservations of a room',
+            overlapping_reservations(check_in_date, check_out_date).filter(assigned_room=1),
+            ('rooms_reservation',),
+        ),
+        (
+            'reservations list cursor page',
+            list_page[:10],
+            ('rooms_reservation',),
+        ),
+        (
+            'reservations list cursor page filtered by check-out date',
+            list_page.filter(check_out_date__gt=check_in_date)[:10],
+            ('rooms_reservation',),
+        ),
+        (
+            'reservations of a user',
+            Reservation.objects.filter(user=1).order_by('-check_in_date'),
+            ('rooms_reservation',),
+        ),
+    ]
+
+
+class Command(BaseCommand):
+    help = 'Runs EXPLAIN on the hot queries and reports whether they are served by an index'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--verbose-plans', action='store_true', help='print the full plan of every query')
+        parser.add_argument('--strict', action='store_true', help='fail if any hot query does a full table scan')
+
+    def handle(self, *args, **options):
+        '''
+        On PostgreSQL sequential scans are disabled for the transaction, so that the report shows
+        whether an index can serve the query even if the tables are still small
+        '''
+        regressions = []
+        with transaction.atomic():
+            if connection.vendor == 'postgresql':
+                with connection.cursor() as cursor:
+                    cursor.execute('SET LOCAL enable_seqscan = off')
+
+            for name, queryset, tables in hot_queries():
+                plan = queryset.explain()
+                indexes = sorted({match for pattern in INDEX_PATTERNS for match in pattern.findall(plan) if match})
+                scanned = sorted(full_scans(plan) & set(tables))
+                if scanned:
+                    regressions.append(name)
+                    self.stdout.write(self.style.ERROR(f'{name}: full scan of {", ".join(scanned)}'))
+                else:
+                    self.stdout.write(self.style.SUCCESS(f'{name}: uses {", ".join(indexes) or "no index"}'))
+                if options['verbose_plans']:
+                    self.stdout.write(plan)
+
+        if regressions and options['strict']:
+            raise CommandError(f'{len(regressions)} hot queries are not served by an index: {", ".join(regressions)}')
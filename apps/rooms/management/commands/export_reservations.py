@@ -0,0 +1,39 @@
+from django.core.management.base import BaseCommand, CommandError
+from rest_framework.exceptions import ValidationError
+from apps.rooms.exports import EXPORT_CHUNK_SIZE, EXPORT_FORMATS, export_reservations
+from apps.rooms.filters import filter_reservations
+from apps.rooms.models import Reservation
+
+
+class Command(BaseCommand):
+    help = 'Streams the reservations as CSV or NDJSON with the filters of the reservations list'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--output', choices=tuple(EXPORT_FORMATS), default='csv', help='output format')
+        parser.add_argument('--file', help='file to write to, the standard output by default')
+        parser.add_argument('--chunk-size', type=int, default=EXPORT_CHUNK_SIZE, help='rows fetched at a time')
+        parser.add_argument('--start-date', help='reservations overlapping the window starting at this date')
+        parser.add_argument('--end-date', help='reservations overlapping the window ending at this date (excluded)')
+        parser.add_argument('--room-type', help='id of the room type')
+        parser.add_argument('--assigned-room', help='id of the room')
+        parser.add_argument('--user', help='id of the user')
+        parser.add_argument('--active-only', action='store_true', help='reservations not checked out yet')
+
+    def handle(self, *args, **options):
+        filters = {
+            name: options[name] for name in ('start_date', 'end_date', 'room_type', 'assigned_room', 'user')
+            if options[name] is not None
+        }
+        filters['active_only'] = options['active_only']
+        try:
+            queryset = filter_reservations(Reservation.objects.all(), filters)
+        except ValidationError as e:
+            raise CommandError(f'Invalid filters: {e.detail}')
+
+        lines = export_reservations(queryset, options['output'], options['chunk_size'])
+        if options['file']:
+            with open(options['file'], 'w', newline='') as f:
+                f.writelines(lines)
+        else:
+            for line in lines:
+                self.stdout.write(line, ending='')
@@ -0,0 +1,29 @@
+import json
+from django.core.management.base import BaseCommand, CommandError
+from rest_framework.exceptions import ValidationError
+from apps.rooms.inventory import IMPORT_BATCH_SIZE, IMPORT_FORMATS, import_inventory
+
+
+class Command(BaseCommand):
+    help = (
+        'Upserts the room types (by name) and rooms (by number) of a CSV or NDJSON file with the columns: '
+        'number, room_type, description, capacity, price_per_night'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('file', help='file to import')
+        parser.add_argument('--input', choices=tuple(IMPORT_FORMATS), help='input format, by default from the file extension')
+        parser.add_argument('--delete', action='store_true', help='delete the room types and rooms left out of the file')
+        parser.add_argument('--dry-run', action='store_true', help='only count the changes')
+        parser.add_argument('--batch-size', type=int, default=IMPORT_BATCH_SIZE, help='rows written at a time')
+
+    def handle(self, *args, **options):
+        input = options['input'] or ('ndjson' if options['file'].endswith(('.ndjson', '.jsonl')) else 'csv')
+        try:
+            with open(options['file'], newline='', encoding='utf-8-sig') as f:
+                counts = import_inventory(f, input, delete=options['delete'], dry_run=options['dry_run'], batch_size=options['batch_size'])
+        except OSError as e:
+            raise CommandError(f'The file could not be read: {e}')
+        except ValidationError as e:
+            raise CommandError('Invalid inventory:\n' + '\n'.join(e.detail))
+        self.stdout.write(json.dumps(counts, indent=2))
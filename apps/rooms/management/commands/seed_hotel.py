@@ -0,0 +1,50 @@
+import datetime
+import time
+from django.core.management.base import BaseCommand, CommandError
+from apps.rooms.seeding import SEED_BATCH_SIZE, seed_hotel
+
+
+class Command(BaseCommand):
+    help = (
+        'Creates a synthetic dataset of room types, rooms, guests and reservations with their room nights, '
+        'deterministic from --seed. Use a new seed to add another dataset to the same database.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--room-types', type=int, default=10)
+        parser.add_argument('--rooms', type=int, default=200)
+        parser.add_argument('--users', type=int, default=1000, help='number of guests')
+        parser.add_argument('--reservations', type=int, default=10000)
+        parser.add_argument(
+            '--days', type=int,
+            help='number of days the reservations span, by default enough for an occupancy of about 70%%')
+        parser.add_argument(
+            '--start-date', type=datetime.date.fromisoformat,
+            help='first day of the reservations (YYYY-MM-DD), by default half of them are in the past')
+        parser.add_argument('--seed', type=int, default=0)
+        parser.add_argument('--batch-size', type=int, default=SEED_BATCH_SIZE)
+
+    def handle(self, *args, **options):
+        for name in ('room_types', 'rooms', 'users', 'reservations', 'batch_size'):
+            if options[name] < 0 or (name == 'batch_size' and options[name] == 0):
+                raise CommandError(f'Invalid --{name.replace("_", "-")}: {options[name]}')
+        if options['reservations'] and not options['rooms']:
+            raise CommandError('Reservations need at least one room')
+        if options['rooms'] and not options['room_types']:
+            raise CommandError('Rooms need at least one room type')
+
+        started_at = time.perf_counter()
+        counts = seed_hotel(
+            room_types=options['room_types'],
+            rooms=options['rooms'],
+            users=options['users'],
+            reservations=options['reservations'],
+            days=options['days'],
+            start_date=options['start_date'],
+            seed=options['seed'],
+            batch_size=options['batch_size'],
+        )
+        self.stdout.write(self.style.SUCCESS(
+            ', '.join(f'{count} {name.replace("_", " ")}' for name, count in counts.items())
+            + f' have been created in {time.perf_counter() - started_at:.1f}s'
+        ))
@@ -0,0 +1,103 @@
+# Generated by Django 4.2.5 on 2026-10-18 06:21
+
+from django.db import IntegrityError, migrations, models
+import django.db.models.deletion
+import datetime
+
+
+# conflicting reservations listed in the error of the migration
+MAX_REPORTED_CONFLICTS = 20
+
+
+def create_room_nights(apps, schema_editor):
+    Reservation = apps.get_model("rooms", "Reservation")
+    RoomNight = apps.get_model("rooms", "RoomNight")
+    nights = []
+    # (room id, date) -> id of the reservation of the night
+    booked = {}
+    # (first reservation id, second reservation id, room id) of the double bookings
+    conflicts = set()
+    conflicting_nights = 0
+    for reservation in Reservation.objects.order_by("pk").iterator():
+        for i in range((reservation.check_out_date - reservation.check_in_date).days):
+            date = reservation.check_in_date + datetime.timedelta(days=i)
+            key = (reservation.assigned_room_id, date)
+            if key in booked:
+                conflicts.add(
+                    (booked[key], reservation.pk, reservation.assigned_room_id)
+                )
+                conflicting_nights += 1
+                continue
+            booked[key] = reservation.pk
+            nights.append(
+                RoomNight(
+                    room_id=reservation.assigned_room_id,
+                    date=date,
+                    reservation=reservation,
+                )
+            )
+    if conflicts:
+        # the unique (room, date) constraint can't hold, the double bookings have to be resolved
+        # (a reservation moved to another room or cancelled) before migrating
+        conflicts = sorted(conflicts)
+        lines = [
+            f"reservations {first} and {second} of room {room_id}"
+            for first, second, room_id in conflicts[:MAX_REPORTED_CONFLICTS]
+        ]
+        if len(conflicts) > MAX_REPORTED_CONFLICTS:
+            lines.append(f"... and {len(conflicts) - MAX_REPORTED_CONFLICTS} more")
+        raise IntegrityError(
+            f"{conflicting_nights} room nights are double booked, resolve the overlapping "
+            f"reservations before migrating:\n" + "\n".join(lines)
+        )
+    RoomNight.objects.bulk_create(nights, batch_size=1000)
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("rooms", "0002_alter_reservation_options_alter_room_options_and_more"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="RoomNight",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("date", models.DateField()),
+                (
+                    "reservation",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="nights",
+                        to="rooms.reservation",
+                    ),
+                ),
+                (
+                    "room",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="nights",
+                        to="rooms.room",
+                    ),
+                ),
+            ],
+            options={
+                "ordering": ("room", "date"),
+            },
+        ),
+        migrations.AddConstraint(
+            model_name="roomnight",
+            constraint=models.UniqueConstraint(
+                fields=("room", "date"), name="unique_room_night"
+            ),
+        ),
+        migrations.RunPython(create_room_nights, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 4.2.5 on 2026-10-18 06:26
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("rooms", "0003_roomnight"),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="reservation",
+            index=models.Index(
+                fields=["-check_in_date", "id"], name="reservation_check_in_id_idx"
+            ),
+        ),
+    ]
@@ -0,0 +1,29 @@
+# Generated by Django 4.2.5 on 2026-10-18 06:27
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("rooms", "0004_reservation_check_in_id_idx"),
+    ]
+
+    operations = [
+        migrations.AlterModelOptions(
+            name="roomnight",
+            options={"ordering": ("room_id", "date")},
+        ),
+        migrations.AddIndex(
+            model_name="reservation",
+            index=models.Index(
+                fields=["assigned_room", "check_in_date", "check_out_date"],
+                name="reservation_room_dates_idx",
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="reservation",
+            index=models.Index(
+                fields=["user", "check_in_date"], name="reservation_user_check_in_idx"
+            ),
+        ),
+    ]
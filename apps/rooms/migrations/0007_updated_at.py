@@ -0,0 +1,27 @@
+# Generated by Django 4.2.5 on 2026-10-18 06:33
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("rooms", "0006_reservation_no_overlap"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="reservation",
+            name="updated_at",
+            field=models.DateTimeField(auto_now=True),
+        ),
+        migrations.AddField(
+            model_name="room",
+            name="updated_at",
+            field=models.DateTimeField(auto_now=True),
+        ),
+        migrations.AddField(
+            model_name="roomtype",
+            name="updated_at",
+            field=models.DateTimeField(auto_now=True),
+        ),
+    ]
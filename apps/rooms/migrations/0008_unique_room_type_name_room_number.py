@@ -0,0 +1,51 @@
+# Generated by Django 4.2.5 on 2026-10-18 07:05
+
+from django.db import IntegrityError, migrations, models
+from django.db.models import Count
+
+
+def check_duplicates(apps, schema_editor):
+    # the unique constraints can't be added while some names or numbers are duplicated, which
+    # have to be renamed (or merged) before migrating
+    lines = []
+    for model_name, field in [("RoomType", "name"), ("Room", "number")]:
+        model = apps.get_model("rooms", model_name)
+        duplicates = (
+            model.objects.values(field)
+            .annotate(count=Count("pk"))
+            .filter(count__gt=1)
+            .order_by(field)
+        )
+        for duplicate in duplicates:
+            pks = model.objects.filter(**{field: duplicate[field]}).values_list(
+                "pk", flat=True
+            )
+            lines.append(
+                f'{model_name} {field} "{duplicate[field]}": '
+                + ", ".join(str(pk) for pk in pks.order_by("pk"))
+            )
+    if lines:
+        raise IntegrityError(
+            "Duplicated room type names or room numbers, rename them before migrating:\n"
+            + "\n".join(lines)
+        )
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("rooms", "0007_updated_at"),
+    ]
+
+    operations = [
+        migrations.RunPython(check_duplicates, migrations.RunPython.noop),
+        migrations.AlterField(
+            model_name="room",
+            name="number",
+            field=models.CharField(max_length=10, unique=True),
+        ),
+        migrations.AlterField(
+            model_name="roomtype",
+            name="name",
+            field=models.CharField(max_length=100, unique=True),
+        ),
+    ]
@@ -1,15 +1,20 @@
 from django.conf import settings
 from django.core.exceptions import ValidationError
 from django.core.validators import MaxValueValidator, MinValueValidator
-from django.db import models
+from django.db import models, transaction
+from django.db.models import Count, F, Sum
+from django.db.models.functions import Coalesce
+import datetime
+from .expressions import StayNights
 
 
 class RoomType(models.Model):
-    name = models.CharField(max_length=100)
+    name = models.CharField(max_length=100, unique=True)
     description = models.TextField()
     capacity = models.PositiveSmallIntegerField(
         validators=[MinValueValidator(1), MaxValueValidator(10)])
     price_per_night = models.PositiveIntegerField()
+    updated_at = models.DateTimeField(auto_now=True)
 
     class Meta:
         ordering = ('capacity',)
@@ -20,7 +25,8 @@ class RoomType(models.Model):
 
 class Room(models.Model):
     room_type = models.ForeignKey(RoomType, on_delete=models.CASCADE, related_name='rooms')
-    number = models.CharField(max_length=10)    # added as CharField because nuber could be something like: A104
+    number = models.CharField(max_length=10, unique=True)    # added as CharField because nuber could be something like: A104
+    updated_at = models.DateTimeField(auto_now=True)
 
     class Meta:
         ordering = ('room_type',)
@@ -29,12 +35,79 @@ class Room(models.Model):
         return f"{self.room_type}: {self.number}"
     
 
+class ReservationQuerySet(models.QuerySet):
+    def with_nights(self):
+        '''
+        Annotates the number of nights as `stay_nights`
+        '''
+        return self.annotate(stay_nights=StayNights())
+
+    def with_cost(self):
+        '''
+        Annotates `stay_nights` and the cost of the stay as `stay_cost`, so that the reservations
+        can be filtered, ordered and summed by cost in SQL
+        '''
+        return self.with_nights().annotate(stay_cost=F('assigned_room__room_type__price_per_night') * F('stay_nights'))
+
+    def totals(self):
+        '''
+        Number of reservations, nights and revenue of the queryset with one aggregate query
+        '''
+        nights = StayNights()
+        return self.order_by().aggregate(
+            reservations=Count('pk'),
+            nights=Coalesce(Sum(nights), 0),
+            revenue=Coalesce(Sum(F('assigned_room__room_type__price_per_night') * nights), 0),
+        )
+
+
 class Reservation(models.Model):
     user = models.ForeignKey(
         settings.AUTH_USER_MODEL, on_delete=models.SET_NULL, blank=True, null=True, related_name='reservations')
     check_in_date = models.DateField()
     check_out_date = models.DateField()
     assigned_room = models.ForeignKey(Room, on_delete=models.CASCADE, related_name='reservations')
+    updated_at = models.DateTimeField(auto_now=True)
+
+    objects = ReservationQuerySet.as_manager()
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        instance._synced_stay = instance._stay
+        return instance
+
+    @property
+    def _stay(self):
+        return (self.__dict__.get('assigned_room_id'), self.__dict__.get('check_in_date'), self.__dict__.get('check_out_date'))
+
+    def save(self, *args, **kwargs):
+        '''
+        Saves the reservation along with its room nights, so a double booking is refused
+        by the unique (room, date) constraint of RoomNight with an IntegrityError
+        '''
+        # dates could be passed as strings, e.g. Reservation.objects.create(check_in_date="2024-10-10")
+        for field_name in ('check_in_date', 'check_out_date'):
+            field = self._meta.get_field(field_name)
+            setattr(self, field.attname, field.to_python(getattr(self, field.attname)))
+
+        synced_stay = getattr(self, '_synced_stay', None)
+        with transaction.atomic(using=kwargs.get('using')):
+            super().save(*args, **kwargs)
+            if synced_stay != self._stay:
+                if synced_stay is not None:
+                    self.nights.all().delete()
+                RoomNight.objects.using(self._state.db).bulk_create(self.build_nights())
+        self._synced_stay = self._stay
+
+    def build_nights(self):
+        '''
+        Unsaved RoomNight objects for every night of the stay
+        '''
+        return [
+            RoomNight(room_id=self.assigned_room_id, date=self.check_in_date + datetime.timedelta(days=i), reservation=self)
+            for i in range(self.nights_count)
+        ]
 
     @property
     def nights_count(self):
@@ -42,12 +115,45 @@ class Reservation(models.Model):
     
     @property
     def cost(self):
+        # annotated by ReservationQuerySet.with_cost(), without loading the room and its room type
+        if 'stay_cost' in self.__dict__:
+            return self.stay_cost
         if not self.assigned_room:
             return 0
         return self.assigned_room.room_type.price_per_night * self.nights_count
 
     class Meta:
         ordering = ('-check_in_date',)
+        indexes = [
+            # default ordering and keyset pagination of the reservations list
+            models.Index(fields=('-check_in_date', 'id'), name='reservation_check_in_id_idx'),
+            # overlap checks of a room: assigned_room = x AND check_in_date < y AND check_out_date > z
+            models.Index(fields=('assigned_room', 'check_in_date', 'check_out_date'), name='reservation_room_dates_idx'),
+            # reservations of a user by check-in date
+            models.Index(fields=('user', 'check_in_date'), name='reservation_user_check_in_idx'),
+        ]
+        # on PostgreSQL, overlapping stays of the same room are also refused by the
+        # reservation_no_overlap GiST exclusion constraint, created in migration 0006
         
     def __str__(self) -> str:
-        return f"{self.user}'s reservation of room {self.assigned_room} from {self.check_in_date} to {self.check_out_date}"
\ No newline at end of file
+        return f"{self.user}'s reservation of room {self.assigned_room} from {self.check_in_date} to {self.check_out_date}"
+
+
+class RoomNight(models.Model):
+    '''
+    One occupied night of a room, kept in sync by Reservation.save() and deleted
+    along with its reservation, so availability is an indexed lookup on (room, date)
+    '''
+    room = models.ForeignKey(Room, on_delete=models.CASCADE, related_name='nights')
+    date = models.DateField()
+    reservation = models.ForeignKey(Reservation, on_delete=models.CASCADE, related_name='nights')
+
+    class Meta:
+        # by the column, so that it isn't expanded to the ordering of Room (joining RoomType)
+        ordering = ('room_id', 'date')
+        constraints = [
+            models.UniqueConstraint(fields=('room', 'date'), name='unique_room_night'),
+        ]
+
+    def __str__(self) -> str:
+        return f"{self.room} on {self.date}"
@@ -0,0 +1,30 @@
+'''
+PostgreSQL only: the stay of a reservation as a daterange, used by the reservation_no_overlap
+exclusion constraint (see migration 0006) and by the overlap queries served by its GiST index.
+The expression must stay identical to the one of the constraint for the index to be used.
+'''
+from django.contrib.postgres.fields import DateRangeField
+from django.db.backends.postgresql.psycopg_any import DateRange
+from django.db.models import F, Func, Value
+
+
+STAY_BOUNDS = '[)'
+
+
+class StayRange(Func):
+    function = 'daterange'
+    output_field = DateRangeField()
+
+
+def stay():
+    '''
+    daterange(check_in_date, check_out_date, '[)'), the half-open range of the nights of a stay
+    '''
+    return StayRange(F('check_in_date'), F('check_out_date'), Value(STAY_BOUNDS))
+
+
+def filter_stay_overlaps(queryset, check_in_date, check_out_date):
+    '''
+    Filters the reservations whose stay overlaps [check_in_date, check_out_date) with the && operator
+    '''
+    return queryset.alias(stay=stay()).filter(stay__overlap=DateRange(check_in_date, check_out_date, STAY_BOUNDS))
@@ -0,0 +1,115 @@
+import datetime
+from django.db.models import Count
+import numpy as np
+from rest_framework import serializers
+from .availability import filter_overlapping
+from .models import RoomType, Reservation
+
+
+GRANULARITIES = ('day', 'week', 'month')
+MAX_REPORT_DAYS = 366 * 3
+
+
+class OccupancyReportQuerySerializer(serializers.Serializer):
+    '''
+    Validates the query params of the occupancy report: the `from` and `to` dates
+    (both included) and the granularity of the periods
+    '''
+    to = serializers.DateField()
+    granularity = serializers.ChoiceField(choices=GRANULARITIES, required=False, default='day')
+
+    def get_fields(self):
+        fields = super().get_fields()
+        # `from` is a python keyword
+        fields['from'] = serializers.DateField()
+        return fields
+
+    def validate(self, attrs):
+        if attrs['from'] > attrs['to']:
+            raise serializers.ValidationError("From date cannot be later than to date")
+        if (attrs['to'] - attrs['from']).days >= MAX_REPORT_DAYS:
+            raise serializers.ValidationError(f"The report cannot cover more than {MAX_REPORT_DAYS} days")
+        return attrs
+
+
+def _period_starts(dates, granularity):
+    '''
+    Indexes of the first day of every period within the datetime64[D] dates
+    '''
+    if granularity == 'day':
+        return np.arange(len(dates))
+    if granularity == 'week':
+        # weeks start on Monday, 1970-01-01 (day 0) was a Thursday
+        keys = dates - (dates.astype(np.int64) + 3) % 7
+    else:
+        keys = dates.astype('datetime64[M]')
+    return np.flatnonzero(np.r_[True, keys[1:] != keys[:-1]])
+
+
+def occupancy_report(start_date, end_date, granularity='day'):
+    '''
+    Occupancy rate and revenue of every room type per day, week or month from start_date
+    to end_date (both included).
+    The overlapping reservations are fetched grouped by (room type, check-in, check-out), then
+    their nights are expanded with NumPy difference arrays: +n on the check-in day, -n on the
+    check-out day, and a cumulative sum gives the occupied rooms of every room type and day.
+    The revenue is computed with the current price per night of the room types.
+    '''
+    days = (end_date - start_date).days + 1
+    first_day = np.datetime64(start_date, 'D')
+    dates = first_day + np.arange(days)
+
+    room_types = list(
+        RoomType.objects.annotate(rooms_count=Count('rooms')).order_by('pk')
+        .values_list('pk', 'name', 'price_per_night', 'rooms_count')
+    )
+    stays = list(
+        filter_overlapping(Reservation.objects.all(), start_date, end_date + datetime.timedelta(days=1))
+        .order_by()
+        .values_list('assigned_room__room_type', 'check_in_date', 'check_out_date')
+        .annotate(count=Count('pk'))
+    )
+
+    # occupied rooms of every room type (rows) and day (columns)
+    changes = np.zeros((len(room_types), days + 1), dtype=np.int64)
+    if stays:
+        room_type_ids, check_in_dates, check_out_dates, counts = zip(*stays)
+        rows = np.searchsorted(np.array([room_type[0] for room_type in room_types]), np.array(room_type_ids))
+        check_ins = np.clip((np.array(check_in_dates, dtype='datetime64[D]') - first_day).astype(np.int64), 0, days)
+        check_outs = np.clip((np.array(check_out_dates, dtype='datetime64[D]') - first_day).astype(np.int64), 0, days)
+        counts = np.array(counts, dtype=np.int64)
+        np.add.at(changes, (rows, check_ins), counts)
+        np.add.at(changes, (rows, check_outs), -counts)
+    occupied = np.cumsum(changes, axis=1)[:, :days]
+
+    starts = _period_starts(dates, granularity)
+    ends = np.r_[starts[1:], days]
+    occupied_nights = np.add.reduceat(occupied, starts, axis=1) if room_types else np.zeros((0, len(starts)), dtype=np.int64)
+    rooms = np.array([room_type[3] for room_type in room_types], dtype=np.int64)
+    prices = np.array([room_type[2] for room_type in room_types], dtype=np.int64)
+    available_nights = rooms[:, None] * (ends - starts)[None, :]
+    revenue = occupied_nights * prices[:, None]
+    occupancy_rate = np.round(
+        np.divide(occupied_nights * 100, available_nights, out=np.zeros(occupied_nights.shape), where=available_nights > 0),
+        2
+    )
+
+    period_starts = dates[starts].tolist()
+    period_ends = dates[ends - 1].tolist()
+    occupied_nights, available_nights, occupancy_rate, revenue = (
+        array.tolist() for array in (occupied_nights, available_nights, occupancy_rate, revenue)
+    )
+    return [
+        {
+            'period_start': period_starts[j],
+            'period_end': period_ends[j],
+            'room_type': room_type[0],
+            'room_type_name': room_type[1],
+            'occupied_nights': occupied_nights[i][j],
+            'available_nights': available_nights[i][j],
+            'occupancy_rate': occupancy_rate[i][j],
+            'revenue': revenue[i][j],
+        }
+        for j in range(len(starts))
+        for i, room_type in enumerate(room_types)
+    ]
@@ -0,0 +1,203 @@
+'''
+Deterministic synthetic data (same seed, same data) at production scale: room types, rooms,
+guests, and non overlapping reservations with their room nights. The rows are generated with
+NumPy; the reservations and their room nights, millions of rows, are inserted in batches with
+COPY on PostgreSQL or with one prepared INSERT per batch on the other databases.
+'''
+from contextlib import contextmanager
+import datetime
+from io import StringIO
+import math
+import numpy as np
+from django.contrib.auth import get_user_model
+from django.contrib.auth.models import Group
+from django.core.management.color import no_style
+from django.db import connection, transaction
+from django.db.models import Max
+from django.utils import timezone
+from apps.users.constants import GUEST_USER
+from .cache import invalidate_catalog
+from .models import RoomType, Room, Reservation, RoomNight
+
+
+User = get_user_model()
+
+SEED_BATCH_SIZE = 5000
+
+ROOM_VIEWS = ('City', 'Garden', 'Pool', 'Sea', 'Mountain')
+# (kind, capacity, price per night with the cheapest view)
+ROOM_KINDS = (('Single', 1, 70), ('Double', 2, 100), ('Twin', 2, 100), ('Family', 4, 160), ('Suite', 4, 260))
+
+# share of the stays lasting 1, 2, ... 14 nights: mostly short stays, with a bump at a week
+STAY_NIGHTS = np.arange(1, 15)
+STAY_NIGHTS_WEIGHTS = np.array([20, 24, 18, 12, 7, 5, 8, 1.5, 1, 1, 0.5, 0.5, 0.5, 1])
+STAY_NIGHTS_WEIGHTS = STAY_NIGHTS_WEIGHTS / STAY_NIGHTS_WEIGHTS.sum()
+MEAN_STAY_NIGHTS = float((STAY_NIGHTS * STAY_NIGHTS_WEIGHTS).sum())
+# share of the room nights booked when the number of days isn't given
+TARGET_OCCUPANCY = 0.7
+# page cache of SQLite while seeding, in KiB
+SQLITE_SEED_CACHE_SIZE = 256 * 1024
+
+
+def demand_curve(start_date, days):
+    '''
+    Relative demand of every day from start_date: a seasonal wave peaking mid July, and busier weekends
+    '''
+    dates = np.datetime64(start_date) + np.arange(days)
+    day_of_year = (dates - dates.astype('datetime64[Y]')).astype(int)
+    # 1970-01-01 was a Thursday, Monday is 0
+    weekday = (dates.astype(int) + 3) % 7
+    return 1 + 0.35 * np.cos(2 * np.pi * (day_of_year - 196) / 365.25) + 0.25 * (weekday >= 4)
+
+
+def generate_stays(rng, rooms, reservations, users, days, start_date):
+    '''
+    (room index, user index, check-in day, check-out day) of every reservation, days counted from
+    start_date. The reservations are spread evenly over the rooms; the stays of a room follow each
+    other, separated by random gaps that are shorter when the demand is high, so that they span
+    about `days` days. The first guests make most of the reservations (returning guests).
+    '''
+    per_room = [reservations // rooms + (i < reservations % rooms) for i in range(rooms)]
+    mean_gap = max(0.0, days / max(per_room[0], 1) - MEAN_STAY_NIGHTS) if rooms else 0.0
+    nights = rng.choice(STAY_NIGHTS, size=reservations, p=STAY_NIGHTS_WEIGHTS).tolist()
+    gaps = rng.exponential(mean_gap, size=reservations).tolist() if mean_gap else [0] * reservations
+    user_indexes = (users * rng.random(reservations) ** 2).astype(int).tolist() if users else [None] * reservations
+    demand = demand_curve(start_date, days).tolist()
+
+    stays = []
+    for room_index, count in enumerate(per_room):
+        day = 0
+        for _ in range(count):
+            k = len(stays)
+            day += int(gaps[k] / demand[min(day, days - 1)])
+            stays.append((room_index, user_indexes[k], day, day + nights[k]))
+            day += nights[k]
+    return stays
+
+
+def _insert(cursor, model, field_names, rows):
+    '''
+    Inserts the rows (tuples of database values, None for NULL) into the table of model with COPY
+    on PostgreSQL, or with one prepared INSERT executed for all of them
+    '''
+    quote_name = connection.ops.quote_name
+    table = quote_name(model._meta.db_table)
+    columns = ', '.join(quote_name(model._meta.get_field(name).column) for name in field_names)
+    if connection.vendor == 'postgresql':
+        data = StringIO(''.join('\t'.join(r'\N' if value is None else str(value) for value in row) + '\n' for row in rows))
+        cursor.copy_expert(f'COPY {table} ({columns}) FROM STDIN', data)
+    else:
+        cursor.executemany(f'INSERT INTO {table} ({columns}) VALUES ({", ".join(["%s"] * len(field_names))})', rows)
+
+
+@contextmanager
+def _bulk_load(cursor):
+    '''
+    Raises the page cache of SQLite while loading, as the indexes of millions of rows don't fit the default one
+    '''
+    if connection.vendor != 'sqlite':
+        yield
+        return
+    cursor.execute('PRAGMA cache_size')
+    cache_size = cursor.fetchone()[0]
+    cursor.execute(f'PRAGMA cache_size = -{SQLITE_SEED_CACHE_SIZE}')
+    try:
+        yield
+    finally:
+        cursor.execute(f'PRAGMA cache_size = {cache_size}')
+
+
+def _insert_stays(cursor, stays, first_id, room_ids, user_ids, dates, updated_at, batch_size):
+    '''
+    Inserts the reservations of the stays, with ids from first_id, and their room nights in batches,
+    with the driver rather than model instances. Returns the number of room nights.
+    '''
+    room_nights = 0
+    for offset in range(0, len(stays), batch_size):
+        batch = [
+            (first_id + offset + i, room_ids[room_index], None if user_index is None else user_ids[user_index], check_in, check_out)
+            for i, (room_index, user_index, check_in, check_out) in enumerate(stays[offset:offset + batch_size])
+        ]
+        _insert(cursor, Reservation, ('id', 'assigned_room', 'user', 'check_in_date', 'check_out_date', 'updated_at'), [
+            (reservation_id, room_id, user_id, dates[check_in], dates[check_out], updated_at)
+            for reservation_id, room_id, user_id, check_in, check_out in batch
+        ])
+        nights = [
+            (room_id, dates[day], reservation_id)
+            for reservation_id, room_id, _, check_in, check_out in batch for day in range(check_in, check_out)
+        ]
+        _insert(cursor, RoomNight, ('room', 'date', 'reservation'), nights)
+        room_nights += len(nights)
+    return room_nights
+
+
+def seed_hotel(
+    room_types=10, rooms=200, users=1000, reservations=10000, days=None, start_date=None, seed=0,
+    batch_size=SEED_BATCH_SIZE,
+):
+    '''
+    Creates the room types (cheap kinds having more rooms), rooms, guests and reservations with
+    their room nights in one transaction. The reservations span `days` days (by default, enough days
+    for an occupancy of about TARGET_OCCUPANCY) from start_date (by default, half of them are in
+    the past). Reservation ids are allocated up front, so that their room nights are inserted
+    without reading them back. Returns the number of created rows per model.
+    '''
+    rng = np.random.default_rng(seed)
+    if days is None:
+        days = math.ceil(-(-reservations // max(rooms, 1)) * MEAN_STAY_NIGHTS / TARGET_OCCUPANCY)
+    days = max(days, 1)
+    start_date = start_date or datetime.date.today() - datetime.timedelta(days=days // 2)
+
+    with transaction.atomic():
+        guest_role, _ = Group.objects.get_or_create(name=GUEST_USER)
+        user_ids = [user.pk for user in User.objects.bulk_create([
+            User(username=f'seed-guest-{seed}-{i}', email=f'seed.guest.{seed}.{i}@example.com', role=guest_role)
+            for i in range(users)
+        ], batch_size=batch_size)]
+
+        # names and numbers are unique, the datasets of other seeds get suffixed ones
+        seed_suffix, room_prefix = (f' ({seed})', f'{seed}-') if seed else ('', '')
+        created_room_types = []
+        for i in range(room_types):
+            view_index = i // len(ROOM_KINDS) % len(ROOM_VIEWS)
+            kind, capacity, price = ROOM_KINDS[i % len(ROOM_KINDS)]
+            suffix = f' {i // (len(ROOM_KINDS) * len(ROOM_VIEWS)) + 1}' if i >= len(ROOM_KINDS) * len(ROOM_VIEWS) else ''
+            created_room_types.append(RoomType(
+                name=f'{ROOM_VIEWS[view_index]} View {kind}{suffix}{seed_suffix}',
+                description=f'{kind} room with a {ROOM_VIEWS[view_index].lower()} view',
+                capacity=capacity,
+                price_per_night=round(price * (1 + 0.15 * view_index) / 5) * 5,
+            ))
+        RoomType.objects.bulk_create(created_room_types, batch_size=batch_size)
+
+        weights = np.array([1 / room_type.price_per_night for room_type in created_room_types])
+        room_type_indexes = np.sort(rng.choice(room_types, size=rooms, p=weights / weights.sum())) if room_types else []
+        # numbered by floor, 50 rooms per floor: 101, 102, ... 150, 201, ... (1-101, ... with seed 1)
+        room_ids = [room.pk for room in Room.objects.bulk_create([
+            Room(number=f'{room_prefix}{i // 50 + 1}{i % 50 + 1:02d}', room_type=created_room_types[room_type_index])
+            for i, room_type_index in enumerate(room_type_indexes)
+        ], batch_size=batch_size)]
+
+        stays = generate_stays(rng, rooms, reservations, users, days, start_date)
+        last_day = max((check_out for _, _, _, check_out in stays), default=0)
+        dates = [
+            connection.ops.adapt_datefield_value(start_date + datetime.timedelta(days=day)) for day in range(last_day + 1)
+        ]
+        updated_at = connection.ops.adapt_datetimefield_value(timezone.now())
+        first_id = (Reservation.objects.aggregate(Max('pk'))['pk__max'] or 0) + 1
+
+        with connection.cursor() as cursor, _bulk_load(cursor):
+            room_nights = _insert_stays(cursor, stays, first_id, room_ids, user_ids, dates, updated_at, batch_size)
+            # the ids were given explicitly, move the sequence past them
+            for sql in connection.ops.sequence_reset_sql(no_style(), [Reservation]):
+                cursor.execute(sql)
+
+    # bulk inserts send no post_save signal
+    invalidate_catalog()
+    return {
+        'users': len(user_ids),
+        'room_types': len(created_room_types),
+        'rooms': len(room_ids),
+        'reservations': len(stays),
+        'room_nights': room_nights,
+    }
@@ -1,9 +1,22 @@
-from django.db.models import Q, Prefetch
-from rest_framework import serializers
+from django.contrib.auth import get_user_model
+from django.db import IntegrityError
+from rest_framework import exceptions, serializers, status
+from .availability import is_room_available
+from .booking import BookingConflict, NoRoomAvailable, book_room, book_rooms
 from .models import RoomType, Room, Reservation
 import datetime
 
 
+User = get_user_model()
+
+
+class ReservationConflict(exceptions.APIException):
+    '''
+    409 answered when a booking keeps conflicting with concurrent ones, the client may retry it
+    '''
+    status_code = status.HTTP_409_CONFLICT
+    default_code = 'conflict'
+
 
 class RoomTypeSerializer(serializers.ModelSerializer):
     class Meta:
@@ -20,6 +33,31 @@ class RoomSerializer(serializers.ModelSerializer):
         fields = ('number', 'room_type', 'room_type_info')
 
 
+class AvailabilitySearchSerializer(serializers.Serializer):
+    '''
+    Validates the query params of the availability search
+    '''
+    check_in = serializers.DateField()
+    check_out = serializers.DateField()
+    capacity = serializers.IntegerField(min_value=1, required=False)
+
+    def validate(self, attrs):
+        if attrs['check_in'] >= attrs['check_out']:
+            raise serializers.ValidationError("Check-in date should be earlier than check-out date")
+        return attrs
+
+
+class RoomTypeAvailabilitySerializer(serializers.ModelSerializer):
+
+    available_rooms = serializers.IntegerField(read_only=True)
+    nights = serializers.IntegerField(read_only=True)
+    total_price = serializers.IntegerField(read_only=True)
+
+    class Meta:
+        model = RoomType
+        fields = ('id', 'name', 'description', 'capacity', 'price_per_night', 'available_rooms', 'nights', 'total_price')
+
+
 class CreateReservationSerializer(serializers.ModelSerializer):
     '''
     This is for the guests or agents where they create a reservation by selecting
@@ -47,40 +85,61 @@ class CreateReservationSerializer(serializers.ModelSerializer):
         if check_in_date < today.date():
             raise serializers.ValidationError("Check-in date should be in the future")
 
-        # Find an available room of the selected room type within the date range
-        available_room = None
-        rooms = Room.objects.filter(room_type=selected_room_type).prefetch_related(
-            Prefetch('reservations', queryset=Reservation.objects.filter(check_out_date__gte=today.date()))
-        )
-        for room in rooms:
-            reservations = room.reservations.all()
-            if not reservations.exists():
-                available_room = room
-                break
-            has_conflicting_reservation = False
-            for res in reservations:
-                if res.check_in_date < check_out_date and res.check_out_date > check_in_date:
-                    has_conflicting_reservation = True
-                    break
-            if not has_conflicting_reservation:
-                available_room = room
-                break
-        
-        if not available_room:
+        # Assign an available room of the selected room type within the date range
+        try:
+            reservation = book_room(selected_room_type, check_in_date, check_out_date, user=validated_data.get('user'))
+        except BookingConflict as err:
+            raise ReservationConflict(str(err))
+
+        if not reservation:
             raise serializers.ValidationError("No rooms available for the selected date range and room type.")
-        
-        validated_data['assigned_room'] = available_room
-        
-        return super().create(validated_data)
+
+        return reservation
     
 
 class GetReservationSerializer(serializers.ModelSerializer):
 
     assigned_room_info = RoomSerializer(source='assigned_room', read_only=True)
+    nights = serializers.IntegerField(source='nights_count', read_only=True)
+    # annotated by ReservationQuerySet.with_cost() on the reservations list
+    cost = serializers.IntegerField(read_only=True)
 
     class Meta:
         model = Reservation
-        fields = ('user', 'check_in_date', 'check_out_date', 'assigned_room', 'assigned_room_info')
+        fields = ('id', 'user', 'check_in_date', 'check_out_date', 'nights', 'cost', 'assigned_room', 'assigned_room_info')
+
+
+class BulkReservationItemSerializer(serializers.Serializer):
+    room_type = serializers.PrimaryKeyRelatedField(queryset=RoomType.objects.all())
+    count = serializers.IntegerField(min_value=1)
+    check_in_date = serializers.DateField()
+    check_out_date = serializers.DateField()
+
+    def validate(self, attrs):
+        if attrs['check_in_date'] >= attrs['check_out_date']:
+            raise serializers.ValidationError("Check-in date should be earlier than check-out date")
+        if attrs['check_in_date'] < datetime.date.today():
+            raise serializers.ValidationError("Check-in date should be in the future")
+        return attrs
+
+
+class BulkReservationSerializer(serializers.Serializer):
+    '''
+    This is for group bookings (e.g. tour operators), where rooms are assigned for all the
+    items at once or none at all
+    '''
+    user = serializers.PrimaryKeyRelatedField(queryset=User.objects.all(), required=False, allow_null=True)
+    items = BulkReservationItemSerializer(many=True, write_only=True, allow_empty=False)
+    reservations = GetReservationSerializer(many=True, read_only=True)
+
+    def create(self, validated_data):
+        try:
+            reservations = book_rooms(validated_data['items'], user=validated_data.get('user'))
+        except NoRoomAvailable as err:
+            raise serializers.ValidationError(str(err))
+        except BookingConflict as err:
+            raise ReservationConflict(str(err))
+        return {'user': validated_data.get('user'), 'reservations': reservations}
 
 
 class UpdateDateRangeReservationSerializer(serializers.ModelSerializer):
@@ -102,17 +161,13 @@ class UpdateDateRangeReservationSerializer(serializers.ModelSerializer):
                 raise serializers.ValidationError("Check-in date cannot be later than check-out date")
             
         # check if the assigned_room is available at the new date range
-        room = instance.assigned_room
-        conflicting_reservations = Reservation.objects.filter(
-            assigned_room=instance.assigned_room,
-            check_in_date__lt=check_out_date,
-            check_out_date__gt=check_in_date
-        ).exclude(pk=instance.pk)
-
-        if conflicting_reservations.exists():
+        if not is_room_available(instance.assigned_room, check_in_date, check_out_date, exclude_reservation=instance):
+            raise serializers.ValidationError("There is a conflicting reservation with the same room and new date range.")
+
+        try:
+            return super().update(instance, validated_data)
+        except IntegrityError:
             raise serializers.ValidationError("There is a conflicting reservation with the same room and new date range.")
-        
-        return super().update(instance, validated_data)
     
 
 class UpdateRoomReservationSerializer(serializers.ModelSerializer):
@@ -123,18 +178,17 @@ class UpdateRoomReservationSerializer(serializers.ModelSerializer):
         model = Reservation
         fields = ('user', 'check_in_date', 'check_out_date', 'assigned_room', 'assigned_room_info')
         read_only_fields = ('user', 'check_in_date', 'check_out_date')
+        # the new room is serialized back with its room type
+        extra_kwargs = {'assigned_room': {'queryset': Room.objects.select_related('room_type')}}
 
     def update(self, instance, validated_data):
         new_assigned_room = validated_data['assigned_room']
 
         # check if the new assigned_room is available at the same date range
-        conflicting_reservations = Reservation.filter(
-            assigned_room=new_assigned_room,
-            check_in_date__lt=instance.check_out_date,
-            check_out_date__gt=instance.check_in_date
-        ).objects.exclude(pk=instance.pk)
-
-        if conflicting_reservations.exists():
+        if not is_room_available(new_assigned_room, instance.check_in_date, instance.check_out_date, exclude_reservation=instance):
             raise serializers.ValidationError("There is a conflicting reservation with the new room and the exisitng date range.")
-        
-        return super().update(instance, validated_data)
\ No newline at end of file
+
+        try:
+            return super().update(instance, validated_data)
+        except IntegrityError:
+            raise serializers.ValidationError("There is a conflicting reservation with the new room and the exisitng date range.")
\ No newline at end of file
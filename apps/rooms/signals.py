@@ -0,0 +1,8 @@
+from django.db.models.signals import post_delete, post_save
+from .cache import invalidate_catalog
+from .models import RoomType, Room
+
+
+for model in (RoomType, Room):
+    post_save.connect(invalidate_catalog, sender=model, dispatch_uid=f'invalidate_catalog_{model.__name__}_save')
+    post_delete.connect(invalidate_catalog, sender=model, dispatch_uid=f'invalidate_catalog_{model.__name__}_delete')
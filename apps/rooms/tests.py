@@ -1,18 +1,52 @@
+from concurrent.futures import ThreadPoolExecutor
+import datetime
+from importlib import import_module
+from io import StringIO
+import json
+import os
+import tempfile
+import time
+from unittest.mock import patch
+from django.apps import apps as django_apps
 from django.contrib.auth import get_user_model
 from django.contrib.auth.models import Group
-from django.test import TestCase
+from django.core.cache import cache
+from django.core.exceptions import ImproperlyConfigured
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.db import IntegrityError, connection
+from django.db.migrations.executor import MigrationExecutor
+from django.test import AsyncClient, TestCase, TransactionTestCase, override_settings
 from django.urls import reverse
+from django.utils.http import http_date
 from rest_framework import status
+from rest_framework.pagination import PageNumberPagination
 from rest_framework.test import APIClient
-from .models import RoomType, Room, Reservation
+from .assignment import AvailabilitySnapshot, find_room, first_fit, get_assignment_strategy
+from .availability import find_available_room, overlapping_reservations, room_type_availability
+from .booking import book_room, book_rooms
+from .management.commands.explain_queries import full_scans
+from .cache import get_catalog_cache_stats
+from .reports import occupancy_report
+from .seeding import seed_hotel
+from .models import RoomType, Room, Reservation, RoomNight
 # from .serializers import RoomTypeSerializer
 from apps.users.constants import ADMIN_USER, AGENT_USER, GUEST_USER
+from apps.users.permissions import get_role_ids
+from apps.users.serializers import RoleTokenObtainPairSerializer
+from hotel_reservation.db.pool import ConnectionPool, PoolTimeout
+from hotel_reservation.db.routers import sticky_key
+from hotel_reservation.loadtest import LoadResult
+from hotel_reservation.middleware import ReplicaRoutingMiddleware
+from hotel_reservation.pagination import KeysetPagination
 # from apps.users.permissions import IsAdminOrReadOnlyPermission
 
 User = get_user_model()
 
 class ViewSetGenericTestCase(TestCase):
     def setUp(self):
+        # the rolled back test data does not invalidate the catalog cache
+        cache.clear()
         self.client = APIClient()
         admin_role = Group.objects.create(name=ADMIN_USER)
         self.user_admin = User.objects.create(username="admin-test", email="admin.test@example.com", role=admin_role)
@@ -354,4 +388,1288 @@ class ReservationViewSetsTestCase(ViewSetGenericTestCase):
         data = {"check_in_date": "2024-12-02", "check_out_date": "2024-12-10"}
         url = reverse("reservation-dates-detail", args=[self.reservation.id])
         response = self.client.put(url, data, format="json")
-        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
\ No newline at end of file
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+class AvailabilityTestCase(TestCase):
+    def setUp(self):
+        self.room_type = RoomType.objects.create(name="Single Room", description="A single room type", capacity=1, price_per_night=50)
+        self.room = Room.objects.create(number='A333', room_type=self.room_type)
+        self.room_2 = Room.objects.create(number='A334', room_type=self.room_type)
+        self.check_in_date = datetime.date.today() + datetime.timedelta(days=30)
+        self.check_out_date = self.check_in_date + datetime.timedelta(days=5)
+        Reservation.objects.create(check_in_date=self.check_in_date, check_out_date=self.check_out_date, assigned_room=self.room)
+
+    def test_find_available_room_skips_conflicting_room(self):
+        with self.assertNumQueries(1):
+            room = find_available_room(self.room_type, self.check_in_date, self.check_out_date)
+        self.assertEqual(room, self.room_2)
+
+    def test_find_available_room_half_open_range(self):
+        # a stay may start on the check-out day of another one, and end on its check-in day
+        after = find_available_room(self.room_type, self.check_out_date, self.check_out_date + datetime.timedelta(days=2))
+        before = find_available_room(self.room_type, self.check_in_date - datetime.timedelta(days=2), self.check_in_date)
+        self.assertEqual(after, self.room)
+        self.assertEqual(before, self.room)
+
+    def test_overlapping_reservations(self):
+        day = datetime.timedelta(days=1)
+        self.assertTrue(overlapping_reservations(self.check_in_date + day, self.check_in_date + 2 * day).exists())
+        self.assertTrue(overlapping_reservations(self.check_in_date - day, self.check_out_date + day).exists())
+        self.assertFalse(overlapping_reservations(self.check_out_date, self.check_out_date + day).exists())
+        self.assertFalse(overlapping_reservations(self.check_in_date - day, self.check_in_date).exists())
+
+    def test_find_available_room_none_available(self):
+        Reservation.objects.create(check_in_date=self.check_in_date, check_out_date=self.check_out_date, assigned_room=self.room_2)
+        room = find_available_room(self.room_type, self.check_in_date + datetime.timedelta(days=1), self.check_out_date)
+        self.assertIsNone(room)
+
+
+class AvailabilityViewSetTestCase(ViewSetGenericTestCase):
+    def setUp(self):
+        super().setUp()
+        self.room_type = RoomType.objects.create(name="Single Room", description="A single room type", capacity=1, price_per_night=50)
+        self.room_type_2 = RoomType.objects.create(name="Family Room", description="A family room type", capacity=4, price_per_night=200)
+        self.room = Room.objects.create(number='A333', room_type=self.room_type)
+        Room.objects.create(number='A334', room_type=self.room_type)
+        Room.objects.create(number='B333', room_type=self.room_type_2)
+        self.check_in_date = datetime.date.today() + datetime.timedelta(days=30)
+        self.check_out_date = self.check_in_date + datetime.timedelta(days=3)
+        Reservation.objects.create(check_in_date=self.check_in_date, check_out_date=self.check_out_date, assigned_room=self.room)
+        self.url = reverse("availability-list")
+
+    def test_availability(self):
+        response = self.client.get(self.url, {"check_in": self.check_in_date, "check_out": self.check_out_date})
+        self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
+
+    def test_availability_as_guest(self):
+        self.client.force_authenticate(user=self.user_guest)
+        response = self.client.get(self.url, {"check_in": self.check_in_date, "check_out": self.check_out_date})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        availability = {item["id"]: item for item in response.data}
+        self.assertEqual(availability[self.room_type.id]["available_rooms"], 1)
+        self.assertEqual(availability[self.room_type.id]["total_price"], 150)
+        self.assertEqual(availability[self.room_type_2.id]["available_rooms"], 1)
+        self.assertEqual(availability[self.room_type_2.id]["total_price"], 600)
+
+    def test_availability_as_guest_capacity(self):
+        self.client.force_authenticate(user=self.user_guest)
+        response = self.client.get(self.url, {"check_in": self.check_in_date, "check_out": self.check_out_date, "capacity": 2})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual([item["id"] for item in response.data], [self.room_type_2.id])
+
+    def test_availability_as_guest_invalid_date_range(self):
+        self.client.force_authenticate(user=self.user_guest)
+        response = self.client.get(self.url, {"check_in": self.check_out_date, "check_out": self.check_in_date})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_availability_single_query(self):
+        with self.assertNumQueries(1):
+            rows = list(room_type_availability(self.check_in_date, self.check_out_date))
+        self.assertEqual([row.available_rooms for row in rows], [1, 1])
+
+
+class RoomNightTestCase(TestCase):
+    def setUp(self):
+        self.room_type = RoomType.objects.create(name="Single Room", description="A single room type", capacity=1, price_per_night=50)
+        self.room = Room.objects.create(number='A333', room_type=self.room_type)
+        self.room_2 = Room.objects.create(number='A334', room_type=self.room_type)
+        self.check_in_date = datetime.date.today() + datetime.timedelta(days=30)
+        self.reservation = Reservation.objects.create(
+            check_in_date=self.check_in_date,
+            check_out_date=self.check_in_date + datetime.timedelta(days=3),
+            assigned_room=self.room
+        )
+
+    def assertNights(self, reservation, room, first_date, count):
+        nights = list(reservation.nights.values_list('room', 'date'))
+        self.assertEqual(nights, [(room.id, first_date + datetime.timedelta(days=i)) for i in range(count)])
+
+    def test_create(self):
+        self.assertNights(self.reservation, self.room, self.check_in_date, 3)
+
+    def test_date_change(self):
+        self.reservation.check_in_date += datetime.timedelta(days=1)
+        self.reservation.check_out_date += datetime.timedelta(days=2)
+        self.reservation.save()
+        self.assertNights(self.reservation, self.room, self.check_in_date + datetime.timedelta(days=1), 4)
+
+    def test_room_change(self):
+        reservation = Reservation.objects.get(pk=self.reservation.pk)
+        reservation.assigned_room = self.room_2
+        reservation.save()
+        self.assertNights(reservation, self.room_2, self.check_in_date, 3)
+
+    def test_delete(self):
+        self.reservation.delete()
+        self.assertFalse(RoomNight.objects.exists())
+
+    def test_double_booking_refused(self):
+        with self.assertRaises(IntegrityError):
+            Reservation.objects.create(
+                check_in_date=self.check_in_date + datetime.timedelta(days=2),
+                check_out_date=self.check_in_date + datetime.timedelta(days=4),
+                assigned_room=self.room
+            )
+        self.assertEqual(Reservation.objects.count(), 1)
+        self.assertEqual(RoomNight.objects.count(), 3)
+
+    def test_migration_reports_double_bookings(self):
+        create_room_nights = import_module('apps.rooms.migrations.0003_roomnight').create_room_nights
+        RoomNight.objects.all().delete()
+        create_room_nights(django_apps, None)
+        self.assertNights(self.reservation, self.room, self.check_in_date, 3)
+        RoomNight.objects.all().delete()
+        # bulk_create skips the room nights, like the reservations created before them
+        [double_booking] = Reservation.objects.bulk_create([Reservation(
+            check_in_date=self.check_in_date + datetime.timedelta(days=1),
+            check_out_date=self.check_in_date + datetime.timedelta(days=4),
+            assigned_room=self.room
+        )])
+        message = f"2 room nights are double booked, resolve the overlapping reservations before migrating:\n" \
+            f"reservations {self.reservation.pk} and {double_booking.pk} of room {self.room.pk}"
+        with self.assertRaisesMessage(IntegrityError, message):
+            create_room_nights(django_apps, None)
+        self.assertFalse(RoomNight.objects.exists())
+
+
+class UpdateRoomReservationViewSetTestCase(ViewSetGenericTestCase):
+    def setUp(self):
+        super().setUp()
+        self.room_type = RoomType.objects.create(name="Single Room", description="A single room type", capacity=1, price_per_night=50)
+        self.room = Room.objects.create(number='A333', room_type=self.room_type)
+        self.room_2 = Room.objects.create(number='A334', room_type=self.room_type)
+        check_in_date = datetime.date.today() + datetime.timedelta(days=30)
+        self.reservation = Reservation.objects.create(
+            user=self.user_guest,
+            check_in_date=check_in_date,
+            check_out_date=check_in_date + datetime.timedelta(days=3),
+            assigned_room=self.room,
+        )
+        self.reservation_2 = Reservation.objects.create(
+            user=self.user_guest,
+            check_in_date=check_in_date + datetime.timedelta(days=2),
+            check_out_date=check_in_date + datetime.timedelta(days=5),
+            assigned_room=self.room_2,
+        )
+
+    def test_update_reservation_room_as_agent_conflict(self):
+        self.client.force_authenticate(user=self.user_agent)
+        url = reverse("reservation-room-detail", args=[self.reservation.id])
+        response = self.client.put(url, {"assigned_room": self.room_2.id}, format="json")
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_update_reservation_room_as_agent(self):
+        self.reservation_2.delete()
+        self.client.force_authenticate(user=self.user_agent)
+        url = reverse("reservation-room-detail", args=[self.reservation.id])
+        response = self.client.put(url, {"assigned_room": self.room_2.id}, format="json")
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(set(self.reservation.nights.values_list('room', flat=True)), {self.room_2.id})
+
+
+class BookingStressTestCase(TransactionTestCase):
+    '''
+    Fires parallel bookings at a small room pool and checks that no room gets double booked,
+    the bookings/second are reported by the bench_booking command
+    '''
+    threads_count = 8
+    bookings_per_thread = 10
+
+    def setUp(self):
+        self.room_type = RoomType.objects.create(name="Single Room", description="A single room type", capacity=1, price_per_night=50)
+        for i in range(3):
+            Room.objects.create(number=f'A{i}', room_type=self.room_type)
+        self.first_date = datetime.date.today() + datetime.timedelta(days=30)
+
+    def _book(self, thread_index):
+        booked = 0
+        try:
+            for i in range(self.bookings_per_thread):
+                # overlapping stays of 1 to 3 nights over a 10 days window
+                check_in_date = self.first_date + datetime.timedelta(days=(thread_index + i) % 10)
+                check_out_date = check_in_date + datetime.timedelta(days=1 + i % 3)
+                if book_room(self.room_type, check_in_date, check_out_date):
+                    booked += 1
+        finally:
+            connection.close()
+        return booked
+
+    def test_parallel_bookings_no_overlap(self):
+        with ThreadPoolExecutor(max_workers=self.threads_count) as executor:
+            booked = sum(executor.map(self._book, range(self.threads_count)))
+
+        self.assertGreater(booked, 0)
+        self.assertEqual(Reservation.objects.count(), booked)
+        reservations = list(Reservation.objects.order_by('assigned_room', 'check_in_date'))
+        for previous, current in zip(reservations, reservations[1:]):
+            if previous.assigned_room_id == current.assigned_room_id:
+                self.assertLessEqual(previous.check_out_date, current.check_in_date)
+
+
+class MultiRoomTypeBookingStressTestCase(BookingStressTestCase):
+    '''
+    Parallel bookings spread over several room types, which SQLite can't write concurrently
+    '''
+    def setUp(self):
+        super().setUp()
+        self.room_types = [self.room_type] + [
+            RoomType.objects.create(name=f"Room {i}", description="A room type", capacity=2, price_per_night=80) for i in range(3)
+        ]
+        for room_type in self.room_types[1:]:
+            for i in range(3):
+                Room.objects.create(number=f'{room_type.pk}-{i}', room_type=room_type)
+
+    def _book(self, thread_index):
+        booked = 0
+        try:
+            for i in range(self.bookings_per_thread):
+                room_type = self.room_types[(thread_index + i) % len(self.room_types)]
+                check_in_date = self.first_date + datetime.timedelta(days=(thread_index * i) % 10)
+                if book_room(room_type, check_in_date, check_in_date + datetime.timedelta(days=1 + i % 3)):
+                    booked += 1
+        finally:
+            connection.close()
+        return booked
+
+
+class BulkReservationViewSetTestCase(ViewSetGenericTestCase):
+    def setUp(self):
+        super().setUp()
+        self.room_type = RoomType.objects.create(name="Single Room", description="A single room type", capacity=1, price_per_night=50)
+        self.room_type_2 = RoomType.objects.create(name="Family Room", description="A family room type", capacity=4, price_per_night=200)
+        for i in range(3):
+            Room.objects.create(number=f'A{i}', room_type=self.room_type)
+            Room.objects.create(number=f'B{i}', room_type=self.room_type_2)
+        self.check_in_date = datetime.date.today() + datetime.timedelta(days=30)
+        self.check_out_date = self.check_in_date + datetime.timedelta(days=3)
+        self.url = reverse("bulk-reservation-list")
+
+    def _item(self, room_type, count):
+        return {"room_type": room_type.id, "count": count, "check_in_date": self.check_in_date, "check_out_date": self.check_out_date}
+
+    def test_bulk_reservation(self):
+        data = {"items": [self._item(self.room_type, 2)]}
+        response = self.client.post(self.url, data, format="json")
+        self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
+
+    def test_bulk_reservation_as_agent(self):
+        self.client.force_authenticate(user=self.user_agent)
+        data = {"user": self.user_guest.id, "items": [self._item(self.room_type, 3), self._item(self.room_type_2, 2)]}
+        response = self.client.post(self.url, data, format="json")
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(len(response.data["reservations"]), 5)
+        self.assertEqual(len({r["assigned_room"] for r in response.data["reservations"]}), 5)
+        self.assertEqual(Reservation.objects.filter(user=self.user_guest).count(), 5)
+        self.assertEqual(RoomNight.objects.count(), 15)
+
+    def test_bulk_reservation_as_agent_all_or_nothing(self):
+        self.client.force_authenticate(user=self.user_agent)
+        data = {"items": [self._item(self.room_type, 2), self._item(self.room_type_2, 4)]}
+        response = self.client.post(self.url, data, format="json")
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertFalse(Reservation.objects.exists())
+        self.assertFalse(RoomNight.objects.exists())
+
+    def test_bulk_reservation_as_agent_skips_booked_rooms(self):
+        Reservation.objects.create(check_in_date=self.check_in_date, check_out_date=self.check_out_date,
+                                   assigned_room=self.room_type.rooms.first())
+        self.client.force_authenticate(user=self.user_agent)
+        response = self.client.post(self.url, {"items": [self._item(self.room_type, 2)]}, format="json")
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        response = self.client.post(self.url, {"items": [self._item(self.room_type, 1)]}, format="json")
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_bulk_reservation_as_agent_date_in_past(self):
+        self.client.force_authenticate(user=self.user_agent)
+        item = self._item(self.room_type, 1)
+        item["check_in_date"] = datetime.date.today() - datetime.timedelta(days=1)
+        response = self.client.post(self.url, {"items": [item]}, format="json")
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+
+@patch.object(PageNumberPagination, 'page_size', 100)
+class ListQueryCountTestCase(ViewSetGenericTestCase):
+    '''
+    The number of queries of a 100 rows page should not depend on the number of rows
+    '''
+    def setUp(self):
+        super().setUp()
+        self.client.force_authenticate(user=self.user_agent)
+        check_in_date = datetime.date.today() + datetime.timedelta(days=30)
+        for i in range(100):
+            room_type = RoomType.objects.create(name=f"Room {i}", description="A room type", capacity=1, price_per_night=50)
+            room = Room.objects.create(number=f'A{i}', room_type=room_type)
+            Reservation.objects.create(user=self.user_guest, check_in_date=check_in_date, check_out_date=check_in_date + datetime.timedelta(days=2), assigned_room=room)
+        get_role_ids()
+
+    def test_list_rooms_query_count(self):
+        # COUNT + SELECT (cache miss)
+        with self.assertNumQueries(2):
+            response = self.client.get(reverse("rooms-list"))
+        self.assertEqual(len(response.data["results"]), 100)
+
+    def test_list_reservations_query_count(self):
+        with self.assertNumQueries(3):
+            response = self.client.get(reverse("reservations-list"))
+        self.assertEqual(len(response.data["results"]), 100)
+
+
+@override_settings(REQUEST_INSTRUMENTATION={'ENABLED': True, 'QUERY_BUDGET': 20, 'LATENCY_BUDGET_MS': 10000})
+class RequestInstrumentationMiddlewareTestCase(ViewSetGenericTestCase):
+    def setUp(self):
+        super().setUp()
+        self.client = APIClient()
+        self.client.force_authenticate(user=self.user_agent)
+        room_type = RoomType.objects.create(name="Single Room", description="A single room type", capacity=1, price_per_night=50)
+        Room.objects.create(number='A333', room_type=room_type)
+        get_role_ids()
+
+    def test_headers(self):
+        response = self.client.get(reverse("rooms-list"))
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response["X-DB-Queries"], "2")
+        self.assertRegex(response["Server-Timing"], r"^db;dur=[\d.]+, view;dur=[\d.]+, total;dur=[\d.]+$")
+
+    def test_over_budget_logged(self):
+        with override_settings(REQUEST_INSTRUMENTATION={'ENABLED': True, 'QUERY_BUDGET': 1, 'LATENCY_BUDGET_MS': 10000}):
+            client = APIClient()
+            client.force_authenticate(user=self.user_agent)
+            with self.assertLogs("hotel_reservation.middleware", level="WARNING") as logs:
+                client.get(reverse("rooms-list"))
+        self.assertIn("view=RoomViewSet.list queries=2", logs.output[0])
+
+    @override_settings(REQUEST_INSTRUMENTATION={'ENABLED': False, 'QUERY_BUDGET': 20, 'LATENCY_BUDGET_MS': 500})
+    def test_disabled(self):
+        client = APIClient()
+        client.force_authenticate(user=self.user_agent)
+        response = client.get(reverse("rooms-list"))
+        self.assertNotIn("X-DB-Queries", response)
+
+
+class ReservationKeysetPaginationTestCase(ViewSetGenericTestCase):
+    def setUp(self):
+        super().setUp()
+        self.client.force_authenticate(user=self.user_agent)
+        room_type = RoomType.objects.create(name="Single Room", description="A single room type", capacity=1, price_per_night=50)
+        rooms = [Room.objects.create(number=f'A{i}', room_type=room_type) for i in range(5)]
+        first_date = datetime.date.today() + datetime.timedelta(days=30)
+        # several reservations share the same check-in date, so ties are broken by id
+        for i in range(25):
+            check_in_date = first_date + datetime.timedelta(days=(i // 5) * 2)
+            Reservation.objects.create(check_in_date=check_in_date, check_out_date=check_in_date + datetime.timedelta(days=2), assigned_room=rooms[i % 5])
+        self.expected_ids = list(Reservation.objects.order_by('-check_in_date', 'id').values_list('id', flat=True))
+        get_role_ids()
+
+    def _ids(self, response):
+        return [reservation["id"] for reservation in response.data["results"]]
+
+    def test_list_reservations_cursor_pages(self):
+        ids = []
+        response = self.client.get(reverse("reservations-list"), {"pagination": "cursor"})
+        self.assertIsNone(response.data["previous"])
+        self.assertNotIn("count", response.data)
+        pages = [response]
+        while response.data["next"]:
+            # no COUNT query, only the page select
+            with self.assertNumQueries(1):
+                response = self.client.get(response.data["next"])
+            pages.append(response)
+        for page in pages:
+            ids += self._ids(page)
+        self.assertEqual(len(pages), 3)
+        self.assertEqual(ids, self.expected_ids)
+
+        # and back to the first page
+        response = self.client.get(pages[-1].data["previous"])
+        self.assertEqual(self._ids(response), self.expected_ids[10:20])
+        response = self.client.get(response.data["previous"])
+        self.assertEqual(self._ids(response), self.expected_ids[:10])
+        self.assertIsNone(response.data["previous"])
+
+    def test_cursor_page_seeks_the_index(self):
+        ordering = ["-check_in_date", "id"]
+        last = Reservation.objects.order_by(*ordering)[9]
+        queryset = Reservation.objects.order_by(*ordering).filter(KeysetPagination._after(ordering, [last.check_in_date, last.id]))
+        self.assertEqual(list(queryset.values_list("id", flat=True)), self.expected_ids[10:])
+        if connection.vendor == "sqlite":
+            # not a SCAN of the whole index from its start
+            self.assertIn("SEARCH rooms_reservation USING INDEX reservation_check_in_id_idx (check_in_date<?)", queryset[:10].explain())
+
+    def test_list_reservations_default_pagination(self):
+        response = self.client.get(reverse("reservations-list"))
+        self.assertEqual(response.data["count"], 25)
+
+    def test_list_reservations_invalid_cursor(self):
+        response = self.client.get(reverse("reservations-list"), {"pagination": "cursor", "cursor": "invalid"})
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
+
+class ExplainQueriesCommandTestCase(TestCase):
+    def test_hot_queries_use_indexes(self):
+        out = StringIO()
+        call_command("explain_queries", "--strict", stdout=out)
+        self.assertIn("overlapping reservations of a room: uses reservation_room_dates_idx", out.getvalue())
+        self.assertIn("reservations of a user: uses reservation_user_check_in_idx", out.getvalue())
+        self.assertIn("reservations list cursor page: uses reservation_check_in_id_idx", out.getvalue())
+
+    def test_full_scans(self):
+        self.assertEqual(full_scans("5 0 0 SCAN rooms_reservation USING INDEX reservation_check_in_id_idx"), {"rooms_reservation"})
+        self.assertEqual(full_scans("5 0 0 SEARCH rooms_reservation USING INDEX reservation_check_in_id_idx (check_in_date<?)"), set())
+        plan = "\n".join([
+            "Limit  (cost=0.43..2.05 rows=10 width=40)",
+            "  ->  Index Scan using reservation_check_in_id_idx on rooms_reservation  (cost=0.43..86140.42 rows=532461 width=40)",
+            "        Filter: (check_out_date > '2026-10-18'::date)",
+            "  ->  Index Scan using rooms_room_pkey on rooms_room  (cost=0.29..0.31 rows=1 width=8)",
+            "        Index Cond: (id = rooms_reservation.assigned_room_id)",
+        ])
+        self.assertEqual(full_scans(plan), {"rooms_reservation"})
+
+
+class ReservationFiltersTestCase(ViewSetGenericTestCase):
+    def setUp(self):
+        super().setUp()
+        self.client.force_authenticate(user=self.user_agent)
+        self.room_type = RoomType.objects.create(name="Single Room", description="A single room type", capacity=1, price_per_night=50)
+        self.room_type_2 = RoomType.objects.create(name="Family Room", description="A family room type", capacity=4, price_per_night=200)
+        self.room = Room.objects.create(number='A333', room_type=self.room_type)
+        self.room_2 = Room.objects.create(number='B333', room_type=self.room_type_2)
+        self.today = datetime.date.today()
+        day = datetime.timedelta(days=1)
+        self.past = Reservation.objects.create(user=self.user_guest, check_in_date=self.today - 5 * day, check_out_date=self.today - 2 * day, assigned_room=self.room)
+        self.current = Reservation.objects.create(user=self.user_guest_2, check_in_date=self.today - day, check_out_date=self.today + 2 * day, assigned_room=self.room)
+        self.upcoming = Reservation.objects.create(user=self.user_guest, check_in_date=self.today + 10 * day, check_out_date=self.today + 12 * day, assigned_room=self.room_2)
+        self.url = reverse("reservations-list")
+
+    def _ids(self, params):
+        response = self.client.get(self.url, params)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        return {reservation["id"] for reservation in response.data["results"]}
+
+    def test_overlap_window(self):
+        day = datetime.timedelta(days=1)
+        self.assertEqual(self._ids({"start_date": self.today, "end_date": self.today + 11 * day}), {self.current.id, self.upcoming.id})
+        # half-open: a window ending on the check-in day (or starting on the check-out day) doesn't overlap
+        self.assertEqual(self._ids({"start_date": self.today - 2 * day, "end_date": self.today - day}), set())
+        self.assertEqual(self._ids({"start_date": self.today + 3 * day}), {self.upcoming.id})
+        self.assertEqual(self._ids({"end_date": self.today}), {self.past.id, self.current.id})
+
+    def test_related_filters(self):
+        self.assertEqual(self._ids({"room_type": self.room_type_2.id}), {self.upcoming.id})
+        self.assertEqual(self._ids({"assigned_room": self.room.id}), {self.past.id, self.current.id})
+        self.assertEqual(self._ids({"user": self.user_guest.id}), {self.past.id, self.upcoming.id})
+        self.assertEqual(self._ids({"user": self.user_guest.id, "room_type": self.room_type.id}), {self.past.id})
+
+    def test_active_only(self):
+        self.assertEqual(self._ids({"active_only": "true"}), {self.current.id, self.upcoming.id})
+
+    def test_invalid_filters(self):
+        for params in [{"start_date": "not-a-date"}, {"start_date": self.today, "end_date": self.today}, {"room_type": "abc"}]:
+            response = self.client.get(self.url, params)
+            self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_single_query(self):
+        get_role_ids()
+        # fingerprint + COUNT + SELECT, the filters don't fetch the related objects
+        with self.assertNumQueries(3):
+            self.client.get(self.url, {"start_date": self.today, "room_type": self.room_type.id, "user": self.user_guest_2.id, "active_only": "1"})
+
+
+class CatalogCacheTestCase(ViewSetGenericTestCase):
+    def setUp(self):
+        super().setUp()
+        self.room_type = RoomType.objects.create(name="Single Room", description="A single room type", capacity=1, price_per_night=50)
+        self.room = Room.objects.create(number='A333', room_type=self.room_type)
+        get_role_ids()
+
+    def test_list_served_from_cache(self):
+        self.client.force_authenticate(user=self.user_agent)
+        response = self.client.get(reverse("room-types-list"))
+        with self.assertNumQueries(0):
+            cached_response = self.client.get(reverse("room-types-list"))
+        self.assertEqual(cached_response.data, response.data)
+        self.assertEqual(get_catalog_cache_stats(), {'hits': 1, 'misses': 1, 'hit_rate': 0.5})
+
+    def test_keyed_by_query_params(self):
+        self.client.force_authenticate(user=self.user_agent)
+        self.client.get(reverse("rooms-list"))
+        response = self.client.get(reverse("rooms-list"), {"page": 2})
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+        self.assertEqual(get_catalog_cache_stats()['misses'], 2)
+
+    def test_invalidated_on_save(self):
+        self.client.force_authenticate(user=self.user_agent)
+        self.client.get(reverse("rooms-detail", args=[self.room.id]))
+        self.room_type.name = "Double Room"
+        self.room_type.save()
+        response = self.client.get(reverse("rooms-detail", args=[self.room.id]))
+        self.assertEqual(response.data["room_type_info"]["name"], "Double Room")
+
+    def test_invalidated_on_delete(self):
+        self.client.force_authenticate(user=self.user_admin)
+        self.client.get(reverse("rooms-list"))
+        self.client.delete(reverse("rooms-detail", args=[self.room.id]))
+        response = self.client.get(reverse("rooms-list"))
+        self.assertEqual(response.data["count"], 0)
+
+    def test_not_served_before_permission_check(self):
+        self.client.force_authenticate(user=self.user_agent)
+        self.client.get(reverse("rooms-list"))
+        self.client.force_authenticate(user=self.user_guest)
+        response = self.client.get(reverse("rooms-list"))
+        self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
+
+    def test_stats_as_admin(self):
+        self.client.force_authenticate(user=self.user_admin)
+        self.client.get(reverse("room-types-list"))
+        self.client.get(reverse("room-types-list"))
+        response = self.client.get(reverse("room-types-cache-stats"))
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data, {'hits': 1, 'misses': 1, 'hit_rate': 0.5})
+
+    def test_stats_as_agent(self):
+        self.client.force_authenticate(user=self.user_agent)
+        response = self.client.get(reverse("room-types-cache-stats"))
+        self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
+
+
+class ConditionalGetTestCase(ViewSetGenericTestCase):
+    def setUp(self):
+        super().setUp()
+        self.client.force_authenticate(user=self.user_agent)
+        self.room_type = RoomType.objects.create(name="Single Room", description="A single room type", capacity=1, price_per_night=50)
+        self.room = Room.objects.create(number='A333', room_type=self.room_type)
+        check_in_date = datetime.date.today() + datetime.timedelta(days=10)
+        self.reservation = Reservation.objects.create(user=self.user_guest, check_in_date=check_in_date, check_out_date=check_in_date + datetime.timedelta(days=2), assigned_room=self.room)
+        get_role_ids()
+
+    def test_validators(self):
+        response = self.client.get(reverse("reservations-list"))
+        self.assertRegex(response["ETag"], r'^"[0-9a-f]{40}"$')
+        self.assertIn("Last-Modified", response)
+
+    def test_if_none_match(self):
+        url = reverse("reservations-detail", args=[self.reservation.id])
+        etag = self.client.get(url)["ETag"]
+        # the reservation is loaded but not serialized
+        with self.assertNumQueries(1):
+            response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+        self.assertEqual(response["ETag"], etag)
+        self.assertEqual(response.content, b"")
+
+    def test_if_modified_since(self):
+        url = reverse("rooms-list")
+        last_modified = self.client.get(url)["Last-Modified"]
+        response = self.client.get(url, HTTP_IF_MODIFIED_SINCE=last_modified)
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+
+    def test_changed_by_related_update(self):
+        url = reverse("reservations-list")
+        etag = self.client.get(url)["ETag"]
+        self.room_type.price_per_night = 60
+        self.room_type.save()
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertNotEqual(response["ETag"], etag)
+
+    def test_changed_by_delete(self):
+        url = reverse("reservations-list")
+        etag = self.client.get(url)["ETag"]
+        self.reservation.delete()
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+    def test_depends_on_query_params(self):
+        etag = self.client.get(reverse("reservations-list"))["ETag"]
+        response = self.client.get(reverse("reservations-list"), {"page_size": 1}, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+    def test_retrieve_loads_object_once(self):
+        url = reverse("reservations-detail", args=[self.reservation.id])
+        with self.assertNumQueries(1):
+            response = self.client.get(url)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data["id"], self.reservation.id)
+
+    def test_retrieve_checks_object_permissions(self):
+        # no 304 telling that the reservation exists and when it changed
+        self.client.force_authenticate(user=self.user_guest_2)
+        url = reverse("reservations-detail", args=[self.reservation.id])
+        future = http_date(time.time() + 3600)
+        response = self.client.get(url, HTTP_IF_MODIFIED_SINCE=future)
+        self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
+        self.assertNotIn("ETag", response)
+        self.assertNotIn("Last-Modified", response)
+
+    def test_catalog_without_queries(self):
+        url = reverse("rooms-detail", args=[self.room.id])
+        response = self.client.get(url)
+        with self.assertNumQueries(0):
+            self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=response["ETag"]).status_code, status.HTTP_304_NOT_MODIFIED)
+            self.assertEqual(self.client.get(url).data, response.data)
+        self.room_type.save()
+        self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=response["ETag"]).status_code, status.HTTP_200_OK)
+
+    def test_retrieve_not_found(self):
+        response = self.client.get(reverse("reservations-detail", args=[self.reservation.id + 1]))
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+        self.assertNotIn("ETag", response)
+
+    def test_cursor_pagination_not_conditional(self):
+        response = self.client.get(reverse("reservations-list"), {"pagination": "cursor"})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertNotIn("ETag", response)
+
+
+class OccupancyReportTestCase(ViewSetGenericTestCase):
+    def setUp(self):
+        super().setUp()
+        self.url = reverse("occupancy-report-list")
+        self.single = RoomType.objects.create(name="Single Room", description="A single room type", capacity=1, price_per_night=50)
+        self.double = RoomType.objects.create(name="Double Room", description="A double room type", capacity=2, price_per_night=80)
+        room_1 = Room.objects.create(number='A1', room_type=self.single)
+        room_2 = Room.objects.create(number='A2', room_type=self.single)
+        Room.objects.create(number='B1', room_type=self.double)
+        # 2025-01-06 is a Monday
+        Reservation.objects.create(user=self.user_guest, check_in_date="2025-01-04", check_out_date="2025-01-08", assigned_room=room_1)
+        Reservation.objects.create(user=self.user_guest, check_in_date="2025-01-07", check_out_date="2025-02-02", assigned_room=room_2)
+
+    def test_daily(self):
+        report = occupancy_report(datetime.date(2025, 1, 6), datetime.date(2025, 1, 7))
+        self.assertEqual(
+            [(row["period_start"], row["room_type"], row["occupied_nights"], row["occupancy_rate"], row["revenue"]) for row in report],
+            [
+                (datetime.date(2025, 1, 6), self.single.id, 1, 50.0, 50),
+                (datetime.date(2025, 1, 6), self.double.id, 0, 0.0, 0),
+                (datetime.date(2025, 1, 7), self.single.id, 2, 100.0, 100),
+                (datetime.date(2025, 1, 7), self.double.id, 0, 0.0, 0),
+            ]
+        )
+
+    def test_weekly(self):
+        report = occupancy_report(datetime.date(2025, 1, 1), datetime.date(2025, 1, 12), 'week')
+        single = [row for row in report if row["room_type"] == self.single.id]
+        self.assertEqual([(row["period_start"], row["period_end"]) for row in single], [
+            (datetime.date(2025, 1, 1), datetime.date(2025, 1, 5)),
+            (datetime.date(2025, 1, 6), datetime.date(2025, 1, 12)),
+        ])
+        # the nights of the 4th and 5th, then the 6th, the 7th and 6 nights from the 7th
+        self.assertEqual([row["occupied_nights"] for row in single], [2, 8])
+        self.assertEqual([row["available_nights"] for row in single], [10, 14])
+
+    def test_monthly(self):
+        report = occupancy_report(datetime.date(2025, 1, 1), datetime.date(2025, 2, 28), 'month')
+        single = [row for row in report if row["room_type"] == self.single.id]
+        self.assertEqual([row["occupied_nights"] for row in single], [4 + 25, 1])
+        self.assertEqual([row["revenue"] for row in single], [29 * 50, 50])
+        self.assertEqual(single[0]["occupancy_rate"], round(29 * 100 / 62, 2))
+
+    def test_as_admin(self):
+        self.client.force_authenticate(user=self.user_admin)
+        response = self.client.get(self.url, {"from": "2025-01-01", "to": "2025-12-31", "granularity": "month"})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(len(response.data["results"]), 12 * 2)
+
+    def test_as_agent(self):
+        self.client.force_authenticate(user=self.user_agent)
+        response = self.client.get(self.url, {"from": "2025-01-01", "to": "2025-12-31"})
+        self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
+
+    def test_invalid_params(self):
+        self.client.force_authenticate(user=self.user_admin)
+        for params in (
+            {"to": "2025-12-31"},
+            {"from": "2025-12-31", "to": "2025-01-01"},
+            {"from": "2025-01-01", "to": "2025-12-31", "granularity": "year"},
+            {"from": "2020-01-01", "to": "2025-12-31"},
+        ):
+            response = self.client.get(self.url, params)
+            self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+
+class ReservationExportTestCase(ViewSetGenericTestCase):
+    def setUp(self):
+        super().setUp()
+        self.url = reverse("reservation-export-list")
+        self.client.force_authenticate(user=self.user_agent)
+        room_type = RoomType.objects.create(name="Single Room", description="A single room type", capacity=1, price_per_night=50)
+        room = Room.objects.create(number='A333', room_type=room_type)
+        self.today = datetime.date.today()
+        for i in range(5):
+            check_in_date = self.today + datetime.timedelta(days=i * 3)
+            Reservation.objects.create(user=self.user_guest, check_in_date=check_in_date, check_out_date=check_in_date + datetime.timedelta(days=2), assigned_room=room)
+
+    def test_csv(self):
+        response = self.client.get(self.url)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertTrue(response.streaming)
+        self.assertEqual(response["Content-Type"], "text/csv")
+        lines = b"".join(response.streaming_content).decode().splitlines()
+        self.assertEqual(lines[0], "id,user,username,room,room_type,check_in_date,check_out_date,nights,cost")
+        self.assertEqual(len(lines), 6)
+        self.assertIn(f"guest-test,A333,Single Room,{self.today + datetime.timedelta(days=12)}", lines[1])
+        self.assertTrue(lines[1].endswith(",2,100"))
+
+    def test_ndjson_filtered(self):
+        response = self.client.get(self.url, {"output": "ndjson", "start_date": self.today + datetime.timedelta(days=4)})
+        self.assertEqual(response["Content-Type"], "application/x-ndjson")
+        rows = [json.loads(line) for line in b"".join(response.streaming_content).decode().splitlines()]
+        # the stay from the 3rd day is checked out on the 5th
+        self.assertEqual(len(rows), 4)
+        self.assertEqual(rows[-1]["check_in_date"], str(self.today + datetime.timedelta(days=3)))
+
+    def test_chunked_fetch(self):
+        # the rows are fetched lazily while the response is consumed
+        response = self.client.get(self.url)
+        with self.assertNumQueries(1):
+            b"".join(response.streaming_content)
+
+    def test_invalid_params(self):
+        for params in ({"output": "xml"}, {"start_date": "not-a-date"}):
+            response = self.client.get(self.url, params)
+            self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_as_guest(self):
+        self.client.force_authenticate(user=self.user_guest)
+        response = self.client.get(self.url)
+        self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
+
+    def test_command(self):
+        out = StringIO()
+        call_command("export_reservations", "--output", "ndjson", "--chunk-size", "2", "--active-only", stdout=out)
+        self.assertEqual(len(out.getvalue().splitlines()), 5)
+
+
+class ReservationCostTestCase(ViewSetGenericTestCase):
+    def setUp(self):
+        super().setUp()
+        self.client.force_authenticate(user=self.user_agent)
+        single = RoomType.objects.create(name="Single Room", description="A single room type", capacity=1, price_per_night=50)
+        double = RoomType.objects.create(name="Double Room", description="A double room type", capacity=2, price_per_night=80)
+        single_room = Room.objects.create(number='A1', room_type=single)
+        double_room = Room.objects.create(number='B1', room_type=double)
+        today = datetime.date.today()
+        # costs: 3 * 50, 1 * 80, 5 * 80
+        self.reservations = [
+            Reservation.objects.create(user=self.user_guest, check_in_date=today, check_out_date=today + datetime.timedelta(days=3), assigned_room=single_room),
+            Reservation.objects.create(user=self.user_guest, check_in_date=today, check_out_date=today + datetime.timedelta(days=1), assigned_room=double_room),
+            Reservation.objects.create(user=self.user_guest, check_in_date=today + datetime.timedelta(days=31), check_out_date=today + datetime.timedelta(days=36), assigned_room=double_room),
+        ]
+        get_role_ids()
+
+    def test_annotations(self):
+        reservations = Reservation.objects.with_cost().order_by('id')
+        self.assertEqual([(r.stay_nights, r.stay_cost) for r in reservations], [(3, 150), (1, 80), (5, 400)])
+
+    def test_cost_without_related_queries(self):
+        reservations = list(Reservation.objects.with_cost().order_by('id'))
+        with self.assertNumQueries(0):
+            self.assertEqual([reservation.cost for reservation in reservations], [150, 80, 400])
+
+    def test_totals(self):
+        with self.assertNumQueries(1):
+            totals = Reservation.objects.filter(assigned_room__room_type__name="Double Room").totals()
+        self.assertEqual(totals, {"reservations": 2, "nights": 6, "revenue": 480})
+        self.assertEqual(Reservation.objects.none().totals(), {"reservations": 0, "nights": 0, "revenue": 0})
+
+    def test_list_fields(self):
+        response = self.client.get(reverse("reservations-detail", args=[self.reservations[2].id]))
+        self.assertEqual(response.data["nights"], 5)
+        self.assertEqual(response.data["cost"], 400)
+
+    def test_list_ordering_by_cost(self):
+        response = self.client.get(reverse("reservations-list"), {"ordering": "-cost"})
+        self.assertEqual([r["cost"] for r in response.data["results"]], [400, 150, 80])
+
+    def test_list_filter_by_cost(self):
+        response = self.client.get(reverse("reservations-list"), {"min_cost": 100, "max_cost": 400})
+        self.assertEqual(sorted(r["cost"] for r in response.data["results"]), [150, 400])
+        response = self.client.get(reverse("reservations-list"), {"min_cost": 500, "max_cost": 100})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_totals_endpoint(self):
+        response = self.client.get(reverse("reservations-totals"), {"start_date": datetime.date.today() + datetime.timedelta(days=30)})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data, {"reservations": 1, "nights": 5, "revenue": 400})
+
+    def test_totals_endpoint_as_guest(self):
+        self.client.force_authenticate(user=self.user_guest)
+        response = self.client.get(reverse("reservations-totals"))
+        self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
+
+
+class AsyncViewsTestCase(ViewSetGenericTestCase):
+    def setUp(self):
+        super().setUp()
+        self.room_type = RoomType.objects.create(name="Single Room", description="A single room type", capacity=1, price_per_night=50)
+        for i in range(12):
+            Room.objects.create(number=f'A{i}', room_type=self.room_type)
+        for i in range(11):
+            RoomType.objects.create(name=f"Room {i}", description="A room type", capacity=2, price_per_night=80)
+        get_role_ids()
+        self.async_client = AsyncClient()
+
+    def _authorization(self, user):
+        return {"Authorization": f"Bearer {RoleTokenObtainPairSerializer.get_token(user).access_token}"}
+
+    async def test_availability(self):
+        check_in = datetime.date.today() + datetime.timedelta(days=10)
+        response = await self.async_client.get(
+            reverse("async-availability"),
+            {"check_in": check_in, "check_out": check_in + datetime.timedelta(days=2), "capacity": 1},
+            headers=self._authorization(self.user_guest)
+        )
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        single_room = next(room_type for room_type in response.json() if room_type["id"] == self.room_type.id)
+        self.assertEqual(single_room["available_rooms"], 12)
+        self.assertEqual(single_room["total_price"], 100)
+
+    async def test_availability_invalid_dates(self):
+        response = await self.async_client.get(
+            reverse("async-availability"), {"check_in": "2030-01-05", "check_out": "2030-01-01"},
+            headers=self._authorization(self.user_guest)
+        )
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    async def test_room_types_pages(self):
+        response = await self.async_client.get(reverse("async-room-types-list"), headers=self._authorization(self.user_guest))
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.json()["count"], 12)
+        self.assertEqual(len(response.json()["results"]), 10)
+        self.assertIsNone(response.json()["previous"])
+        response = await self.async_client.get(response.json()["next"], headers=self._authorization(self.user_guest))
+        self.assertEqual(len(response.json()["results"]), 2)
+        self.assertIsNone(response.json()["next"])
+        self.assertIsNotNone(response.json()["previous"])
+
+    async def test_room_type_detail(self):
+        response = await self.async_client.get(reverse("async-room-types-detail", args=[self.room_type.id]), headers=self._authorization(self.user_guest))
+        self.assertEqual(response.json()["name"], "Single Room")
+        response = await self.async_client.get(reverse("async-room-types-detail", args=[0]), headers=self._authorization(self.user_guest))
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
+    async def test_rooms_as_agent(self):
+        response = await self.async_client.get(reverse("async-rooms-detail", args=[(await Room.objects.afirst()).id]), headers=self._authorization(self.user_agent))
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.json()["room_type_info"]["name"], "Single Room")
+
+    async def test_rooms_as_guest(self):
+        response = await self.async_client.get(reverse("async-rooms-list"), headers=self._authorization(self.user_guest))
+        self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
+
+    async def test_unauthenticated(self):
+        response = await self.async_client.get(reverse("async-room-types-list"))
+        self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
+        self.assertIn("Bearer", response["WWW-Authenticate"])
+        response = await self.async_client.get(reverse("async-room-types-list"), headers={"Authorization": "Bearer invalid"})
+        self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
+
+    @override_settings(REQUEST_INSTRUMENTATION={'ENABLED': True, 'QUERY_BUDGET': 20, 'LATENCY_BUDGET_MS': 10000})
+    async def test_instrumentation(self):
+        # the handler, and its middlewares, are built with the client
+        response = await AsyncClient().get(reverse("async-room-types-list"), headers=self._authorization(self.user_guest))
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        # COUNT + SELECT
+        self.assertEqual(response["X-DB-Queries"], "2")
+
+
+class SeedHotelTestCase(TestCase):
+    def test_seed_hotel(self):
+        start_date = datetime.date(2030, 1, 1)
+        counts = seed_hotel(room_types=3, rooms=10, reservations=40, users=5, days=60, start_date=start_date, seed=1)
+        self.assertEqual(counts["rooms"], 10)
+        self.assertEqual(counts["reservations"], Reservation.objects.count())
+        self.assertEqual(counts["room_nights"], RoomNight.objects.count())
+        for reservation in Reservation.objects.all():
+            self.assertFalse(overlapping_reservations(reservation.check_in_date, reservation.check_out_date).filter(
+                assigned_room=reservation.assigned_room
+            ).exclude(pk=reservation.pk).exists())
+        # same seed, same data
+        stays = list(Reservation.objects.order_by("id").values_list("check_in_date", "check_out_date"))
+        Reservation.objects.all().delete()
+        Room.objects.all().delete()
+        RoomType.objects.all().delete()
+        User.objects.filter(username__startswith="seed-guest-").delete()
+        seed_hotel(room_types=3, rooms=10, reservations=40, users=5, days=60, start_date=start_date, seed=1)
+        self.assertEqual(list(Reservation.objects.order_by("id").values_list("check_in_date", "check_out_date")), stays)
+
+    def test_seed_hotel_command(self):
+        out = StringIO()
+        call_command("seed_hotel", "--room-types", "2", "--rooms", "5", "--users", "3", "--reservations", "30", "--batch-size", "7", stdout=out)
+        self.assertIn("30 reservations", out.getvalue())
+        self.assertEqual(RoomNight.objects.count(), sum(reservation.nights_count for reservation in Reservation.objects.all()))
+        # the ids were allocated by the seeding, the next reservation gets a new one
+        reservation = Reservation.objects.create(check_in_date="2090-01-01", check_out_date="2090-01-02", assigned_room=Room.objects.first())
+        self.assertEqual(reservation.id, Reservation.objects.order_by("-id").values_list("id", flat=True)[1] + 1)
+
+
+class CreateRoomsCommandTestCase(TestCase):
+    def test_create_rooms_twice(self):
+        call_command("create_rooms", stdout=StringIO())
+        RoomType.objects.filter(name="Sea View Room (small)").update(price_per_night=1)
+        out = StringIO()
+        call_command("create_rooms", stdout=out)
+        self.assertIn('"Sea View Room (small)" has been updated', out.getvalue())
+        self.assertEqual(RoomType.objects.count(), 4)
+        self.assertEqual(Room.objects.count(), 8)
+        self.assertEqual(RoomType.objects.get(name="Sea View Room (small)").price_per_night, 120)
+
+
+class UniqueNamesMigrationTestCase(TransactionTestCase):
+    before = [("rooms", "0007_updated_at")]
+    after = [("rooms", "0008_unique_room_type_name_room_number")]
+
+    def tearDown(self):
+        executor = MigrationExecutor(connection)
+        executor.migrate(executor.loader.graph.leaf_nodes())
+
+    def test_duplicates_reported(self):
+        executor = MigrationExecutor(connection)
+        executor.migrate(self.before)
+        old_apps = executor.loader.project_state(self.before).apps
+        OldRoomType = old_apps.get_model("rooms", "RoomType")
+        OldRoom = old_apps.get_model("rooms", "Room")
+        room_types = [
+            OldRoomType.objects.create(name="Single Room", description="A single room type", capacity=1, price_per_night=50)
+            for _ in range(2)
+        ]
+        rooms = [OldRoom.objects.create(number="A1", room_type=room_type) for room_type in room_types]
+        message = (
+            "Duplicated room type names or room numbers, rename them before migrating:\n"
+            f'RoomType name "Single Room": {room_types[0].pk}, {room_types[1].pk}\n'
+            f'Room number "A1": {rooms[0].pk}, {rooms[1].pk}'
+        )
+        executor = MigrationExecutor(connection)
+        with self.assertRaisesMessage(IntegrityError, message):
+            executor.migrate(self.after)
+        room_types[1].name = "Double Room"
+        room_types[1].save()
+        rooms[1].number = "A2"
+        rooms[1].save()
+        executor = MigrationExecutor(connection)
+        executor.migrate(self.after)
+        self.assertEqual(set(RoomType.objects.values_list("name", flat=True)), {"Single Room", "Double Room"})
+
+
+class LoadResultTestCase(TestCase):
+    def test_summary(self):
+        result = LoadResult()
+        result.latencies = [i / 1000 for i in range(1, 101)]
+        result.queries = [2, 4]
+        result.statuses[200] = 100
+        result.elapsed = 2.0
+        summary = result.summary()
+        self.assertEqual(summary["requests_per_second"], 50.0)
+        self.assertEqual((summary["p50_ms"], summary["p95_ms"], summary["p99_ms"]), (50.0, 95.0, 99.0))
+        self.assertEqual(summary["queries_per_request"], 3.0)
+        self.assertEqual(summary["statuses"], {"200": 100})
+
+
+class InventoryImportTestCase(ViewSetGenericTestCase):
+    def setUp(self):
+        super().setUp()
+        self.url = reverse("inventory-import-list")
+        self.client.force_authenticate(user=self.user_admin)
+        self.single = RoomType.objects.create(name="Single Room", description="A single room type", capacity=1, price_per_night=50)
+        self.double = RoomType.objects.create(name="Double Room", description="A double room type", capacity=2, price_per_night=80)
+        self.room = Room.objects.create(number='A1', room_type=self.single)
+        Room.objects.create(number='A2', room_type=self.single)
+        Room.objects.create(number='B1', room_type=self.double)
+
+    def _upload(self, content, **data):
+        return self.client.post(self.url, {"file": SimpleUploadedFile("inventory.csv", content.encode()), **data}, format="multipart")
+
+    def test_upsert_csv(self):
+        self.client.get(reverse("room-types-list"))
+        response = self._upload(
+            "number,room_type,description,capacity,price_per_night\n"
+            "A1,Single Room,,,\n"
+            "A2,Double Room,,,90\n"
+            "B1,Double Room,,,\n"
+            "C1,Suite,A suite,4,300\n"
+            "C2,Suite,,,\n"
+        )
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data["room_types"], {"created": 1, "updated": 1, "unchanged": 1, "deleted": 0})
+        self.assertEqual(response.data["rooms"], {"created": 2, "updated": 1, "unchanged": 2, "deleted": 0})
+        self.assertEqual(Room.objects.get(number="A2").room_type, self.double)
+        self.assertEqual(RoomType.objects.get(pk=self.double.pk).price_per_night, 90)
+        self.assertEqual(Room.objects.filter(room_type__name="Suite").count(), 2)
+        # the rooms are upserted in place and the catalog cache is invalidated
+        self.assertEqual(Room.objects.get(number="A1").pk, self.room.pk)
+        response = self.client.get(reverse("room-types-list"))
+        self.assertEqual(response.data["count"], 3)
+
+    def test_dry_run_and_delete(self):
+        check_in_date = datetime.date.today() + datetime.timedelta(days=3)
+        Reservation.objects.create(user=self.user_guest, check_in_date=check_in_date, check_out_date=check_in_date + datetime.timedelta(days=2), assigned_room=self.room)
+        content = "number,room_type\nA2,Single Room\n"
+        response = self._upload(content, delete=True)
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn('room "A1": has reservations', str(response.data))
+
+        content = "number,room_type\nA1,Single Room\n"
+        response = self._upload(content, delete=True, dry_run=True)
+        self.assertEqual(response.data["rooms"]["deleted"], 2)
+        self.assertEqual(response.data["room_types"]["deleted"], 1)
+        self.assertEqual(Room.objects.count(), 3)
+        response = self._upload(content, delete=True)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(list(Room.objects.values_list("number", flat=True)), ["A1"])
+        self.assertEqual(list(RoomType.objects.values_list("name", flat=True)), ["Single Room"])
+
+    def test_invalid_rows(self):
+        response = self._upload(
+            "number,room_type,description,capacity,price_per_night\n"
+            "A1,Single Room,,20,\n"
+            "C1,Suite,,,\n"
+            "C1,Single Room,,,\n"
+        )
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(len(response.data), 2)
+        self.assertTrue(response.data[0].startswith("line 2: capacity:"))
+        self.assertTrue(response.data[1].startswith("line 4: number:"))
+        # nothing is written when a new room type misses its attributes
+        response = self._upload("number,room_type\nC1,Suite\n")
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertFalse(Room.objects.filter(number="C1").exists())
+
+    def test_as_agent(self):
+        self.client.force_authenticate(user=self.user_agent)
+        response = self._upload("number,room_type\nA1,Single Room\n")
+        self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
+
+    def test_command_ndjson(self):
+        out = StringIO()
+        with tempfile.NamedTemporaryFile("w", suffix=".ndjson") as f:
+            f.write(
+                '{"room_type": "Suite", "description": "A suite", "capacity": 4, "price_per_night": 300}\n'
+                '{"number": "C1", "room_type": "Suite"}\n'
+            )
+            f.flush()
+            call_command("import_inventory", f.name, stdout=out)
+        self.assertEqual(json.loads(out.getvalue())["rooms"]["created"], 1)
+        self.assertEqual(Room.objects.get(number="C1").room_type.name, "Suite")
+
+
+class FakeConnection:
+    closed = False
+
+    def close(self):
+        self.closed = True
+
+
+class ConnectionPoolTestCase(TestCase):
+    def test_reuse_and_limits(self):
+        pool = ConnectionPool(FakeConnection, max_size=2, timeout=0.05)
+        first = pool.acquire()
+        second = pool.acquire()
+        with self.assertRaises(PoolTimeout):
+            pool.acquire()
+        pool.release(first)
+        self.assertIs(pool.acquire(), first)
+        pool.release(second, discard=True)
+        self.assertTrue(second.closed)
+        self.assertIsNot(pool.acquire(), second)
+        stats = pool.stats()
+        self.assertEqual((stats["open"], stats["idle"], stats["in_use"]), (2, 0, 2))
+        self.assertEqual((stats["checkouts"], stats["opened"], stats["closed"], stats["timeouts"]), (4, 3, 1, 1))
+
+    def test_waits_for_a_release(self):
+        pool = ConnectionPool(FakeConnection, max_size=1, timeout=5)
+        connection = pool.acquire()
+        with ThreadPoolExecutor(1) as executor:
+            future = executor.submit(pool.acquire)
+            time.sleep(0.05)
+            self.assertEqual(pool.stats()["waiting"], 1)
+            pool.release(connection)
+            self.assertIs(future.result(), connection)
+        self.assertGreater(pool.stats()["max_wait_ms"], 0)
+
+    def test_stale_connections_are_not_reused(self):
+        pool = ConnectionPool(FakeConnection, check=lambda connection: not getattr(connection, "broken", False))
+        connection = pool.acquire()
+        connection.broken = True
+        pool.release(connection)
+        self.assertIsNot(pool.acquire(), connection)
+        self.assertTrue(connection.closed)
+        pool = ConnectionPool(FakeConnection, max_idle=0)
+        connection = pool.acquire()
+        pool.release(connection)
+        time.sleep(0.01)
+        self.assertIsNot(pool.acquire(), connection)
+
+
+class DatabaseConnectionsViewTestCase(ViewSetGenericTestCase):
+    def test_as_admin(self):
+        self.client.force_authenticate(user=self.user_admin)
+        response = self.client.get(reverse("db-connections"))
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data["databases"]["default"]["vendor"], connection.vendor)
+        self.assertIn("pools", response.data)
+
+    def test_as_agent(self):
+        self.client.force_authenticate(user=self.user_agent)
+        response = self.client.get(reverse("db-connections"))
+        self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
+
+
+# the stickiness to the primary needs a cache shared between the workers
+SHARED_CACHES = {
+    "default": {
+        "BACKEND": "django.core.cache.backends.filebased.FileBasedCache",
+        "LOCATION": os.path.join(tempfile.gettempdir(), "hotel_reservation_test_cache"),
+    }
+}
+
+
+@override_settings(DATABASE_REPLICAS=["replica"], CACHES=SHARED_CACHES)
+class ReplicaRoutingTestCase(ViewSetGenericTestCase):
+    databases = {"default", "replica"}
+
+    def setUp(self):
+        cache.clear()
+        super().setUp()
+        self.room_type = RoomType.objects.create(name="Single Room", description="A single room type", capacity=1, price_per_night=50)
+        self.room = Room.objects.create(number="A1", room_type=self.room_type)
+        # a lagging replica, with the users but not the rooms and reservations yet
+        for obj in [*Group.objects.all(), *User.objects.all()]:
+            obj.save(using="replica")
+        check_in = datetime.date.today() + datetime.timedelta(days=10)
+        self.reservation = Reservation.objects.create(
+            user=self.user_guest, check_in_date=check_in, check_out_date=check_in + datetime.timedelta(days=2), assigned_room=self.room
+        )
+        get_role_ids()
+
+    def _authorization(self, user):
+        return {"HTTP_AUTHORIZATION": f"Bearer {RoleTokenObtainPairSerializer.get_token(user).access_token}"}
+
+    def test_reads_go_to_the_replica(self):
+        self.client.credentials(**self._authorization(self.user_agent))
+        response = self.client.get(reverse("reservations-list"))
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data["count"], 0)
+        self.client.credentials(**self._authorization(self.user_guest))
+        response = self.client.get(reverse("reservations-detail", args=[self.reservation.id]))
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
+    def test_reads_stick_to_the_primary_after_a_write(self):
+        self.client.credentials(**self._authorization(self.user_agent))
+        check_in = datetime.date.today() + datetime.timedelta(days=20)
+        data = {"check_in_date": check_in, "check_out_date": check_in + datetime.timedelta(days=3), "selected_room_type": self.room_type.id}
+        response = self.client.post(reverse("new-reservation-list"), data, format="json")
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        response = self.client.get(reverse("reservations-list"))
+        self.assertEqual(response.data["count"], 2)
+
+        # the other users still read from the replica
+        self.client.credentials(**self._authorization(self.user_admin))
+        self.assertEqual(self.client.get(reverse("reservations-list")).data["count"], 0)
+
+        cache.delete(sticky_key(self.user_agent.id))
+        self.client.credentials(**self._authorization(self.user_agent))
+        self.assertEqual(self.client.get(reverse("reservations-list")).data["count"], 0)
+
+    def test_failed_writes_do_not_stick(self):
+        self.client.credentials(**self._authorization(self.user_guest))
+        data = {"check_in_date": "2030-01-05", "check_out_date": "2030-01-01", "selected_room_type": self.room_type.id}
+        response = self.client.post(reverse("new-reservation-list"), data, format="json")
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIsNone(cache.get(sticky_key(self.user_guest.id)))
+
+    def test_other_actions_use_the_primary(self):
+        self.client.credentials(**self._authorization(self.user_admin))
+        response = self.client.get(reverse("db-connections"))
+        self.assertTrue(response.data["databases"]["replica"]["replica"])
+        # the cached catalog is filled from the primary
+        response = self.client.get(reverse("rooms-list"))
+        self.assertEqual(response.data["count"], 1)
+
+    async def test_async_views(self):
+        response = await AsyncClient().get(
+            reverse("async-rooms-list"), headers={"Authorization": self._authorization(self.user_agent)["HTTP_AUTHORIZATION"]}
+        )
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.json()["count"], 0)
+
+    @override_settings(CACHES={"default": {"BACKEND": "django.core.cache.backends.locmem.LocMemCache"}})
+    def test_requires_a_shared_cache(self):
+        with self.assertRaises(ImproperlyConfigured):
+            ReplicaRoutingMiddleware(lambda request: None)
+
+    @override_settings(DATABASE_REPLICAS=[])
+    def test_without_replicas(self):
+        self.client.credentials(**self._authorization(self.user_agent))
+        self.assertEqual(self.client.get(reverse("reservations-list")).data["count"], 1)
+
+
+class RoomAssignmentTestCase(TestCase):
+    def setUp(self):
+        self.room_type = RoomType.objects.create(name="Single Room", description="A single room type", capacity=1, price_per_night=50)
+        self.room_1 = Room.objects.create(number="A1", room_type=self.room_type)
+        self.room_2 = Room.objects.create(number="A2", room_type=self.room_type)
+        self.day = datetime.date.today() + datetime.timedelta(days=10)
+        # room 2 is booked right before the stay, and 3 nights after it
+        Reservation.objects.create(check_in_date=self.day - datetime.timedelta(days=2), check_out_date=self.day, assigned_room=self.room_2)
+        Reservation.objects.create(
+            check_in_date=self.day + datetime.timedelta(days=5), check_out_date=self.day + datetime.timedelta(days=6), assigned_room=self.room_2
+        )
+        self.stay = (self.day, self.day + datetime.timedelta(days=2))
+
+    def test_snapshot(self):
+        with self.assertNumQueries(2):
+            snapshot = AvailabilitySnapshot.load(self.room_type, [self.stay], horizon=4)
+        self.assertEqual(snapshot.gaps(self.room_1, *self.stay), (4, 4))
+        self.assertEqual(snapshot.gaps(self.room_2, *self.stay), (0, 3))
+        self.assertEqual(snapshot.booked_nights(self.room_2), 3)
+        self.assertFalse(snapshot.is_free(self.room_2, self.day - datetime.timedelta(days=1), self.day))
+        snapshot.book(self.room_1, *self.stay)
+        self.assertEqual(list(snapshot.free_rooms(*self.stay)), [self.room_2])
+
+    def test_snapshot_skips_booked_rooms(self):
+        Reservation.objects.create(check_in_date=self.stay[0], check_out_date=self.stay[1], assigned_room=self.room_1)
+        snapshot = AvailabilitySnapshot.load(self.room_type, [self.stay])
+        self.assertEqual(snapshot.rooms, [self.room_2])
+        Reservation.objects.create(check_in_date=self.stay[0], check_out_date=self.stay[1], assigned_room=self.room_2)
+        with self.assertNumQueries(1):
+            snapshot = AvailabilitySnapshot.load(self.room_type, [self.stay])
+        self.assertEqual(snapshot.rooms, [])
+
+    def test_snapshot_of_several_stays(self):
+        # room 2 is only free for the later stay
+        later_stay = (self.day + datetime.timedelta(days=10), self.day + datetime.timedelta(days=12))
+        Reservation.objects.create(check_in_date=self.stay[0], check_out_date=self.stay[1], assigned_room=self.room_2)
+        snapshot = AvailabilitySnapshot.load(self.room_type, [self.stay, later_stay])
+        self.assertEqual(snapshot.rooms, [self.room_1, self.room_2])
+        reservations = book_rooms([
+            {"room_type": self.room_type, "count": 1, "check_in_date": self.stay[0], "check_out_date": self.stay[1]},
+            {"room_type": self.room_type, "count": 2, "check_in_date": later_stay[0], "check_out_date": later_stay[1]},
+        ])
+        rooms_by_stay = {}
+        for reservation in reservations:
+            rooms_by_stay.setdefault(reservation.check_in_date, set()).add(reservation.assigned_room)
+        self.assertEqual(rooms_by_stay, {self.stay[0]: {self.room_1}, later_stay[0]: {self.room_1, self.room_2}})
+
+    def test_first_fit_single_query(self):
+        with self.assertNumQueries(1):
+            self.assertEqual(find_room(self.room_type, *self.stay, strategy=first_fit), self.room_1)
+
+    def test_strategies(self):
+        for name, room in [("first_fit", self.room_1), ("best_fit", self.room_2), ("least_used", self.room_1)]:
+            with self.subTest(name), override_settings(ROOM_ASSIGNMENT_STRATEGY=name):
+                reservation = book_room(self.room_type, *self.stay)
+                self.assertEqual(reservation.assigned_room, room)
+                reservation.delete()
+
+    def test_unknown_strategy(self):
+        with override_settings(ROOM_ASSIGNMENT_STRATEGY="random"), self.assertRaises(ImproperlyConfigured):
+            get_assignment_strategy()
+
+    def test_bench_assignment_command(self):
+        out = StringIO()
+        call_command("bench_assignment", "--rooms", "5", "--days", "30", "--json", stdout=out)
+        results = json.loads(out.getvalue())["results"]
+        self.assertEqual(set(results), {"first_fit", "best_fit", "least_used"})
+        for result in results.values():
+            self.assertLessEqual(result["occupancy"], 1)
+            self.assertGreater(result["booked"], 0)
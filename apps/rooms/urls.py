@@ -1,23 +1,40 @@
 from django.urls import path, include
 from rest_framework.routers import DefaultRouter
+from .async_views import AsyncRoomTypeView, AsyncRoomView, AsyncAvailabilityView
 from .views import (
     RoomTypeViewSet,
     RoomViewSet,
+    AvailabilityViewSet,
     CreateReservationViewSet,
+    BulkReservationViewSet,
     GetReservationViewSet,
+    ReservationExportViewSet,
     UpdateDateRangeReservationViewSet,
-    UpdateRoomReservationViewSet
+    UpdateRoomReservationViewSet,
+    OccupancyReportViewSet,
+    InventoryImportViewSet
 )
 
 
 router = DefaultRouter()
 router.register('roomtypes', RoomTypeViewSet, basename='room-types')
 router.register('rooms', RoomViewSet, basename='rooms')
+router.register('availability', AvailabilityViewSet, basename='availability')
 router.register('reservation', CreateReservationViewSet, basename='new-reservation')
+router.register('reservations/bulk', BulkReservationViewSet, basename='bulk-reservation')
+router.register('reservations/export', ReservationExportViewSet, basename='reservation-export')
 router.register('reservations', GetReservationViewSet, basename='reservations')
 router.register('updatereservationdates', UpdateDateRangeReservationViewSet, basename='reservation-dates')
 router.register('updatereservationroom', UpdateRoomReservationViewSet, basename='reservation-room')
+router.register('reports/occupancy', OccupancyReportViewSet, basename='occupancy-report')
+router.register('inventory/import', InventoryImportViewSet, basename='inventory-import')
 
 urlpatterns = [
-    path('', include(router.urls))
+    path('', include(router.urls)),
+    # async read-only endpoints, served without a worker thread per request under ASGI
+    path('async/roomtypes/', AsyncRoomTypeView.as_view(), name='async-room-types-list'),
+    path('async/roomtypes/<int:pk>/', AsyncRoomTypeView.as_view(), name='async-room-types-detail'),
+    path('async/rooms/', AsyncRoomView.as_view(), name='async-rooms-list'),
+    path('async/rooms/<int:pk>/', AsyncRoomView.as_view(), name='async-rooms-detail'),
+    path('async/availability/', AsyncAvailabilityView.as_view(), name='async-availability'),
 ]
\ No newline at end of file
@@ -1,5 +1,7 @@
+import io
 from django.contrib.auth import get_user_model
-from rest_framework.viewsets import ModelViewSet, GenericViewSet
+from django.http import StreamingHttpResponse
+from rest_framework.viewsets import ModelViewSet, GenericViewSet, ViewSet
 from rest_framework.mixins import (
     CreateModelMixin, 
     RetrieveModelMixin, 
@@ -7,22 +9,39 @@ from rest_framework.mixins import (
     UpdateModelMixin,
     DestroyModelMixin
 )
+from rest_framework.decorators import action
+from rest_framework.parsers import MultiPartParser
 from rest_framework.permissions import IsAuthenticated
+from rest_framework.response import Response
+from hotel_reservation.conditional import ConditionalGetMixin
+from hotel_reservation.pagination import SelectablePaginationMixin
+from apps.users.authentication import StatelessAuthenticationMixin
 from apps.users.permissions import IsAdminRole, IsAgentRole, IsOwnerOrAdminOrAgentRole
+from .availability import room_type_availability
+from .cache import CachedCatalogMixin, CatalogConditionalGetMixin, get_catalog_cache_stats
+from .exports import EXPORT_FORMATS, ReservationExportSerializer, export_reservations
+from .filters import filter_reservations
+from .inventory import InventoryImportSerializer, import_inventory
 from .models import RoomType, Room, Reservation
+from .reports import OccupancyReportQuerySerializer, occupancy_report
 from .serializers import (
     RoomTypeSerializer,
     RoomSerializer,
+    AvailabilitySearchSerializer,
+    RoomTypeAvailabilitySerializer,
     CreateReservationSerializer,
+    BulkReservationSerializer,
     GetReservationSerializer,
     UpdateDateRangeReservationSerializer,
     UpdateRoomReservationSerializer
 )
 
 
-class RoomTypeViewSet(ModelViewSet):
+class RoomTypeViewSet(StatelessAuthenticationMixin, CatalogConditionalGetMixin, CachedCatalogMixin, ModelViewSet):
     queryset = RoomType.objects.all()
     serializer_class = RoomTypeSerializer
+    stateless_authentication_actions = ('list', 'retrieve')
+    catalog_cache_name = 'roomtypes'
 
     def get_permissions(self):
         permission_classes = []
@@ -36,12 +55,29 @@ class RoomTypeViewSet(ModelViewSet):
             permission_classes = [IsAdminRole]
         elif self.action == 'destroy':
             permission_classes = [IsAdminRole]
+        elif self.action == 'cache_stats':
+            permission_classes = [IsAdminRole]
         return [permission() for permission in permission_classes]
+
+    @action(detail=False, methods=['get'], url_path='cache-stats')
+    def cache_stats(self, request):
+        '''
+        Hits, misses and hit rate of the room types and rooms cache
+        '''
+        return Response(get_catalog_cache_stats())
     
 
-class RoomViewSet(ModelViewSet):
+class RoomViewSet(CatalogConditionalGetMixin, CachedCatalogMixin, ModelViewSet):
     queryset = Room.objects.all()
     serializer_class = RoomSerializer
+    catalog_cache_name = 'rooms'
+
+    def get_queryset(self):
+        queryset = super().get_queryset()
+        if self.action != 'destroy':
+            # room_type_info is serialized for every room
+            queryset = queryset.select_related('room_type')
+        return queryset
 
     def get_permissions(self):
         permission_classes = []
@@ -58,15 +94,44 @@ class RoomViewSet(ModelViewSet):
         return [permission() for permission in permission_classes]
     
 
+class AvailabilityViewSet(ListModelMixin, GenericViewSet):
+    '''
+    Lists every room type with its number of available rooms and the total price
+    for the requested check_in/check_out dates (and optional minimum capacity)
+    '''
+    serializer_class = RoomTypeAvailabilitySerializer
+    permission_classes = [IsAuthenticated]
+    pagination_class = None
+
+    def get_queryset(self):
+        search = AvailabilitySearchSerializer(data=self.request.query_params)
+        search.is_valid(raise_exception=True)
+        return room_type_availability(
+            search.validated_data['check_in'],
+            search.validated_data['check_out'],
+            search.validated_data.get('capacity')
+        )
+
+
 class CreateReservationViewSet(CreateModelMixin, GenericViewSet):
     queryset = Reservation.objects.all()
     serializer_class = CreateReservationSerializer
     permission_classes = [IsAuthenticated]  # TODO: need to prevent the guest user from a reservation for another user
 
 
-class GetReservationViewSet(RetrieveModelMixin, ListModelMixin, DestroyModelMixin, GenericViewSet):
+class BulkReservationViewSet(CreateModelMixin, GenericViewSet):
+    queryset = Reservation.objects.all()
+    serializer_class = BulkReservationSerializer
+    permission_classes = [IsAuthenticated]  # TODO: need to prevent the guest user from a reservation for another user
+
+
+class GetReservationViewSet(SelectablePaginationMixin, ConditionalGetMixin, RetrieveModelMixin, ListModelMixin, DestroyModelMixin, GenericViewSet):
     queryset = Reservation.objects.all()
     serializer_class = GetReservationSerializer
+    # assigned_room_info -> room_type_info is part of the representation
+    last_modified_fields = ('updated_at', 'assigned_room__updated_at', 'assigned_room__room_type__updated_at')
+    # used by ?pagination=cursor, backed by the (-check_in_date, id) index of Reservation
+    keyset_ordering = ('-check_in_date', 'id')
     
     def get_permissions(self):
         permission_classes = []
@@ -76,21 +141,48 @@ class GetReservationViewSet(RetrieveModelMixin, ListModelMixin, DestroyModelMixi
             permission_classes = [IsOwnerOrAdminOrAgentRole]
         elif self.action == 'destroy':
             permission_classes = [IsAdminRole|IsAgentRole]
+        elif self.action == 'totals':
+            permission_classes = [IsAdminRole|IsAgentRole]
         return [permission() for permission in permission_classes]
     
     def get_queryset(self):
         queryset = super().get_queryset()
-        start_date = self.request.query_params.get('start_date')
-        end_date = self.request.query_params.get('end_date')
-        if start_date:
-            queryset = queryset.filter(check_out_date__gte=start_date)
-        if end_date:
-            queryset = queryset.filter(check_in_date__gte=end_date)
+        if self.action in ('list', 'retrieve'):
+            # assigned_room_info -> room_type_info is serialized for every reservation
+            queryset = queryset.select_related('assigned_room__room_type').with_cost()
+        if self.action in ('list', 'totals'):
+            queryset = filter_reservations(queryset, self.request.query_params)
         return queryset
+
+    @action(detail=False, methods=['get'])
+    def totals(self, request):
+        '''
+        Number of reservations, nights and revenue of the filtered reservations list
+        '''
+        return Response(self.get_queryset().totals())
     
 
-class UpdateDateRangeReservationViewSet(UpdateModelMixin, GenericViewSet):
+class ReservationExportViewSet(GenericViewSet):
+    '''
+    Streams the reservations as CSV or NDJSON (?output=csv|ndjson) with the filters
+    of the reservations list, e.g. ?output=ndjson&start_date=2024-01-01&end_date=2024-04-01
+    '''
     queryset = Reservation.objects.all()
+    permission_classes = [IsAdminRole|IsAgentRole]
+
+    def list(self, request):
+        export = ReservationExportSerializer(data=request.query_params)
+        export.is_valid(raise_exception=True)
+        output = export.validated_data['output']
+        queryset = filter_reservations(self.get_queryset(), request.query_params)
+        content_type, _ = EXPORT_FORMATS[output]
+        response = StreamingHttpResponse(export_reservations(queryset, output), content_type=content_type)
+        response['Content-Disposition'] = f'attachment; filename="reservations.{output}"'
+        return response
+    
+
+class UpdateDateRangeReservationViewSet(UpdateModelMixin, GenericViewSet):
+    queryset = Reservation.objects.select_related('assigned_room__room_type')
     serializer_class = UpdateDateRangeReservationSerializer
     permission_classes = [IsAdminRole|IsAgentRole]
 
@@ -98,4 +190,40 @@ class UpdateDateRangeReservationViewSet(UpdateModelMixin, GenericViewSet):
 class UpdateRoomReservationViewSet(UpdateModelMixin, GenericViewSet):
     queryset = Reservation.objects.all()
     serializer_class = UpdateRoomReservationSerializer
-    permission_classes = [IsAdminRole|IsAgentRole]
\ No newline at end of file
+    permission_classes = [IsAdminRole|IsAgentRole]
+
+
+class OccupancyReportViewSet(ViewSet):
+    '''
+    Occupancy rate and revenue of every room type per day, week or month,
+    e.g. ?from=2024-01-01&to=2024-12-31&granularity=month
+    '''
+    permission_classes = [IsAdminRole]
+
+    def list(self, request):
+        query = OccupancyReportQuerySerializer(data=request.query_params)
+        query.is_valid(raise_exception=True)
+        data = query.validated_data
+        return Response({
+            'from': data['from'],
+            'to': data['to'],
+            'granularity': data['granularity'],
+            'results': occupancy_report(data['from'], data['to'], data['granularity']),
+        })
+
+
+class InventoryImportViewSet(ViewSet):
+    '''
+    Upserts the room types and rooms of an uploaded CSV or NDJSON file (multipart `file`, with
+    `input=csv|ndjson`, `delete` to delete the ones left out of the file and `dry_run` to only
+    count the changes), e.g. a CSV with the header: number,room_type,description,capacity,price_per_night
+    '''
+    permission_classes = [IsAdminRole]
+    parser_classes = [MultiPartParser]
+
+    def create(self, request):
+        upload = InventoryImportSerializer(data=request.data)
+        upload.is_valid(raise_exception=True)
+        data = upload.validated_data
+        lines = io.TextIOWrapper(data['file'].file, encoding='utf-8-sig', newline='')
+        return Response(import_inventory(lines, data['input'], delete=data['delete'], dry_run=data['dry_run']))
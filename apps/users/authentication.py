@@ -0,0 +1,44 @@
+from django.utils.functional import cached_property
+from rest_framework_simplejwt.authentication import JWTStatelessUserAuthentication
+from rest_framework_simplejwt.models import TokenUser
+
+
+class RoleTokenUser(TokenUser):
+    '''
+    A user built from the claims of the access token only, exposing the role the same way
+    as CustomUser does (`role_id`), so the role permissions work without a database hit
+    '''
+
+    @cached_property
+    def role_id(self):
+        return self.token.get('role_id')
+
+    @cached_property
+    def role_name(self):
+        return self.token.get('role_name')
+
+
+class StatelessJWTAuthentication(JWTStatelessUserAuthentication):
+    '''
+    Authenticates a request by validating the token only, without loading the user from the database.
+    Access tokens stay valid until they expire even if the user is deactivated or changes role,
+    so it is meant for read-only endpoints.
+    '''
+
+    def get_user(self, validated_token):
+        return RoleTokenUser(validated_token)
+
+
+class StatelessAuthenticationMixin:
+    '''
+    Authenticates the actions listed in `stateless_authentication_actions` with StatelessJWTAuthentication
+    and the others with the default authentication classes
+    '''
+    stateless_authentication_actions = ()
+
+    def get_authenticators(self):
+        # called before `self.action` is set, so resolve it from the action map of the viewset
+        action = self.action_map.get(self.request.method.lower())
+        if action in self.stateless_authentication_actions:
+            return [StatelessJWTAuthentication()]
+        return super().get_authenticators()
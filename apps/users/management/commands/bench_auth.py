@@ -0,0 +1,67 @@
+import time
+from django.contrib.auth import get_user_model
+from django.contrib.auth.models import Group
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+from rest_framework.test import APIRequestFactory
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from apps.rooms.models import RoomType
+from apps.rooms.views import RoomTypeViewSet
+from apps.users.authentication import StatelessJWTAuthentication
+from apps.users.constants import GUEST_USER
+from apps.users.serializers import RoleTokenObtainPairSerializer
+
+
+User = get_user_model()
+
+
+class Command(BaseCommand):
+    help = 'Compares requests/second of RoomTypeViewSet.list with JWTAuthentication and StatelessJWTAuthentication'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--requests', type=int, default=2000, help='number of requests per authentication class')
+
+    def handle(self, *args, **options):
+        '''
+        Calls the room types list view directly (no middlewares) with a bearer token. The benchmark
+        data is created inside a transaction which is rolled back at the end.
+        '''
+        with transaction.atomic():
+            role, _ = Group.objects.get_or_create(name=GUEST_USER)
+            user = User.objects.create(username='bench-auth-user', email='bench.auth@example.com', role=role)
+            RoomType.objects.create(name='Bench Room', description='Benchmark room type', capacity=1, price_per_night=100)
+            token = RoleTokenObtainPairSerializer.get_token(user).access_token
+
+            for authentication_class in (JWTAuthentication, StatelessJWTAuthentication):
+                self._bench(authentication_class, str(token), options['requests'])
+
+            transaction.set_rollback(True)
+
+    def _bench(self, authentication_class, token, requests_count):
+        factory = APIRequestFactory()
+        view = type('BenchRoomTypeViewSet', (RoomTypeViewSet,), {
+            'stateless_authentication_actions': (),
+            'authentication_classes': [authentication_class],
+        }).as_view({'get': 'list'})
+
+        queries_count = 0
+
+        def count_queries(execute, sql, params, many, context):
+            nonlocal queries_count
+            queries_count += 1
+            return execute(sql, params, many, context)
+
+        with connection.execute_wrapper(count_queries):
+            started_at = time.perf_counter()
+            for _ in range(requests_count):
+                response = view(factory.get('/', HTTP_AUTHORIZATION=f'Bearer {token}'))
+                response.render()
+            elapsed = time.perf_counter() - started_at
+        if response.status_code != 200:
+            self.stderr.write(self.style.ERROR(f'{authentication_class.__name__}: unexpected status {response.status_code}'))
+            return
+
+        self.stdout.write(self.style.SUCCESS(
+            f'{authentication_class.__name__}: {requests_count / elapsed:.0f} requests/second, '
+            f'{queries_count / requests_count:.1f} queries/request'
+        ))
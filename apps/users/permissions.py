@@ -1,33 +1,93 @@
 from django.contrib.auth.models import Group
+from django.core.cache import cache
 from rest_framework.permissions import BasePermission
 from .constants import ADMIN_USER, AGENT_USER, GUEST_USER
 
 
-def _is_in_group(user, group_name):
+# role name -> group id, kept in the shared cache so that every worker sees a change of the
+# groups: the version is bumped whenever a Group is saved or deleted, in whichever process
+ROLE_IDS_VERSION_KEY = 'roles:version'
+# a map missing some roles (e.g. loaded before populate_groups) is only kept for a short while,
+# in case the Group signal was missed, e.g. with a per-process cache
+INCOMPLETE_ROLE_IDS_TIMEOUT = 60
+ROLE_NAMES = (ADMIN_USER, AGENT_USER, GUEST_USER)
+
+
+def _get_role_ids_version():
+    version = cache.get(ROLE_IDS_VERSION_KEY)
+    if version is None:
+        cache.add(ROLE_IDS_VERSION_KEY, 1, None)
+        version = cache.get(ROLE_IDS_VERSION_KEY, 1)
+    return version
+
+
+def get_role_ids():
     """
-    Takes a user and a group name, and returns `True` if the user is in that group.
+    Returns the cached map of role names to their group ids.
     """
+    # the version is read before the groups, so a map loaded while a Group changes is stored
+    # under the outdated version rather than the new one
+    cache_key = f'roles:{_get_role_ids_version()}:ids'
+    role_ids = cache.get(cache_key)
+    if role_ids is None:
+        role_ids = dict(Group.objects.filter(name__in=ROLE_NAMES).values_list('name', 'id'))
+        cache.set(cache_key, role_ids, None if len(role_ids) == len(ROLE_NAMES) else INCOMPLETE_ROLE_IDS_TIMEOUT)
+    return role_ids
+
+
+def clear_role_ids_cache():
     try:
-        return Group.objects.get(name=group_name).users.filter(id=user.id).exists()
-    except Group.DoesNotExist:
-        return None
+        cache.incr(ROLE_IDS_VERSION_KEY)
+    except ValueError:
+        # missing (or evicted) version, any map left is under an older one
+        cache.add(ROLE_IDS_VERSION_KEY, 1, None)
+        cache.incr(ROLE_IDS_VERSION_KEY)
+
+
+def get_request_role_ids(request):
+    """
+    Returns the role ids, memoized on the request so that the cache is read once per request.
+    """
+    role_ids = getattr(request, '_role_ids', None)
+    if role_ids is None:
+        role_ids = request._role_ids = get_role_ids()
+    return role_ids
+
+
+def _is_in_group(user, role_ids, group_name):
+    """
+    Takes a user, the role ids and a group name, and returns `True` if the user is in that group.
+    """
+    role_id = role_ids.get(group_name)
+    return role_id is not None and getattr(user, 'role_id', None) == role_id
 
-def _has_group_permission(user, required_groups):
-    return any([_is_in_group(user, group_name) for group_name in required_groups])
+def _has_group_permission(request, required_groups):
+    """
+    Returns `True` if the user of the request is in any of the required groups. The result is
+    memoized on the request, as object permissions are checked again for every object.
+    """
+    checked_groups = getattr(request, '_checked_groups', None)
+    if checked_groups is None:
+        checked_groups = request._checked_groups = {}
+    key = tuple(required_groups)
+    if key not in checked_groups:
+        role_ids = get_request_role_ids(request)
+        checked_groups[key] = any(_is_in_group(request.user, role_ids, group_name) for group_name in required_groups)
+    return checked_groups[key]
 
 
 class IsOwnerOrHigherRole(BasePermission):
     required_groups = [ADMIN_USER, AGENT_USER]
     
     def has_object_permission(self, request, view, obj):
-        has_group_permission = _has_group_permission(request.user, self.required_groups)
-        return obj == request.user or has_group_permission
+        has_group_permission = _has_group_permission(request, self.required_groups)
+        return (request.user.is_authenticated and obj.pk == request.user.pk) or has_group_permission
     
 
 class IsOwnerOrOtherRoles(BasePermission):
     def has_object_permission(self, request, view, obj):
-        has_group_permission = _has_group_permission(request.user, self.required_groups)
-        return obj.user == request.user or has_group_permission
+        has_group_permission = _has_group_permission(request, self.required_groups)
+        return (request.user.is_authenticated and obj.user_id == request.user.pk) or has_group_permission
     
 class IsOwnerOrAdminRole(IsOwnerOrOtherRoles):
     # group_name for admin users
@@ -41,11 +101,11 @@ class IsOwnerOrAdminOrAgentRole(IsOwnerOrOtherRoles):
 
 class RoleBasePermission(BasePermission):
     def has_permission(self, request, view):
-        has_group_permission = _has_group_permission(request.user, self.required_groups)
+        has_group_permission = _has_group_permission(request, self.required_groups)
         return request.user and has_group_permission
 
     def has_object_permission(self, request, view, obj):
-        has_group_permission = _has_group_permission(request.user, self.required_groups)
+        has_group_permission = _has_group_permission(request, self.required_groups)
         return request.user and has_group_permission
 
 
@@ -3,6 +3,7 @@ from django.contrib.auth.password_validation import validate_password
 from django.core.exceptions import ValidationError
 from django.db import transaction
 from rest_framework import serializers
+from rest_framework_simplejwt.serializers import TokenObtainPairSerializer
 from .constants import GUEST_USER
 
 
@@ -74,4 +75,18 @@ class RegistrationSerializer(serializers.ModelSerializer):
         except ValidationError as err:
             user.delete()
             raise serializers.ValidationError({'password': err.messages})
-        return user
\ No newline at end of file
+        return user
+
+
+class RoleTokenObtainPairSerializer(TokenObtainPairSerializer):
+    '''
+    Adds the role of the user (group id and name) to the token claims, so that
+    the role permissions can be checked from the token only
+    '''
+
+    @classmethod
+    def get_token(cls, user):
+        token = super().get_token(user)
+        token['role_id'] = user.role_id
+        token['role_name'] = user.role.name
+        return token
@@ -0,0 +1,13 @@
+from django.contrib.auth.models import Group
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+from .permissions import clear_role_ids_cache
+
+
+@receiver(post_save, sender=Group)
+@receiver(post_delete, sender=Group)
+def group_changed(sender, **kwargs):
+    clear_role_ids_cache()
+    # and again once committed, in case another worker reloaded the groups before the change was committed
+    transaction.on_commit(clear_role_ids_cache)
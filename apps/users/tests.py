@@ -1,3 +1,194 @@
+import time
+from types import SimpleNamespace
+from unittest.mock import patch
+from django.contrib.auth import get_user_model
+from django.contrib.auth.models import AnonymousUser, Group
 from django.test import TestCase
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.pagination import PageNumberPagination
+from rest_framework.request import Request
+from rest_framework.test import APIClient, APIRequestFactory
+from rest_framework_simplejwt.tokens import AccessToken
+from apps.rooms.models import RoomType
+from .authentication import StatelessJWTAuthentication
+from .constants import ADMIN_USER, AGENT_USER, GUEST_USER
+from .permissions import (
+    INCOMPLETE_ROLE_IDS_TIMEOUT,
+    IsAdminRole,
+    IsAgentRole,
+    IsOwnerOrAdminOrAgentRole,
+    IsOwnerOrHigherRole,
+    clear_role_ids_cache,
+    get_role_ids
+)
 
-# Create your tests here.
+User = get_user_model()
+
+
+class RolePermissionsTestCase(TestCase):
+    def setUp(self):
+        clear_role_ids_cache()
+        self.admin_role = Group.objects.create(name=ADMIN_USER)
+        self.agent_role = Group.objects.create(name=AGENT_USER)
+        self.guest_role = Group.objects.create(name=GUEST_USER)
+        self.user_admin = User.objects.create(username="admin-test", email="admin.test@example.com", role=self.admin_role)
+        self.user_agent = User.objects.create(username="agent-test", email="agent.test@example.com", role=self.agent_role)
+        self.user_guest = User.objects.create(username="guest-test", email="guest.test@example.com", role=self.guest_role)
+        self.factory = APIRequestFactory()
+
+    def _request(self, user):
+        request = Request(self.factory.get('/'))
+        request.user = user
+        return request
+
+    def test_role_permissions(self):
+        self.assertTrue(IsAdminRole().has_permission(self._request(self.user_admin), None))
+        self.assertFalse(IsAdminRole().has_permission(self._request(self.user_agent), None))
+        self.assertTrue((IsAdminRole | IsAgentRole)().has_permission(self._request(self.user_agent), None))
+        self.assertFalse((IsAdminRole | IsAgentRole)().has_permission(self._request(self.user_guest), None))
+        self.assertFalse((IsAdminRole | IsAgentRole)().has_permission(self._request(AnonymousUser()), None))
+
+    def test_role_permissions_zero_queries(self):
+        get_role_ids()
+        with self.assertNumQueries(0):
+            request = self._request(self.user_agent)
+            permission = (IsAdminRole | IsAgentRole)()
+            self.assertTrue(permission.has_permission(request, None))
+            for _ in range(10):
+                self.assertTrue(permission.has_object_permission(request, None, self.user_guest))
+
+    def test_owner_permissions_zero_queries(self):
+        get_role_ids()
+        with self.assertNumQueries(0):
+            self.assertTrue(IsOwnerOrHigherRole().has_object_permission(self._request(self.user_guest), None, self.user_guest))
+            self.assertFalse(IsOwnerOrHigherRole().has_object_permission(self._request(self.user_guest), None, self.user_agent))
+            self.assertTrue(IsOwnerOrHigherRole().has_object_permission(self._request(self.user_agent), None, self.user_guest))
+
+    def test_owner_permissions_anonymous(self):
+        reservation = SimpleNamespace(user_id=None)
+        self.assertFalse(IsOwnerOrAdminOrAgentRole().has_object_permission(self._request(AnonymousUser()), None, reservation))
+
+    def test_role_ids_cache_invalidated_on_group_save(self):
+        get_role_ids()
+        self.admin_role.name = "Renamed"
+        self.admin_role.save()
+        with self.assertNumQueries(1):
+            self.assertFalse(IsAdminRole().has_permission(self._request(self.user_admin), None))
+        self.admin_role.name = ADMIN_USER
+        self.admin_role.save()
+        self.assertTrue(IsAdminRole().has_permission(self._request(self.user_admin), None))
+
+    def test_role_ids_cache_invalidated_on_commit(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            self.admin_role.save()
+            # e.g. another worker, reading the groups before the change is committed
+            get_role_ids()
+        with self.assertNumQueries(1):
+            get_role_ids()
+
+    def test_incomplete_role_ids_expire(self):
+        # renamed without the signal, like a change the Group signal of this worker missed
+        Group.objects.filter(pk=self.admin_role.pk).update(name="Renamed")
+        clear_role_ids_cache()
+        self.assertFalse(IsAdminRole().has_permission(self._request(self.user_admin), None))
+        Group.objects.filter(pk=self.admin_role.pk).update(name=ADMIN_USER)
+        with patch("django.core.cache.backends.locmem.time.time", return_value=time.time() + INCOMPLETE_ROLE_IDS_TIMEOUT + 1):
+            self.assertTrue(IsAdminRole().has_permission(self._request(self.user_admin), None))
+
+    def test_complete_role_ids_kept(self):
+        get_role_ids()
+        with patch("django.core.cache.backends.locmem.time.time", return_value=time.time() + INCOMPLETE_ROLE_IDS_TIMEOUT + 1):
+            with self.assertNumQueries(0):
+                get_role_ids()
+
+
+class RoleTokenTestCase(TestCase):
+    def setUp(self):
+        clear_role_ids_cache()
+        self.guest_role = Group.objects.create(name=GUEST_USER)
+        self.user_guest = User.objects.create(username="guest-test", email="guest.test@example.com", role=self.guest_role)
+        self.user_guest.set_password("guest-password")
+        self.user_guest.save()
+        self.client = APIClient()
+
+    def _access_token(self):
+        response = self.client.post(reverse("login"), {"username": "guest-test", "password": "guest-password"}, format="json")
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        return response.data["access"]
+
+    def test_token_role_claims(self):
+        token = AccessToken(self._access_token())
+        self.assertEqual(token["role_id"], self.guest_role.id)
+        self.assertEqual(token["role_name"], GUEST_USER)
+
+    def test_refreshed_token_role_claims(self):
+        response = self.client.post(reverse("login"), {"username": "guest-test", "password": "guest-password"}, format="json")
+        response = self.client.post(reverse("login_refresh"), {"refresh": response.data["refresh"]}, format="json")
+        self.assertEqual(AccessToken(response.data["access"])["role_id"], self.guest_role.id)
+
+    def test_stateless_authentication(self):
+        token = AccessToken(self._access_token())
+        user = StatelessJWTAuthentication().get_user(token)
+        self.assertEqual(user.pk, self.user_guest.pk)
+        self.assertEqual(user.role_id, self.guest_role.id)
+        self.assertEqual(user.role_name, GUEST_USER)
+
+    def test_stateless_authentication_skips_user_query(self):
+        RoomType.objects.create(name="Single Room", description="A single room type", capacity=1, price_per_night=50)
+        self.client.credentials(HTTP_AUTHORIZATION=f"Bearer {self._access_token()}")
+        get_role_ids()
+        # only the count and the select of the room types page
+        with self.assertNumQueries(2):
+            response = self.client.get(reverse("room-types-list"))
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        # non read-only actions still load the user
+        with self.assertNumQueries(1):
+            response = self.client.post(reverse("room-types-list"), {}, format="json")
+        self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
+
+
+@patch.object(PageNumberPagination, 'page_size', 100)
+class UserViewSetQueryCountTestCase(TestCase):
+    def setUp(self):
+        agent_role = Group.objects.create(name=AGENT_USER)
+        guest_role = Group.objects.create(name=GUEST_USER)
+        self.user_agent = User.objects.create(username="agent-test", email="agent.test@example.com", role=agent_role)
+        for i in range(100):
+            User.objects.create(username=f"guest-test-{i}", email=f"guest.test.{i}@example.com", role=guest_role)
+        self.client = APIClient()
+        self.client.force_authenticate(user=self.user_agent)
+        get_role_ids()
+
+    def test_list_users_query_count(self):
+        # COUNT + SELECT
+        with self.assertNumQueries(2):
+            response = self.client.get(reverse("users-list"))
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(len(response.data["results"]), 100)
+        self.assertEqual(response.data["results"][-1]["role_name"], GUEST_USER)
+
+    def test_retrieve_user_query_count(self):
+        with self.assertNumQueries(1):
+            response = self.client.get(reverse("users-detail", args=[self.user_agent.id]))
+        self.assertEqual(response.data["role_name"], AGENT_USER)
+
+
+class UserKeysetPaginationTestCase(TestCase):
+    def setUp(self):
+        agent_role = Group.objects.create(name=AGENT_USER)
+        self.user_agent = User.objects.create(username="agent-test", email="agent.test@example.com", role=agent_role)
+        for i in range(14):
+            User.objects.create(username=f"agent-test-{i}", email=f"agent.test.{i}@example.com", role=agent_role)
+        self.client = APIClient()
+        self.client.force_authenticate(user=self.user_agent)
+        get_role_ids()
+
+    def test_list_users_cursor_pages(self):
+        response = self.client.get(reverse("users-list"), {"pagination": "cursor"})
+        ids = [user["id"] for user in response.data["results"]]
+        with self.assertNumQueries(1):
+            response = self.client.get(response.data["next"])
+        ids += [user["id"] for user in response.data["results"]]
+        self.assertIsNone(response.data["next"])
+        self.assertEqual(ids, list(User.objects.order_by('id').values_list('id', flat=True)))
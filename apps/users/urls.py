@@ -1,7 +1,7 @@
 from django.urls import path, include
 from rest_framework.routers import DefaultRouter
-from rest_framework_simplejwt.views import TokenObtainPairView, TokenRefreshView
-from .views import UserViewSet, RegistrationViewSet
+from rest_framework_simplejwt.views import TokenRefreshView
+from .views import UserViewSet, RegistrationViewSet, RoleTokenObtainPairView
 
 
 router = DefaultRouter()
@@ -10,6 +10,6 @@ router.register('register', RegistrationViewSet, basename='register')
 
 urlpatterns = [
     path('token/refresh/', TokenRefreshView.as_view(), name='login_refresh'),
-    path('token/', TokenObtainPairView.as_view(), name='login'),
+    path('token/', RoleTokenObtainPairView.as_view(), name='login'),
     path('', include(router.urls))
 ]
\ No newline at end of file
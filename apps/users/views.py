@@ -2,16 +2,30 @@ from django.contrib.auth import get_user_model
 from rest_framework.viewsets import ModelViewSet, GenericViewSet
 from rest_framework.mixins import CreateModelMixin
 from rest_framework.permissions import AllowAny, IsAuthenticated
+from rest_framework_simplejwt.views import TokenObtainPairView
+from hotel_reservation.pagination import SelectablePaginationMixin
 from .permissions import IsAdminRole, IsAgentRole, IsOwnerOrHigherRole
-from .serializers import UserSerializer, RegistrationSerializer
+from .serializers import UserSerializer, RegistrationSerializer, RoleTokenObtainPairSerializer
 
 
 User = get_user_model()
 
 
-class UserViewSet(ModelViewSet):
+class UserViewSet(SelectablePaginationMixin, ModelViewSet):
     queryset = User.objects.all()
     serializer_class = UserSerializer
+    # used by ?pagination=cursor
+    keyset_ordering = ('id',)
+
+    def get_queryset(self):
+        queryset = super().get_queryset()
+        if self.action in ('list', 'retrieve'):
+            # load only the serialized fields, with role_name from the joined role
+            queryset = queryset.select_related('role').only(
+                'id', 'first_name', 'last_name', 'username', 'email', 'role__id', 'role__name')
+        elif self.action in ('update', 'partial_update'):
+            queryset = queryset.select_related('role')
+        return queryset
 
     def get_permissions(self):
         permission_classes = []
@@ -32,3 +46,7 @@ class RegistrationViewSet(CreateModelMixin, GenericViewSet):
     queryset = User.objects.all()
     serializer_class = RegistrationSerializer
     permission_classes = (AllowAny,)
+
+
+class RoleTokenObtainPairView(TokenObtainPairView):
+    serializer_class = RoleTokenObtainPairSerializer
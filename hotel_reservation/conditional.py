@@ -0,0 +1,93 @@
+from hashlib import sha1
+from django.db.models import Count, F, Max
+from django.db.models.functions import Greatest
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date, quote_etag
+from .pagination import KeysetPagination
+
+
+class ConditionalGetMixin:
+    '''
+    Conditional GET for the list and retrieve actions: the `ETag` and `Last-Modified` validators
+    are computed from a COUNT/MAX fingerprint query of the (filtered) queryset, or from the object
+    for a retrieve, instead of the serialized body, so `If-None-Match`/`If-Modified-Since` hits are
+    answered with a 304 without serializing the rows.
+    `last_modified_fields` lists the auto_now timestamps of the model and of the related rows
+    included in its representation; the count catches the deleted rows.
+    Cursor paginated lists are not conditional, as the fingerprint would scan all the rows
+    which the keyset pagination avoids.
+    '''
+    last_modified_fields = ('updated_at',)
+
+    def list(self, request, *args, **kwargs):
+        if isinstance(self.paginator, KeysetPagination):
+            return super().list(request, *args, **kwargs)
+        return self.conditional_response(self.get_list_validators(request), super().list, request, *args, **kwargs)
+
+    def retrieve(self, request, *args, **kwargs):
+        return self.conditional_response(self.get_retrieve_validators(request), super().retrieve, request, *args, **kwargs)
+
+    def conditional_response(self, validators, view, request, *args, **kwargs):
+        etag, last_modified = validators
+        response = get_conditional_response(request, etag=etag, last_modified=last_modified)
+        if response is None:
+            response = view(request, *args, **kwargs)
+        if response.status_code in (200, 304):
+            response['ETag'] = etag
+            if last_modified is not None:
+                response['Last-Modified'] = http_date(last_modified)
+        return response
+
+    def get_list_validators(self, request):
+        queryset = self.filter_queryset(self.get_queryset())
+        return self.get_validators(request, self.get_fingerprint(queryset))
+
+    def get_retrieve_validators(self, request):
+        # get_object() raises the 404 and checks the object permissions before any 304, which
+        # would otherwise tell who isn't allowed to see the object that it exists and when it changed
+        obj = self.get_object()
+        return self.get_validators(request, {'count': 1, 'last_modified': self.get_last_modified(obj)})
+
+    def get_object(self):
+        '''
+        The object is loaded (and its permissions checked) once per request, the validators of a
+        retrieve load it before the 200 response is rendered from it
+        '''
+        if not hasattr(self, '_object'):
+            self._object = super().get_object()
+        return self._object
+
+    def get_last_modified(self, obj):
+        '''
+        Latest of the `last_modified_fields` of the object, following the related objects it was loaded with
+        '''
+        timestamps = []
+        for name in self.last_modified_fields:
+            value = obj
+            for attribute in name.split('__'):
+                value = getattr(value, attribute, None)
+                if value is None:
+                    break
+            if value is not None:
+                timestamps.append(value)
+        return max(timestamps, default=None)
+
+    def get_fingerprint(self, queryset):
+        timestamps = [F(name) for name in self.last_modified_fields]
+        last_modified = Greatest(*timestamps) if len(timestamps) > 1 else timestamps[0]
+        return queryset.order_by().aggregate(count=Count('pk'), last_modified=Max(last_modified))
+
+    def get_validators(self, request, fingerprint):
+        '''
+        Returns the strong ETag and the Last-Modified timestamp (in seconds) of the response.
+        The ETag also depends on the URL (filters, pagination) and on the renderer.
+        '''
+        last_modified = fingerprint['last_modified']
+        key = ':'.join([
+            str(fingerprint['count']),
+            last_modified.isoformat() if last_modified else '',
+            request.build_absolute_uri(),
+            request.accepted_renderer.format,
+        ])
+        etag = quote_etag(sha1(key.encode()).hexdigest())
+        return etag, int(last_modified.timestamp()) if last_modified else None
@@ -0,0 +1,189 @@
+'''
+A small thread-safe pool of DB-API connections, one per process and database, used by the
+pooled PostgreSQL backend (hotel_reservation.db.postgresql_pool) so that a request checks out
+an open connection instead of connecting (and negotiating TLS) to the database.
+'''
+from collections import deque
+import threading
+import time
+
+
+class PoolTimeout(Exception):
+    pass
+
+
+class ConnectionPool:
+    '''
+    Opens up to `max_size` connections with `connect()` on demand. acquire() returns the last
+    released idle connection (warm connections first), waiting up to `timeout` seconds for one
+    when all are in use. Idle connections older than `max_lifetime` or idle for more than
+    `max_idle` seconds are closed instead of being reused, as well as the ones failing `check()`.
+    '''
+    def __init__(self, connect, max_size=10, timeout=30, max_idle=300, max_lifetime=3600, check=None):
+        self.connect = connect
+        self.check = check
+        self.max_size = max_size
+        self.timeout = timeout
+        self.max_idle = max_idle
+        self.max_lifetime = max_lifetime
+        self._condition = threading.Condition()
+        # (connection, opened at, released at) of the idle connections
+        self._idle = deque()
+        # opened at of the open connections, idle or in use, by id
+        self._opened_at = {}
+        self._connecting = 0
+        self._waiting = 0
+        self._checkouts = 0
+        self._opened = 0
+        self._closed = 0
+        self._timeouts = 0
+        self._wait_time = 0.0
+        self._max_wait_time = 0.0
+
+    def acquire(self):
+        started_at = time.monotonic()
+        while True:
+            connection = self._checkout(started_at)
+            if connection is None:
+                connection = self._open()
+            elif self.check is not None and not self.check(connection):
+                self.release(connection, discard=True)
+                continue
+            with self._condition:
+                self._record_checkout(started_at)
+            return connection
+
+    def _checkout(self, started_at):
+        '''
+        An idle connection, or None once a new connection can be opened
+        '''
+        with self._condition:
+            while True:
+                connection = self._pop_idle()
+                if connection is not None:
+                    return connection
+                if len(self._opened_at) + self._connecting < self.max_size:
+                    # the new connection is opened out of the lock
+                    self._connecting += 1
+                    return None
+                remaining = started_at + self.timeout - time.monotonic()
+                if remaining <= 0:
+                    self._timeouts += 1
+                    raise PoolTimeout(f'No connection available within {self.timeout} seconds ({self.max_size} in use)')
+                self._waiting += 1
+                try:
+                    self._condition.wait(remaining)
+                finally:
+                    self._waiting -= 1
+
+    def _open(self):
+        try:
+            connection = self.connect()
+        except BaseException:
+            with self._condition:
+                self._connecting -= 1
+                self._condition.notify()
+            raise
+        with self._condition:
+            self._connecting -= 1
+            self._opened += 1
+            self._opened_at[id(connection)] = time.monotonic()
+        return connection
+
+    def release(self, connection, discard=False):
+        '''
+        Returns a connection, in a clean state, to the pool, or closes it when `discard` is set
+        '''
+        with self._condition:
+            opened_at = self._opened_at.get(id(connection))
+            if discard or opened_at is None or time.monotonic() - opened_at > self.max_lifetime:
+                self._opened_at.pop(id(connection), None)
+                self._close(connection)
+            else:
+                self._idle.append((connection, opened_at, time.monotonic()))
+            self._condition.notify()
+
+    def close_idle(self):
+        with self._condition:
+            while self._idle:
+                connection, _, _ = self._idle.popleft()
+                del self._opened_at[id(connection)]
+                self._close(connection)
+            self._condition.notify_all()
+
+    def stats(self):
+        with self._condition:
+            return {
+                'open': len(self._opened_at),
+                'idle': len(self._idle),
+                'in_use': len(self._opened_at) - len(self._idle),
+                'waiting': self._waiting,
+                'max_size': self.max_size,
+                'checkouts': self._checkouts,
+                'opened': self._opened,
+                'closed': self._closed,
+                'timeouts': self._timeouts,
+                'wait_time_ms': round(self._wait_time * 1000, 2),
+                'mean_wait_ms': round(self._wait_time * 1000 / self._checkouts, 3) if self._checkouts else None,
+                'max_wait_ms': round(self._max_wait_time * 1000, 2),
+            }
+
+    # called with the lock held
+    def _pop_idle(self):
+        now = time.monotonic()
+        while self._idle:
+            connection, opened_at, released_at = self._idle.pop()
+            if now - released_at <= self.max_idle and now - opened_at <= self.max_lifetime and not _is_closed(connection):
+                return connection
+            del self._opened_at[id(connection)]
+            self._close(connection)
+        return None
+
+    def _record_checkout(self, started_at):
+        # the time spent waiting for a connection, opening it included
+        wait_time = time.monotonic() - started_at
+        self._checkouts += 1
+        self._wait_time += wait_time
+        self._max_wait_time = max(self._max_wait_time, wait_time)
+
+    def _close(self, connection):
+        self._closed += 1
+        try:
+            connection.close()
+        except Exception:
+            pass
+
+
+def _is_closed(connection):
+    return bool(getattr(connection, 'closed', False))
+
+
+_pools = {}
+_pools_lock = threading.Lock()
+
+
+def get_pool(key, factory):
+    '''
+    The pool of `key` in this process, created with factory() the first time
+    '''
+    with _pools_lock:
+        if key not in _pools:
+            _pools[key] = factory()
+        return _pools[key]
+
+
+def get_pools_stats():
+    '''
+    Stats of the pools of this process, by the "alias/database" key of every pool
+    '''
+    with _pools_lock:
+        pools = dict(_pools)
+    return {'/'.join(map(str, key)): pool.stats() for key, pool in pools.items()}
+
+
+def close_pools():
+    with _pools_lock:
+        pools = list(_pools.values())
+        _pools.clear()
+    for pool in pools:
+        pool.close_idle()
@@ -0,0 +1,66 @@
+'''
+PostgreSQL backend checking the connections out of a per-process pool (hotel_reservation.db.pool)
+rather than opening one per request. Closing the connection, which Django does at the end of every
+request with CONN_MAX_AGE = 0, returns it to the pool with its transaction rolled back. With
+CONN_HEALTH_CHECKS, an idle connection is checked before it is reused.
+
+    DATABASES['default']['ENGINE'] = 'hotel_reservation.db.postgresql_pool'
+    DATABASES['default']['POOL'] = {'MAX_SIZE': 10, 'TIMEOUT': 30, 'MAX_IDLE': 300, 'MAX_LIFETIME': 3600}
+
+The pools are created on the first connection of a process, so after the fork of the workers.
+'''
+from functools import partial
+from django.db.backends.postgresql import base
+from django.db.backends.postgresql.psycopg_any import IsolationLevel
+from django.utils.asyncio import async_unsafe
+from hotel_reservation.db.pool import ConnectionPool, get_pool
+
+
+POOL_DEFAULTS = {'MAX_SIZE': 10, 'TIMEOUT': 30, 'MAX_IDLE': 300, 'MAX_LIFETIME': 3600}
+
+
+def _is_usable(connection):
+    '''
+    Health check of the idle connections before they are reused (CONN_HEALTH_CHECKS)
+    '''
+    try:
+        with connection.cursor() as cursor:
+            cursor.execute('SELECT 1')
+        if not connection.autocommit:
+            connection.rollback()
+    except base.Database.Error:
+        return False
+    return True
+
+
+class DatabaseWrapper(base.DatabaseWrapper):
+    def get_pool(self, conn_params):
+        options = {**POOL_DEFAULTS, **self.settings_dict.get('POOL', {})}
+        return get_pool((self.alias, conn_params.get('dbname')), lambda: ConnectionPool(
+            partial(super(DatabaseWrapper, self).get_new_connection, conn_params),
+            max_size=options['MAX_SIZE'],
+            timeout=options['TIMEOUT'],
+            max_idle=options['MAX_IDLE'],
+            max_lifetime=options['MAX_LIFETIME'],
+            check=_is_usable if self.settings_dict['CONN_HEALTH_CHECKS'] else None,
+        ))
+
+    @async_unsafe
+    def get_new_connection(self, conn_params):
+        self._pool = self.get_pool(conn_params)
+        connection = self._pool.acquire()
+        # set by the postgresql backend when connecting, on the wrapper which may not be this one
+        self.isolation_level = IsolationLevel(self.settings_dict['OPTIONS'].get('isolation_level', IsolationLevel.READ_COMMITTED))
+        return connection
+
+    def _close(self):
+        if self.connection is None:
+            return
+        with self.wrap_database_errors:
+            discard = bool(self.connection.closed)
+            if not discard and self.connection.info.transaction_status != base.Database.extensions.TRANSACTION_STATUS_IDLE:
+                try:
+                    self.connection.rollback()
+                except base.Database.Error:
+                    discard = True
+            self._pool.release(self.connection, discard=discard)
@@ -0,0 +1,68 @@
+'''
+Routes the reads of the safe DRF actions (list and retrieve) to the read replicas of
+settings.DATABASE_REPLICAS and everything else to the primary ('default'). The requests are
+marked by hotel_reservation.middleware.ReplicaRoutingMiddleware; the queries run outside of a
+marked request (commands, shell, signals) always use the primary.
+
+A replica lags behind the primary, so once a user writes, their reads stick to the primary for
+settings.REPLICA_STICKY_SECONDS (read-your-writes), through a key in the shared cache.
+'''
+from contextvars import ContextVar
+import random
+from django.conf import settings
+from django.core.cache import cache
+from django.db import DEFAULT_DB_ALIAS
+
+
+# the read actions of the viewsets served by the replicas, unless set by the view (`replica_read_actions`)
+REPLICA_READ_ACTIONS = ('list', 'retrieve')
+
+# routing of the current request, also seen by the threads running the async ORM queries
+_routing = ContextVar('replica_routing', default=None)
+
+
+class ReplicaRouting:
+    '''
+    Routing of a request: `replica` is the alias its reads go to, or None for the primary
+    '''
+    def __init__(self):
+        self.replica = None
+
+
+def sticky_key(user_id):
+    return f'db:primary:{user_id}'
+
+
+def stick_to_primary(user_id):
+    '''
+    Sends the reads of the user to the primary for the next REPLICA_STICKY_SECONDS
+    '''
+    cache.set(sticky_key(user_id), True, settings.REPLICA_STICKY_SECONDS)
+
+
+def is_sticky(user_id):
+    return user_id is not None and cache.get(sticky_key(user_id)) is not None
+
+
+def choose_replica():
+    # one replica for all the reads of a request, so they see the same state
+    return random.choice(settings.DATABASE_REPLICAS)
+
+
+class ReplicaRouter:
+    def db_for_read(self, model, **hints):
+        routing = _routing.get()
+        if routing is None or routing.replica is None:
+            return DEFAULT_DB_ALIAS
+        return routing.replica
+
+    def db_for_write(self, model, **hints):
+        # also for the objects read from a replica
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # the replicas hold the same data as the primary
+        databases = {DEFAULT_DB_ALIAS, *settings.DATABASE_REPLICAS}
+        if obj1._state.db in databases and obj2._state.db in databases:
+            return True
+        return None
@@ -0,0 +1,31 @@
+import os
+from django.conf import settings
+from django.db import connections
+from rest_framework.response import Response
+from rest_framework.views import APIView
+from apps.users.permissions import IsAdminRole
+from .pool import get_pools_stats
+
+
+class DatabaseConnectionsView(APIView):
+    '''
+    Connection settings of the databases, and the stats of the connection pools of the worker
+    process answering the request (open, idle, in use and waiting connections, checkouts and wait times)
+    '''
+    permission_classes = [IsAdminRole]
+
+    def get(self, request):
+        return Response({
+            'pid': os.getpid(),
+            'databases': {
+                connection.alias: {
+                    'vendor': connection.vendor,
+                    'replica': connection.alias in settings.DATABASE_REPLICAS,
+                    'conn_max_age': connection.settings_dict['CONN_MAX_AGE'],
+                    'conn_health_checks': connection.settings_dict['CONN_HEALTH_CHECKS'],
+                    'pool': connection.settings_dict.get('POOL'),
+                }
+                for connection in connections.all()
+            },
+            'pools': get_pools_stats(),
+        })
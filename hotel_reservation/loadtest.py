@@ -0,0 +1,123 @@
+'''
+A small asyncio HTTP/1.1 load client for the benchmark commands: every concurrent client keeps
+its own connection alive and sends its share of the requests one after the other.
+'''
+import asyncio
+from collections import Counter
+import json
+import time
+from urllib.parse import urlsplit
+
+
+class LoadResult:
+    def __init__(self):
+        self.latencies = []
+        # from the X-DB-Queries header of the request instrumentation middleware, when enabled
+        self.queries = []
+        self.statuses = Counter()
+        self.errors = 0
+        self.elapsed = 0.0
+
+    def percentile(self, percent):
+        if not self.latencies:
+            return None
+        latencies = sorted(self.latencies)
+        index = min(len(latencies) - 1, max(0, round(percent / 100 * len(latencies)) - 1))
+        return latencies[index]
+
+    def summary(self):
+        '''
+        Requests/second, latency percentiles in milliseconds and queries/request
+        '''
+        def ms(value):
+            return round(value * 1000, 2) if value is not None else None
+
+        return {
+            'requests': len(self.latencies) + self.errors,
+            'errors': self.errors,
+            'statuses': {str(status): count for status, count in sorted(self.statuses.items())},
+            'requests_per_second': round(len(self.latencies) / self.elapsed, 1) if self.elapsed else None,
+            'p50_ms': ms(self.percentile(50)),
+            'p95_ms': ms(self.percentile(95)),
+            'p99_ms': ms(self.percentile(99)),
+            'mean_ms': ms(sum(self.latencies) / len(self.latencies)) if self.latencies else None,
+            'queries_per_request': round(sum(self.queries) / len(self.queries), 2) if self.queries else None,
+        }
+
+
+async def _read_response(reader):
+    status_line = await reader.readline()
+    if not status_line:
+        raise ConnectionError('Connection closed by the server')
+    status = int(status_line.split()[1])
+    headers = {}
+    while True:
+        line = await reader.readline()
+        if line in (b'\r\n', b'\n', b''):
+            break
+        name, _, value = line.decode('latin-1').partition(':')
+        headers[name.strip().lower()] = value.strip()
+
+    if headers.get('transfer-encoding', '').lower() == 'chunked':
+        body = b''
+        while True:
+            size = int((await reader.readline()).split(b';')[0], 16)
+            if size == 0:
+                await reader.readline()
+                break
+            body += await reader.readexactly(size)
+            await reader.readline()
+    else:
+        body = await reader.readexactly(int(headers.get('content-length', 0)))
+    return status, headers, body
+
+
+async def _client(base_url, requests, headers, result):
+    url = urlsplit(base_url)
+    port = url.port or (443 if url.scheme == 'https' else 80)
+    reader, writer = await asyncio.open_connection(url.hostname, port, ssl=url.scheme == 'https' or None)
+    try:
+        for method, path, data in requests:
+            body = json.dumps(data).encode() if data is not None else b''
+            lines = [f'{method} {path} HTTP/1.1', f'Host: {url.netloc}', 'Connection: keep-alive', f'Content-Length: {len(body)}']
+            if data is not None:
+                lines.append('Content-Type: application/json')
+            lines += [f'{name}: {value}' for name, value in headers.items()]
+            started_at = time.perf_counter()
+            try:
+                writer.write(('\r\n'.join(lines) + '\r\n\r\n').encode('latin-1') + body)
+                await writer.drain()
+                status, response_headers, _ = await _read_response(reader)
+            except (ConnectionError, asyncio.IncompleteReadError, ValueError):
+                result.errors += 1
+                writer.close()
+                reader, writer = await asyncio.open_connection(url.hostname, port, ssl=url.scheme == 'https' or None)
+                continue
+            result.latencies.append(time.perf_counter() - started_at)
+            result.statuses[status] += 1
+            if 'x-db-queries' in response_headers:
+                result.queries.append(int(response_headers['x-db-queries']))
+            if response_headers.get('connection', '').lower() == 'close':
+                writer.close()
+                reader, writer = await asyncio.open_connection(url.hostname, port, ssl=url.scheme == 'https' or None)
+    finally:
+        writer.close()
+
+
+async def _run_load(base_url, requests, concurrency, headers):
+    result = LoadResult()
+    started_at = time.perf_counter()
+    await asyncio.gather(*(
+        _client(base_url, requests[i::concurrency], headers, result)
+        for i in range(min(concurrency, len(requests)))
+    ))
+    result.elapsed = time.perf_counter() - started_at
+    return result
+
+
+def run_load(base_url, requests, concurrency=10, headers=None):
+    '''
+    Sends the (method, path, json data or None) requests to the server at base_url with
+    `concurrency` clients and returns a LoadResult
+    '''
+    return asyncio.run(_run_load(base_url, list(requests), concurrency, headers or {}))
@@ -0,0 +1,199 @@
+from contextlib import ExitStack
+import logging
+import time
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction, sync_to_async
+from django.conf import settings
+from django.core.exceptions import ImproperlyConfigured, MiddlewareNotUsed
+from django.db import connections
+from rest_framework import exceptions
+from apps.users.authentication import StatelessJWTAuthentication
+from hotel_reservation.db.routers import REPLICA_READ_ACTIONS, ReplicaRouting, _routing, choose_replica, is_sticky, stick_to_primary
+
+
+logger = logging.getLogger(__name__)
+
+
+class QueryStats:
+    '''
+    Execute wrapper counting the queries and summing their duration
+    '''
+    def __init__(self):
+        self.count = 0
+        self.duration = 0.0
+
+    def __call__(self, execute, sql, params, many, context):
+        started_at = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.duration += time.perf_counter() - started_at
+            self.count += 1
+
+
+class RequestInstrumentationMiddleware:
+    '''
+    Records the number of queries, the DB time and the view time of every request, exposes them
+    as `X-DB-Queries` and `Server-Timing` response headers, and logs the requests exceeding
+    the budgets of settings.REQUEST_INSTRUMENTATION tagged with the DRF viewset and action.
+    When disabled, the middleware removes itself from the chain so it costs nothing.
+    Under ASGI it runs async, so that async views are not moved to a thread for every request.
+    '''
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        config = settings.REQUEST_INSTRUMENTATION
+        if not config['ENABLED']:
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+        self.query_budget = config['QUERY_BUDGET']
+        self.latency_budget = config['LATENCY_BUDGET_MS']
+        self.is_async = iscoroutinefunction(get_response)
+        if self.is_async:
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if self.is_async:
+            return self.__acall__(request)
+        stats = QueryStats()
+        request._instrumentation = {'view': None, 'view_started_at': None}
+        started_at = time.perf_counter()
+        with ExitStack() as stack:
+            self._wrap_connections(stack, stats)
+            response = self.get_response(request)
+        return self._instrument(request, response, stats, started_at)
+
+    async def __acall__(self, request):
+        stats = QueryStats()
+        request._instrumentation = {'view': None, 'view_started_at': None}
+        started_at = time.perf_counter()
+        # the async ORM runs the queries of a request in one thread (thread_sensitive), whose
+        # connections are wrapped from that same thread
+        with ExitStack() as stack:
+            await sync_to_async(self._wrap_connections)(stack, stats)
+            try:
+                response = await self.get_response(request)
+            finally:
+                await sync_to_async(stack.close)()
+        return self._instrument(request, response, stats, started_at)
+
+    @staticmethod
+    def _wrap_connections(stack, stats):
+        for connection in connections.all():
+            stack.enter_context(connection.execute_wrapper(stats))
+
+    def _instrument(self, request, response, stats, started_at):
+        finished_at = time.perf_counter()
+
+        total_ms = (finished_at - started_at) * 1000
+        db_ms = stats.duration * 1000
+        view_started_at = request._instrumentation['view_started_at']
+        timings = [f'db;dur={db_ms:.1f}']
+        if view_started_at is not None:
+            timings.append(f'view;dur={(finished_at - view_started_at) * 1000:.1f}')
+        timings.append(f'total;dur={total_ms:.1f}')
+        response['Server-Timing'] = ', '.join(timings)
+        response['X-DB-Queries'] = str(stats.count)
+
+        if stats.count > self.query_budget or total_ms > self.latency_budget:
+            logger.warning(
+                'Request over budget: %s %s view=%s queries=%d db=%.1fms total=%.1fms',
+                request.method, request.path, request._instrumentation['view'] or '-',
+                stats.count, db_ms, total_ms
+            )
+        return response
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        # DRF viewsets expose their class and their {method: action} map on the view function
+        view_class = getattr(view_func, 'cls', None)
+        if view_class is not None:
+            view = view_class.__name__
+            actions = getattr(view_func, 'actions', None)
+            if actions:
+                view = f'{view}.{actions.get(request.method.lower(), request.method.lower())}'
+        else:
+            view = getattr(view_func, '__qualname__', repr(view_func))
+        request._instrumentation['view'] = view
+        request._instrumentation['view_started_at'] = time.perf_counter()
+        return None
+
+
+class ReplicaRoutingMiddleware:
+    '''
+    Marks the requests whose reads go to a replica (see hotel_reservation.db.routers): the GET and
+    HEAD requests of the viewset actions in `replica_read_actions` of the view (list and retrieve
+    by default, none for the other views), unless the user wrote recently. The user is read from
+    the bearer token, which is validated without a database hit, as the view authenticates it
+    later. A successful write of an authenticated user makes their reads stick to the primary.
+    Without replicas the middleware removes itself from the chain. The stickiness is kept in the
+    cache, which has to be shared between the workers, or the next read of the user, served by
+    another worker, would go to a lagging replica.
+    '''
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        if not settings.DATABASE_REPLICAS:
+            raise MiddlewareNotUsed
+        if settings.CACHES['default']['BACKEND'] in settings.PROCESS_LOCAL_CACHE_BACKENDS:
+            raise ImproperlyConfigured('The read replicas need a cache shared between the workers, set DJANGO_CACHE_URL')
+        self.get_response = get_response
+        self.authentication = StatelessJWTAuthentication()
+        self.is_async = iscoroutinefunction(get_response)
+        if self.is_async:
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if self.is_async:
+            return self.__acall__(request)
+        token = _routing.set(ReplicaRouting())
+        try:
+            response = self.get_response(request)
+        finally:
+            _routing.reset(token)
+        if self._is_write(request, response):
+            stick_to_primary(request._replica_user_id)
+        return response
+
+    async def __acall__(self, request):
+        token = _routing.set(ReplicaRouting())
+        try:
+            response = await self.get_response(request)
+        finally:
+            _routing.reset(token)
+        if self._is_write(request, response):
+            await sync_to_async(stick_to_primary)(request._replica_user_id)
+        return response
+
+    @staticmethod
+    def _is_write(request, response):
+        return (
+            request.method not in ('GET', 'HEAD', 'OPTIONS')
+            and response.status_code < 400
+            and getattr(request, '_replica_user_id', None) is not None
+        )
+
+    def _user_id(self, request):
+        try:
+            user_token = self.authentication.authenticate(request)
+        except exceptions.AuthenticationFailed:
+            return None
+        return user_token[0].pk if user_token else None
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        request._replica_user_id = user_id = self._user_id(request)
+        if request.method not in ('GET', 'HEAD'):
+            return None
+        # DRF viewsets expose their {method: action} map on the view function (HEAD being served
+        # by the GET action), plain views use the method
+        view_class = getattr(view_func, 'cls', None) or getattr(view_func, 'view_class', None)
+        actions = getattr(view_func, 'actions', None)
+        if actions:
+            action = actions.get('get')
+            default_actions = REPLICA_READ_ACTIONS
+        else:
+            action = 'get'
+            default_actions = ()
+        if action in getattr(view_class, 'replica_read_actions', default_actions) and not is_sticky(user_id):
+            _routing.get().replica = choose_replica()
+        return None
@@ -0,0 +1,162 @@
+from base64 import b64decode, b64encode
+from collections import OrderedDict
+import json
+from django.core.exceptions import ValidationError
+from django.db.models import Q
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import BasePagination, PageNumberPagination
+from rest_framework.response import Response
+from rest_framework.settings import api_settings
+from rest_framework.utils.urls import replace_query_param
+
+
+class KeysetPagination(BasePagination):
+    '''
+    Keyset (seek) pagination: instead of OFFSET, a page continues after the ordering values of
+    the last row of the previous page (WHERE (a, b) > (x, y)), and no COUNT(*) is run, so page N
+    costs the same as page 1 as long as an index matches the ordering.
+    The ordering is taken from `keyset_ordering` of the view; its last field should be unique.
+    '''
+    page_size = api_settings.PAGE_SIZE
+    cursor_query_param = 'cursor'
+    ordering = ('pk',)
+    invalid_cursor_message = 'Invalid cursor'
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.request = request
+        self.base_url = request.build_absolute_uri()
+        self.ordering = [self._field_name(queryset.model, name) for name in getattr(view, 'keyset_ordering', self.ordering)]
+        self.has_next = self.has_previous = False
+
+        cursor = self.decode_cursor(request, queryset.model)
+        reverse = bool(cursor and cursor['reverse'])
+        ordering = [self._reverse(name) for name in self.ordering] if reverse else self.ordering
+        queryset = queryset.order_by(*ordering)
+        if cursor:
+            queryset = queryset.filter(self._after(ordering, cursor['position']))
+
+        results = list(queryset[:self.page_size + 1])
+        has_more = len(results) > self.page_size
+        results = results[:self.page_size]
+        if reverse:
+            results.reverse()
+            self.has_previous, self.has_next = has_more, True
+        else:
+            self.has_previous, self.has_next = cursor is not None, has_more
+        self.page = results
+        return results
+
+    def get_paginated_response(self, data):
+        return Response(OrderedDict([
+            ('next', self.get_next_link()),
+            ('previous', self.get_previous_link()),
+            ('results', data)
+        ]))
+
+    def get_paginated_response_schema(self, schema):
+        return {
+            'type': 'object',
+            'properties': {
+                'next': {'type': 'string', 'nullable': True, 'format': 'uri'},
+                'previous': {'type': 'string', 'nullable': True, 'format': 'uri'},
+                'results': schema,
+            },
+        }
+
+    def get_schema_operation_parameters(self, view):
+        return [{
+            'name': self.cursor_query_param,
+            'required': False,
+            'in': 'query',
+            'description': 'The pagination cursor value.',
+            'schema': {'type': 'string'},
+        }]
+
+    def get_next_link(self):
+        if not self.has_next or not self.page:
+            return None
+        return self.encode_cursor(self.page[-1], reverse=False)
+
+    def get_previous_link(self):
+        if not self.has_previous or not self.page:
+            return None
+        return self.encode_cursor(self.page[0], reverse=True)
+
+    def encode_cursor(self, obj, reverse):
+        position = [self._value(obj, name) for name in self.ordering]
+        cursor = {'p': [value.isoformat() if hasattr(value, 'isoformat') else value for value in position]}
+        if reverse:
+            cursor['r'] = 1
+        encoded = b64encode(json.dumps(cursor).encode('ascii')).decode('ascii')
+        return replace_query_param(self.base_url, self.cursor_query_param, encoded)
+
+    def decode_cursor(self, request, model):
+        encoded = request.query_params.get(self.cursor_query_param)
+        if not encoded:
+            return None
+        try:
+            cursor = json.loads(b64decode(encoded.encode('ascii')).decode('ascii'))
+            if len(cursor['p']) != len(self.ordering):
+                raise ValueError(self.invalid_cursor_message)
+            position = [
+                model._meta.get_field(name.lstrip('-')).to_python(value)
+                for name, value in zip(self.ordering, cursor['p'])
+            ]
+        except (TypeError, ValueError, KeyError, ValidationError):
+            raise NotFound(self.invalid_cursor_message)
+        return {'position': position, 'reverse': bool(cursor.get('r'))}
+
+    @staticmethod
+    def _field_name(model, name):
+        descending = name.startswith('-')
+        name = name.lstrip('-')
+        if name == 'pk':
+            name = model._meta.pk.name
+        return f'-{name}' if descending else name
+
+    @staticmethod
+    def _reverse(name):
+        return name[1:] if name.startswith('-') else f'-{name}'
+
+    @staticmethod
+    def _value(obj, name):
+        return getattr(obj, name.lstrip('-'))
+
+    @staticmethod
+    def _after(ordering, position):
+        '''
+        Rows coming after the position in the given ordering:
+        a >= x AND ((a > x) OR (a = x AND b > y) OR ...), with < for descending fields.
+        The redundant bound on the leading field lets the database seek the index to the position,
+        which it can't derive from the OR alone (it would scan the index from its start).
+        '''
+        leading = ordering[0]
+        condition = Q(**{f'{leading.lstrip("-")}__{"lte" if leading.startswith("-") else "gte"}': position[0]})
+        after = Q()
+        for i, name in enumerate(ordering):
+            lookup = 'lt' if name.startswith('-') else 'gt'
+            q = Q(**{f'{name.lstrip("-")}__{lookup}': position[i]})
+            for previous_name, previous_value in zip(ordering[:i], position[:i]):
+                q &= Q(**{previous_name.lstrip('-'): previous_value})
+            after |= q
+        return condition & after
+
+
+class SelectablePaginationMixin:
+    '''
+    Lets the client select the pagination per request with `?pagination=page|cursor`,
+    falling back to the `pagination_class` of the viewset
+    '''
+    pagination_query_param = 'pagination'
+    pagination_classes = {
+        'page': PageNumberPagination,
+        'cursor': KeysetPagination,
+    }
+
+    @property
+    def paginator(self):
+        if not hasattr(self, '_paginator'):
+            selected = self.request.query_params.get(self.pagination_query_param) if self.request else None
+            pagination_class = self.pagination_classes.get(selected, self.pagination_class)
+            self._paginator = pagination_class() if pagination_class else None
+        return self._paginator
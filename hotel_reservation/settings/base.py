@@ -43,6 +43,23 @@ DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 
 SITE_ID = 1
 
+# the reads of the list and retrieve actions go to the replicas of DATABASE_REPLICAS
+DATABASE_ROUTERS = ['hotel_reservation.db.routers.ReplicaRouter']
+
+# a per-process cache by default, production reads a shared backend from DJANGO_CACHE_URL
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+    }
+}
+
+# cache backends whose entries are only seen by the process that set them, so an invalidation
+# (catalog, role ids) or a read-your-writes stickiness would not reach the other workers
+PROCESS_LOCAL_CACHE_BACKENDS = (
+    'django.core.cache.backends.locmem.LocMemCache',
+    'django.core.cache.backends.dummy.DummyCache',
+)
+
 # ==============================================================================
 # APPS SETTINGS
 # ==============================================================================
@@ -73,6 +90,8 @@ INSTALLED_APPS = [
 # ==============================================================================
 
 MIDDLEWARE = [
+    "hotel_reservation.middleware.RequestInstrumentationMiddleware",
+    "hotel_reservation.middleware.ReplicaRoutingMiddleware",
     "django.middleware.security.SecurityMiddleware",
     "django.contrib.sessions.middleware.SessionMiddleware",
     "corsheaders.middleware.CorsMiddleware",
@@ -192,4 +211,25 @@ SPECTACULAR_SETTINGS = {
 # FIRST-PARTY SETTINGS
 # ==============================================================================
 
-MY_ENV = env.str('MY_ENV', default='')
\ No newline at end of file
+MY_ENV = env.str('MY_ENV', default='')
+
+# per-request query count, DB time and view time (see hotel_reservation.middleware)
+REQUEST_INSTRUMENTATION = {
+    'ENABLED': env.bool('REQUEST_INSTRUMENTATION_ENABLED', default=False),
+    # requests exceeding any of the budgets are logged as warnings
+    'QUERY_BUDGET': env.int('REQUEST_QUERY_BUDGET', default=20),
+    'LATENCY_BUDGET_MS': env.int('REQUEST_LATENCY_BUDGET_MS', default=500),
+}
+
+# seconds the room types and rooms payloads are cached for (see apps.rooms.cache),
+# entries are invalidated earlier whenever a room type or a room changes
+CATALOG_CACHE_TIMEOUT = env.int('CATALOG_CACHE_TIMEOUT', default=60 * 60)
+
+# aliases of the read replicas in DATABASES (see hotel_reservation.db.routers), none by default,
+# and seconds the reads of a user stick to the primary after they write
+DATABASE_REPLICAS = []
+REPLICA_STICKY_SECONDS = env.int('DJANGO_DB_REPLICA_STICKY_SECONDS', default=5)
+
+# how the room of a new reservation is picked among the free rooms of its room type:
+# first_fit, best_fit or least_used (see apps.rooms.assignment)
+ROOM_ASSIGNMENT_STRATEGY = env.str('ROOM_ASSIGNMENT_STRATEGY', default='best_fit')
\ No newline at end of file
@@ -1,3 +1,4 @@
+import tempfile
 from .base import *
 
 
@@ -17,5 +18,19 @@ DATABASES = {
     'default': {
         'ENGINE': 'django.db.backends.sqlite3',
         'NAME': os.path.join(BASE_DIR, 'db.sqlite3'),
-    }
-}
\ No newline at end of file
+    },
+    # a second SQLite database standing in for a read replica, e.g. a copy of db.sqlite3
+    'replica': {
+        'ENGINE': 'django.db.backends.sqlite3',
+        'NAME': os.path.join(BASE_DIR, 'db.replica.sqlite3'),
+    },
+}
+
+if env.bool('DJANGO_DB_REPLICA', default=False):
+    DATABASE_REPLICAS = ['replica']
+    # the stickiness to the primary after a write needs a cache shared between the processes
+    CACHES = {
+        'default': env.cache_url_config(
+            env.str('DJANGO_CACHE_URL', default='') or f'filecache://{os.path.join(tempfile.gettempdir(), "hotel_reservation_cache")}'
+        )
+    }
\ No newline at end of file
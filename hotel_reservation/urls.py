@@ -18,6 +18,7 @@ from django.conf import settings
 from django.contrib import admin
 from django.urls import path, include
 from drf_spectacular.views import SpectacularAPIView, SpectacularRedocView, SpectacularSwaggerView
+from hotel_reservation.db.views import DatabaseConnectionsView
 
 prefix = 'api/v1'
 
@@ -25,6 +26,7 @@ urlpatterns = [
     path('admin/', admin.site.urls),
     path(f'{prefix}/', include('apps.users.urls')),
     path(f'{prefix}/', include('apps.rooms.urls')),
+    path(f'{prefix}/db/connections/', DatabaseConnectionsView.as_view(), name='db-connections'),
 ]
 
 if settings.DEBUG: